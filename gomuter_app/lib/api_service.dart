@@ -286,7 +286,8 @@ class ApiService {
       body: jsonEncode({'latitude': latitude, 'longitude': longitude}),
     );
 
-    if (response.statusCode == 201) {
+    // 202 = ping digabung server dengan ping sebelumnya (terlalu rapat).
+    if (response.statusCode == 201 || response.statusCode == 202) {
       return jsonDecode(response.body) as Map<String, dynamic>;
     }
     throw Exception('Gagal mengupdate lokasi PKL: ${response.body}');
@@ -310,6 +311,9 @@ class ApiService {
     required String accessToken,
     String? jenis,
     String? query,
+    double? latitude,
+    double? longitude,
+    bool commit = false,
   }) async {
     final params = <String, String>{};
     if (jenis != null && jenis.isNotEmpty) {
@@ -318,6 +322,15 @@ class ApiService {
     if (query != null && query.isNotEmpty) {
       params['q'] = query;
     }
+    // Hanya pencarian yang disubmit dihitung sebagai search hit PKL.
+    if (commit) {
+      params['commit'] = '1';
+    }
+    // Server menghitung distance_m bila posisi pembeli dikirim.
+    if (latitude != null && longitude != null) {
+      params['lat'] = latitude.toString();
+      params['lng'] = longitude.toString();
+    }
 
     final baseUri = Uri.parse('$baseUrl/api/pkl/active/');
     final url = params.isEmpty
@@ -335,6 +348,44 @@ class ApiService {
     throw Exception('Gagal mengambil daftar PKL aktif: ${response.body}');
   }
 
+  static Future<List<dynamic>> getAutocomplete(String query, {int limit = 8}) async {
+    final url = Uri.parse('$baseUrl/api/pkl/autocomplete/').replace(
+      queryParameters: {'q': query, 'limit': limit.toString()},
+    );
+    final response = await http.get(url);
+
+    if (response.statusCode == 200) {
+      final data = jsonDecode(response.body) as Map<String, dynamic>;
+      return data['suggestions'] as List<dynamic>;
+    }
+    throw Exception('Gagal mengambil saran pencarian: ${response.body}');
+  }
+
+  static Future<List<dynamic>> searchProducts(
+    String query, {
+    double? latitude,
+    double? longitude,
+    bool nearestFirst = false,
+  }) async {
+    final params = <String, String>{'q': query};
+    if (latitude != null && longitude != null) {
+      params['lat'] = latitude.toString();
+      params['lng'] = longitude.toString();
+    }
+    if (nearestFirst) {
+      params['order'] = 'distance';
+    }
+    final url = Uri.parse('$baseUrl/api/pkl/products/search/').replace(
+      queryParameters: params,
+    );
+    final response = await http.get(url);
+
+    if (response.statusCode == 200) {
+      return jsonDecode(response.body) as List<dynamic>;
+    }
+    throw Exception('Gagal mencari produk PKL: ${response.body}');
+  }
+
   static Future<Map<String, dynamic>> getPKLDetail(int id) async {
     final url = Uri.parse('$baseUrl/api/pkl/$id/');
     final response = await http.get(url);
@@ -618,6 +669,33 @@ class ApiService {
     throw Exception('Gagal mengambil pre-order PKL: ${response.body}');
   }
 
+  /// Ringkasan antrean pre-order PKL. Kirim [etag] dari respons sebelumnya;
+  /// mengembalikan null bila antrean belum berubah (HTTP 304).
+  /// ETag terbaru ada di field `etag` hasil.
+  static Future<Map<String, dynamic>?> getPKLOrderQueue({
+    required String token,
+    String? etag,
+  }) async {
+    final url = Uri.parse('$baseUrl/api/pkl/preorder/pkl/queue/');
+    final response = await http.get(
+      url,
+      headers: {
+        ..._jsonHeaders(token: token),
+        if (etag != null) 'If-None-Match': etag,
+      },
+    );
+
+    if (response.statusCode == 304) {
+      return null;
+    }
+    if (response.statusCode == 200) {
+      final data = jsonDecode(response.body) as Map<String, dynamic>;
+      data['etag'] = response.headers['etag'];
+      return data;
+    }
+    throw Exception('Gagal mengambil antrean pre-order: ${response.body}');
+  }
+
   static Future<Map<String, dynamic>> updatePreOrderStatus({
     required String token,
     required int preorderId,
@@ -706,12 +784,15 @@ class ApiService {
     required double latitude,
     required double longitude,
     int? radiusM,
+    bool? digestEnabled,
   }) async {
     final url = Uri.parse('$baseUrl/api/pkl/buyer/location/');
     final payload = {
       'latitude': latitude,
       'longitude': longitude,
       if (radiusM != null) 'radius_m': radiusM,
+      // true = notifikasi PKL terdekat digabung menjadi satu ringkasan
+      if (digestEnabled != null) 'digest_enabled': digestEnabled,
     };
 
     final response = await http.post(
@@ -720,7 +801,9 @@ class ApiService {
       body: jsonEncode(payload),
     );
 
-    if (response.statusCode == 200 || response.statusCode == 201) {
+    if (response.statusCode == 200 ||
+        response.statusCode == 201 ||
+        response.statusCode == 202) {
       return jsonDecode(response.body) as Map<String, dynamic>;
     }
     throw Exception('Gagal menyimpan lokasi pembeli: ${response.body}');
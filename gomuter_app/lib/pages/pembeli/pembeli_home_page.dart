@@ -204,6 +204,9 @@ class _PembeliHomePageState extends State<PembeliHomePage> {
       final data = await ApiService.getActivePKL(
         accessToken: token,
         query: jenis,
+        latitude: _buyerPosition?.latitude,
+        longitude: _buyerPosition?.longitude,
+        commit: jenis != null,
       );
 
       final markers = <Marker>[];
@@ -1060,6 +1063,8 @@ class _PembeliHomePageState extends State<PembeliHomePage> {
   }
 
   double? _distanceMetersForPKL(Map<String, dynamic> pkl) {
+    final serverDistance = pkl['distance_m'];
+    if (serverDistance is num) return serverDistance.toDouble();
     final buyer = _buyerPosition;
     if (buyer == null) return null;
     final latRaw = pkl['latest_latitude'];
@@ -1318,7 +1318,7 @@ class _PklDetailPageState extends State<PklDetailPage> {
     final imageUrls = <String>[];
     for (final item in products) {
       if (item is Map) {
-        final url = item['image_url'];
+        final url = item['image_medium_url'] ?? item['image_url'];
         if (url is String && url.isNotEmpty) {
           imageUrls.add(url);
         }
@@ -0,0 +1,61 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+
+def _user_cache_key(user_id) -> str:
+    return f'auth:user:{user_id}'
+
+
+def invalidate_cached_user(user_id) -> None:
+    caches['local'].delete(_user_cache_key(user_id))
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication yang menyimpan user di cache lokal selama AUTH_CACHE_TTL.
+
+    Ping lokasi datang setiap beberapa detik; tanpa cache setiap request memuat
+    ulang baris user. Cache dibersihkan lewat signal saat user berubah.
+    """
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken('Token tidak memuat identitas user.')
+
+        cache = caches['local']
+        key = _user_cache_key(user_id)
+        user = cache.get(key)
+        if user is None:
+            user = super().get_user(validated_token)
+            cache.set(key, user, settings.AUTH_CACHE_TTL)
+            return user
+        return self._check_cached_user(user)
+
+    @staticmethod
+    def _check_cached_user(user):
+        if not user.is_active:
+            raise AuthenticationFailed('User tidak aktif.', code='user_inactive')
+        return user
+
+    async def aauthenticate(self, request):
+        """``authenticate`` for async views; only a user cache miss leaves the event loop."""
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        validated_token = self.get_validated_token(raw_token)
+
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        # dibaca sekali: entri bisa kedaluwarsa sebelum get_user membacanya
+        # lagi, dan get_user memakai ORM sync yang tidak boleh di event loop
+        user = caches['local'].get(_user_cache_key(user_id)) if user_id is not None else None
+        if user is not None:
+            return self._check_cached_user(user), validated_token
+        return await sync_to_async(self.get_user)(validated_token), validated_token
@@ -1,4 +1,5 @@
 from rest_framework import serializers
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 from .models import User
 from django.contrib.auth.password_validation import validate_password
 from django.core.exceptions import ValidationError
@@ -40,4 +41,17 @@ class PasswordResetConfirmSerializer(serializers.Serializer):
             validate_password(value)
         except ValidationError as exc:
             raise serializers.ValidationError(list(exc.messages))
-        return value
\ No newline at end of file
+        return value
+
+
+class GoMuterTokenObtainPairSerializer(TokenObtainPairSerializer):
+    """Sisipkan role dan pkl_id ke token agar endpoint PKL tidak perlu lookup tambahan."""
+
+    @classmethod
+    def get_token(cls, user):
+        from pkl.models import PKL
+
+        token = super().get_token(user)
+        token['role'] = user.role
+        token['pkl_id'] = PKL.objects.filter(user=user).values_list('id', flat=True).first()
+        return token
@@ -1,3 +1,35 @@
-from django.test import TestCase
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import caches
+from django.test import RequestFactory, TestCase
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .authentication import CachedJWTAuthentication, invalidate_cached_user
+from .models import User
+
+
+class CachedJWTAuthenticationTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='buyer1', password='x')
+        invalidate_cached_user(self.user.pk)
+        self.request = RequestFactory().get(
+            '/', HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.user)}',
+        )
+
+    async def test_cache_miss_loads_user_off_the_event_loop(self):
+        user, _ = await CachedJWTAuthentication().aauthenticate(self.request)
+        self.assertEqual(user.pk, self.user.pk)
+
+    async def test_cache_hit_uses_the_value_read_once(self):
+        user, _ = await CachedJWTAuthentication().aauthenticate(self.request)
+        # entri kedaluwarsa setelah dibaca tidak boleh memicu ORM sync
+        with mock.patch.object(CachedJWTAuthentication, 'get_user', side_effect=AssertionError):
+            cached, _ = await CachedJWTAuthentication().aauthenticate(self.request)
+        self.assertEqual(cached.pk, user.pk)
+
+    async def test_cached_inactive_user_is_rejected(self):
+        self.user.is_active = False
+        caches['local'].set(f'auth:user:{self.user.pk}', self.user)
+        with self.assertRaises(AuthenticationFailed):
+            await CachedJWTAuthentication().aauthenticate(self.request)
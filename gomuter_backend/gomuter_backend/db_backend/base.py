@@ -0,0 +1,16 @@
+"""PostgreSQL backend that reports connection acquisition to ``db_metrics``."""
+import time
+
+from django.db.backends.postgresql import base
+
+from gomuter_backend import db_metrics
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def ensure_connection(self):
+        db_metrics.mark_db_used()
+        if self.connection is not None:
+            return super().ensure_connection()
+        start = time.perf_counter()
+        super().ensure_connection()
+        db_metrics.record_acquire((time.perf_counter() - start) * 1000)
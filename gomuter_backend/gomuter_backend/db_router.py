@@ -0,0 +1,168 @@
+"""Route heavy read-only traffic to the ``replica`` database alias.
+
+Reads go to the replica only inside :func:`use_replica` (management
+commands, services) or for views marked ``use_read_replica = True`` (see
+:class:`ReplicaRoutingMiddleware`). Everything else, and every write, uses
+``default``.
+
+Read-your-writes: after a user sends a successful unsafe request, that user
+is pinned to ``default`` for ``DB_REPLICA_PIN_SECONDS`` so replication lag
+never hides their own changes. The pin lives in the ``default`` cache, which
+must therefore be shared between processes (Redis or a file cache); the middleware
+refuses to start with a replica and a per-process cache.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.exceptions import ImproperlyConfigured
+
+REPLICA_DB_ALIAS = 'replica'
+_SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+# None = tidak memakai replica; selain itu objek request (atau True untuk
+# pemakaian di luar request) yang sedang dilayani dari replica.
+_replica_context: ContextVar = ContextVar('gomuter_replica_context', default=None)
+
+
+def replica_configured() -> bool:
+    return REPLICA_DB_ALIAS in settings.DATABASES
+
+
+def pin_cache_shared() -> bool:
+    """Whether the ``default`` cache is visible to every process."""
+    return not isinstance(caches['default'], (LocMemCache, DummyCache))
+
+
+def _pin_key(user_id) -> str:
+    return f'db:replica-pin:user:{user_id}'
+
+
+def pin_to_primary(user_id) -> None:
+    """Send ``user_id``'s reads to ``default`` for the read-your-writes window."""
+    caches['default'].set(_pin_key(user_id), 1, settings.DB_REPLICA_PIN_SECONDS)
+
+
+def _is_pinned(request) -> bool:
+    # request.user baru terisi setelah autentikasi DRF; query autentikasi
+    # sendiri (lookup user) masih boleh ke replica.
+    user = getattr(request, 'user', None)
+    if user is None or not user.is_authenticated:
+        return False
+    cached = getattr(request, '_replica_pin', None)
+    if cached is None or cached[0] != user.pk:
+        cached = (user.pk, caches['default'].get(_pin_key(user.pk)) is not None)
+        request._replica_pin = cached
+    return cached[1]
+
+
+@contextmanager
+def use_replica(request=None):
+    """Route reads inside the block to the replica (no-op without one)."""
+    token = _replica_context.set(request if request is not None else True)
+    try:
+        yield
+    finally:
+        _replica_context.reset(token)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        context = _replica_context.get()
+        if context is None or not replica_configured():
+            return None
+        if context is not True and _is_pinned(context):
+            return None
+        return REPLICA_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # replica adalah salinan default; relasi antar keduanya selalu sah
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # skema replica mengikuti default lewat replikasi, bukan migrate
+        return db != REPLICA_DB_ALIAS
+
+
+def _iterate_with_replica(request, iterator):
+    with use_replica(request):
+        yield from iterator
+
+
+class ReplicaRoutingMiddleware:
+    """Serve safe requests of ``use_read_replica`` views from the replica.
+
+    Also pins users to ``default`` after their successful unsafe requests.
+    Streaming responses keep the replica routing while they are consumed.
+    Works in both the WSGI and the ASGI handler.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if replica_configured() and not pin_cache_shared():
+            raise ImproperlyConfigured(
+                'Read replica membutuhkan cache default yang dibagi antar proses '
+                '(GOMUTER_REDIS_URL atau GOMUTER_CACHE_DIR) agar pin read-your-writes berlaku di semua worker.'
+            )
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+            self.process_view = self._aprocess_view
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        response = self.get_response(request)
+        self._pin_after_write(request, response)
+        return response
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        if request.method not in _SAFE_METHODS and response.status_code < 400:
+            # request.user bisa berupa lazy object sesi yang memuat DB
+            await sync_to_async(self._pin_after_write)(request, response)
+        return response
+
+    def _pin_after_write(self, request, response):
+        if request.method not in _SAFE_METHODS and response.status_code < 400:
+            user = getattr(request, 'user', None)
+            if user is not None and user.is_authenticated:
+                pin_to_primary(user.pk)
+
+    def _routes_to_replica(self, request, view_func) -> bool:
+        view_class = getattr(view_func, 'view_class', None) or getattr(view_func, 'cls', None)
+        return (
+            request.method in _SAFE_METHODS
+            and getattr(view_class, 'use_read_replica', False)
+            and replica_configured()
+        )
+
+    def _render_from_replica(self, request, view_func, view_args, view_kwargs):
+        with use_replica(request):
+            response = view_func(request, *view_args, **view_kwargs)
+            if hasattr(response, 'render') and callable(response.render):
+                response = response.render()
+        if response.streaming:
+            response.streaming_content = _iterate_with_replica(request, response.streaming_content)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if not self._routes_to_replica(request, view_func):
+            return None
+        return self._render_from_replica(request, view_func, view_args, view_kwargs)
+
+    async def _aprocess_view(self, request, view_func, view_args, view_kwargs):
+        # dipasang sebagai process_view di handler ASGI agar view lain tidak
+        # perlu berpindah thread hanya untuk pengecekan ini
+        if not self._routes_to_replica(request, view_func):
+            return None
+        return await sync_to_async(self._render_from_replica)(request, view_func, view_args, view_kwargs)
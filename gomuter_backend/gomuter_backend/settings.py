@@ -38,6 +38,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'corsheaders',
     'rest_framework',   # Django REST framework
     'accounts',
@@ -46,10 +47,84 @@ INSTALLED_APPS = [
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'accounts.authentication.CachedJWTAuthentication',
     ),
 }
 
+SIMPLE_JWT = {
+    # tambahkan klaim role & pkl_id ke token
+    'TOKEN_OBTAIN_SERIALIZER': 'accounts.serializers.GoMuterTokenObtainPairSerializer',
+}
+
+# Caches
+# - default: shared cache; in-process unless GOMUTER_REDIS_URL is set, or
+#   GOMUTER_CACHE_DIR (file cache shared by the processes of one host)
+# - local: always in-process, for short-TTL hot-path lookups (auth user, PKL profile)
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'gomuter-default',
+    },
+    'local': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'gomuter-local',
+    },
+}
+
+if os.getenv('GOMUTER_REDIS_URL'):
+    CACHES['default'] = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.getenv('GOMUTER_REDIS_URL'),
+    }
+elif os.getenv('GOMUTER_CACHE_DIR'):
+    CACHES['default'] = {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.getenv('GOMUTER_CACHE_DIR'),
+    }
+
+# Seconds the authenticated user / PKL profile rows stay cached per process
+AUTH_CACHE_TTL = int(os.getenv('GOMUTER_AUTH_CACHE_TTL', '30'))
+
+# Location ping limits (update-location/, buyer/location/)
+# - LOCATION_THROTTLE_RATES: scope -> (burst capacity, tokens refilled per minute), per user
+# - LOCATION_PING_MIN_INTERVAL: pings closer than this (seconds) get a cheap 202 "coalesced"
+# - GOMUTER_THROTTLE_BACKEND=pkl.throttling.CacheBucketBackend shares state via the default cache
+# - GOMUTER_LOCATION_THROTTLE=false disables the bucket (e.g. for bench_location_pings)
+
+LOCATION_THROTTLE_BACKEND = os.getenv('GOMUTER_THROTTLE_BACKEND', 'pkl.throttling.LocalBucketBackend')
+LOCATION_THROTTLE_RATES = {
+    'pkl-location': (10, 20),
+    'buyer-location': (10, 20),
+}
+if os.getenv('GOMUTER_LOCATION_THROTTLE', 'true').lower() != 'true':
+    LOCATION_THROTTLE_RATES = {}
+LOCATION_PING_MIN_INTERVAL = {
+    'pkl-location': int(os.getenv('GOMUTER_PKL_PING_MIN_INTERVAL', '10')),
+    'buyer-location': int(os.getenv('GOMUTER_BUYER_PING_MIN_INTERVAL', '20')),
+}
+
+# PKL aktif yang tidak mengirim ping selama ini dinonaktifkan oleh sweep_stale_pkls.
+PKL_STALE_AFTER_MINUTES = int(os.getenv('GOMUTER_PKL_STALE_AFTER_MINUTES', '15'))
+
+# Masa berlaku notifikasi per tipe (menit), disimpan di Notification.expires_at.
+# Notifikasi kedaluwarsa tidak tampil di feed dan dihapus oleh expire_notifications;
+# riwayat PKL favorit disimpan lebih lama (GOMUTER_NOTIF_FAVORITE_RETENTION_DAYS).
+NOTIFICATION_TTL_MINUTES = {
+    'NEARBY_PKL': int(os.getenv('GOMUTER_NOTIF_NEARBY_TTL_MINUTES', '30')),
+    'NEARBY_DIGEST': int(os.getenv('GOMUTER_NOTIF_DIGEST_TTL_MINUTES', '60')),
+    'FAVORITE_ACTIVE': int(os.getenv('GOMUTER_NOTIF_FAVORITE_RETENTION_DAYS', '30')) * 24 * 60,
+}
+
+# Bobot ranking hasil pencarian PKL (lihat pkl.ranking). Bobot jarak diabaikan
+# bila pemanggil tidak mengirim lat/lng; sisanya dinormalisasi ulang.
+PKL_RANKING_WEIGHTS = {
+    'text': float(os.getenv('GOMUTER_RANKING_WEIGHT_TEXT', '0.55')),
+    'distance': float(os.getenv('GOMUTER_RANKING_WEIGHT_DISTANCE', '0.2')),
+    'rating': float(os.getenv('GOMUTER_RANKING_WEIGHT_RATING', '0.15')),
+    'freshness': float(os.getenv('GOMUTER_RANKING_WEIGHT_FRESHNESS', '0.1')),
+}
+
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
@@ -60,6 +135,8 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'gomuter_backend.db_metrics.ConnectionTimingMiddleware',
+    'gomuter_backend.db_router.ReplicaRoutingMiddleware',
 ]
 
 ROOT_URLCONF = 'gomuter_backend.urls'
@@ -85,17 +162,60 @@ WSGI_APPLICATION = 'gomuter_backend.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# Connection reuse
+# - GOMUTER_DB_CONN_MAX_AGE: seconds a connection is kept between requests (0 = per request)
+# - GOMUTER_DB_POOL=true switches to psycopg's connection pool (needs psycopg[pool]);
+#   Django requires CONN_MAX_AGE = 0 when the pool is enabled
+# ENGINE gomuter_backend.db_backend is the PostgreSQL backend plus connection
+# timing for db_metrics (Server-Timing db-acquire, admin/metrics/).
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
-        'NAME': 'gomuter_db',
-        'USER': 'postgres',
-        'PASSWORD': 'postgres',
-        'HOST': 'localhost',
-        'PORT': '5432',
+        'ENGINE': 'gomuter_backend.db_backend',
+        'NAME': os.getenv('GOMUTER_DB_NAME', 'gomuter_db'),
+        'USER': os.getenv('GOMUTER_DB_USER', 'postgres'),
+        'PASSWORD': os.getenv('GOMUTER_DB_PASSWORD', 'postgres'),
+        'HOST': os.getenv('GOMUTER_DB_HOST', 'localhost'),
+        'PORT': os.getenv('GOMUTER_DB_PORT', '5432'),
+        'CONN_MAX_AGE': int(os.getenv('GOMUTER_DB_CONN_MAX_AGE', '60')),
+        'CONN_HEALTH_CHECKS': os.getenv('GOMUTER_DB_CONN_HEALTH_CHECKS', 'true').lower() == 'true',
     }
 }
 
+if os.getenv('GOMUTER_DB_POOL', 'false').lower() == 'true':
+    DATABASES['default']['CONN_MAX_AGE'] = 0
+    DATABASES['default']['OPTIONS'] = {
+        'pool': {
+            'min_size': int(os.getenv('GOMUTER_DB_POOL_MIN_SIZE', '2')),
+            'max_size': int(os.getenv('GOMUTER_DB_POOL_MAX_SIZE', '10')),
+            'timeout': float(os.getenv('GOMUTER_DB_POOL_TIMEOUT', '10')),
+        },
+    }
+
+# Read replica (opsional)
+# - GOMUTER_DB_REPLICA_HOST / _NAME / _PORT / _USER / _PASSWORD: koneksi replica;
+#   yang tidak diisi mengikuti default. Alias 'replica' hanya dibuat bila HOST
+#   atau NAME diisi. Untuk uji lokal cukup arahkan NAME ke database kedua.
+# - GOMUTER_DB_REPLICA_PIN_SECONDS: lama pengguna dibaca dari default setelah
+#   menulis (read-your-writes); pin disimpan di cache default, jadi replica
+#   wajib disertai GOMUTER_REDIS_URL atau GOMUTER_CACHE_DIR
+# View dengan use_read_replica = True dan blok use_replica() membaca dari sini;
+# lihat gomuter_backend.db_router.
+if os.getenv('GOMUTER_DB_REPLICA_HOST') or os.getenv('GOMUTER_DB_REPLICA_NAME'):
+    _primary = DATABASES['default']
+    DATABASES['replica'] = {
+        **_primary,
+        'NAME': os.getenv('GOMUTER_DB_REPLICA_NAME', _primary['NAME']),
+        'USER': os.getenv('GOMUTER_DB_REPLICA_USER', _primary['USER']),
+        'PASSWORD': os.getenv('GOMUTER_DB_REPLICA_PASSWORD', _primary['PASSWORD']),
+        'HOST': os.getenv('GOMUTER_DB_REPLICA_HOST', _primary['HOST']),
+        'PORT': os.getenv('GOMUTER_DB_REPLICA_PORT', _primary['PORT']),
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['gomuter_backend.db_router.ReplicaRouter']
+DB_REPLICA_PIN_SECONDS = int(os.getenv('GOMUTER_DB_REPLICA_PIN_SECONDS', '5'))
+
 AUTH_USER_MODEL = 'accounts.User'
 
 # Password validation
@@ -136,6 +256,12 @@ STATIC_URL = 'static/'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Uploads
+# - Files larger than FILE_UPLOAD_MAX_MEMORY_SIZE are spooled to a temp file, not RAM
+# - DP proof uploads above DP_PROOF_MAX_BYTES are rejected with 413
+FILE_UPLOAD_MAX_MEMORY_SIZE = 512 * 1024
+DP_PROOF_MAX_BYTES = int(os.getenv('GOMUTER_DP_PROOF_MAX_BYTES', str(5 * 1024 * 1024)))
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -143,6 +269,8 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # CORS configuration to allow Flutter dev server
 CORS_ALLOW_ALL_ORIGINS = True
+# Flutter web perlu membaca ETag untuk polling antrean pre-order (If-None-Match)
+CORS_EXPOSE_HEADERS = ['ETag']
 
 # Email (password reset)
 # - Default: console backend (dev) so emails appear in the runserver terminal
@@ -0,0 +1,84 @@
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connections
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from gomuter_backend import db_metrics
+from gomuter_backend.db_router import ReplicaRoutingMiddleware, pin_cache_shared, replica_configured
+from pkl.models import PKL
+
+
+class ConnectionTimingTests(TestCase):
+    def test_request_without_queries_is_not_timed(self):
+        before = db_metrics.snapshot()
+        response = APIClient().get('/api/pkl/preorder/pkl/')
+
+        self.assertEqual(response.status_code, 401)
+        self.assertNotIn('Server-Timing', response)
+        after = db_metrics.snapshot()
+        self.assertEqual(after['requests'], before['requests'] + 1)
+        self.assertEqual(after['db_requests'], before['db_requests'])
+
+    def test_request_with_queries_reports_acquire_time(self):
+        user = get_user_model().objects.create_user(username='pkl1', password='x', role='PKL')
+        PKL.objects.create(user=user, nama_usaha='Bakso', jenis_dagangan='Bakso', jam_operasional='10-22')
+        client = APIClient()
+        client.force_authenticate(user)
+        before = db_metrics.snapshot()
+
+        response = client.get('/api/pkl/preorder/pkl/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Server-Timing'].startswith('db-acquire;dur='))
+        self.assertEqual(db_metrics.snapshot()['db_requests'], before['db_requests'] + 1)
+
+
+@skipUnless(
+    replica_configured() and pin_cache_shared(),
+    'set GOMUTER_DB_REPLICA_NAME and GOMUTER_CACHE_DIR (or GOMUTER_REDIS_URL) to test replica routing',
+)
+class ReplicaRoutingTests(TestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        caches['default'].clear()
+        self.admin = get_user_model().objects.create_user(
+            username='admin', password='x', role='ADMIN', is_staff=True,
+        )
+        self.pkl = PKL.objects.create(
+            user=get_user_model().objects.create_user(username='pkl1', password='x', role='PKL'),
+            nama_usaha='Bakso', jenis_dagangan='Bakso', jam_operasional='10-22',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def _dashboard_queries(self):
+        with CaptureQueriesContext(connections['default']) as primary, \
+                CaptureQueriesContext(connections['replica']) as replica:
+            self.assertEqual(self.client.get('/api/pkl/admin/dashboard/').status_code, 200)
+        return len(primary), len(replica)
+
+    def test_marked_views_read_from_replica(self):
+        primary, replica = self._dashboard_queries()
+        self.assertEqual(primary, 0)
+        self.assertGreater(replica, 0)
+
+    def test_user_is_pinned_to_primary_after_write(self):
+        response = self.client.patch(
+            f'/api/pkl/admin/{self.pkl.pk}/verify/', {'status_verifikasi': 'DITERIMA'}, format='json',
+        )
+        self.assertEqual(response.status_code, 200)
+
+        primary, replica = self._dashboard_queries()
+        self.assertGreater(primary, 0)
+        self.assertEqual(replica, 0)
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    def test_refuses_per_process_pin_cache(self):
+        with self.assertRaises(ImproperlyConfigured):
+            ReplicaRoutingMiddleware(lambda request: None)
@@ -6,7 +6,11 @@ from .models import (
     FavoritePKL,
     Notification,
     PKLDailyStats,
+    PKLHourlyStats,
+    PKLWeeklyStats,
+    PKLMonthlyStats,
     PKLProduct,
+    PKLSearchLog,
 )
 
 @admin.register(PKL)
@@ -34,7 +38,7 @@ class FavoritePKLAdmin(admin.ModelAdmin):
 
 @admin.register(Notification)
 class NotificationAdmin(admin.ModelAdmin):
-    list_display = ('buyer', 'notif_type', 'pkl', 'is_read', 'created_at')
+    list_display = ('buyer', 'notif_type', 'pkl', 'is_read', 'created_at', 'expires_at')
     list_filter = ('notif_type', 'is_read')
     search_fields = ('buyer__username', 'pkl__nama_usaha', 'message')
 
@@ -46,8 +50,34 @@ class PKLDailyStatsAdmin(admin.ModelAdmin):
     search_fields = ('pkl__nama_usaha',)
 
 
+@admin.register(PKLHourlyStats)
+class PKLHourlyStatsAdmin(admin.ModelAdmin):
+    list_display = ('pkl', 'hour', 'live_views', 'search_hits', 'auto_updates')
+    search_fields = ('pkl__nama_usaha',)
+
+
+@admin.register(PKLWeeklyStats)
+class PKLWeeklyStatsAdmin(admin.ModelAdmin):
+    list_display = ('pkl', 'week_start', 'live_views', 'search_hits', 'auto_updates')
+    list_filter = ('week_start',)
+    search_fields = ('pkl__nama_usaha',)
+
+
+@admin.register(PKLMonthlyStats)
+class PKLMonthlyStatsAdmin(admin.ModelAdmin):
+    list_display = ('pkl', 'month', 'live_views', 'search_hits', 'auto_updates')
+    list_filter = ('month',)
+    search_fields = ('pkl__nama_usaha',)
+
+
 @admin.register(PKLProduct)
 class PKLProductAdmin(admin.ModelAdmin):
     list_display = ('name', 'pkl', 'price', 'is_available', 'is_featured', 'updated_at')
     list_filter = ('is_available', 'is_featured')
     search_fields = ('name', 'pkl__nama_usaha')
+
+
+@admin.register(PKLSearchLog)
+class PKLSearchLogAdmin(admin.ModelAdmin):
+    list_display = ('query', 'jenis', 'buyer', 'created_at')
+    search_fields = ('query', 'buyer__username')
@@ -0,0 +1,260 @@
+"""Search-as-you-type suggestions from an in-memory prefix trie.
+
+The trie holds the names and categories of active, verified vendors plus the
+names of their available products. Every word of a suggestion is inserted, so
+``"mal"`` finds ``"Bakso Malang"``. Lookups never touch the database or the
+stats counters.
+
+Each process keeps its own trie. Changes are published as a version counter
+in the database (``CacheVersion``) plus one ``AutocompleteChange`` row per
+version listing the PKL ids that changed; a process that falls behind replays
+those ids (``refresh_vendors``) and rebuilds from scratch when it is more than
+``MAX_REPLAY`` versions behind (older rows are pruned). A trie older than
+``MAX_TRIE_AGE_SECONDS`` is rebuilt anyway, which also picks up rows changed
+without signals (``queryset.update()``).
+"""
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Iterable
+
+from django.db import transaction
+
+from .cache import bump_shared_version, shared_version
+from .models import PKL, AutocompleteChange, PKLProduct
+from .utils import search_tokens
+
+KIND_PKL = 'pkl'
+KIND_JENIS = 'jenis'
+KIND_PRODUCT = 'product'
+# Urutan tampil bila skor lain sama: nama PKL dulu, lalu kategori, lalu produk.
+_KIND_ORDER = {KIND_PKL: 0, KIND_JENIS: 1, KIND_PRODUCT: 2}
+
+VERSION_KEY = 'pkl:autocomplete:version'
+# Lebih dari ini perubahan tertinggal: bangun ulang seluruh trie. Log
+# perubahan yang lebih lama dari ini dihapus.
+MAX_REPLAY = 200
+MAX_TRIE_AGE_SECONDS = 300
+DEFAULT_LIMIT = 8
+MAX_LIMIT = 20
+# Kandidat yang dikumpulkan per lookup sebelum diurutkan.
+_CANDIDATE_FACTOR = 4
+
+
+@dataclass
+class _Suggestion:
+    text: str
+    kind: str
+    words: tuple[str, ...]
+    pkl_ids: set[int] = field(default_factory=set)
+
+
+class _Node:
+    __slots__ = ('children', 'keys')
+
+    def __init__(self):
+        self.children: dict[str, _Node] = {}
+        self.keys: set[tuple[str, str]] = set()
+
+
+def _suggestion_key(kind: str, text: str, pkl_id: int) -> tuple[str, str]:
+    # Nama PKL unik per PKL; kategori dan produk digabung lintas PKL.
+    return (kind, f'{pkl_id}') if kind == KIND_PKL else (kind, ' '.join(text.lower().split()))
+
+
+class PrefixTrie:
+    def __init__(self):
+        self._root = _Node()
+        self._suggestions: dict[tuple[str, str], _Suggestion] = {}
+        self._by_vendor: dict[int, set[tuple[str, str]]] = {}
+
+    def __len__(self) -> int:
+        return len(self._suggestions)
+
+    def _insert_word(self, word: str, key) -> None:
+        node = self._root
+        for char in word:
+            node = node.children.setdefault(char, _Node())
+        node.keys.add(key)
+
+    def _remove_word(self, word: str, key) -> None:
+        path = [self._root]
+        for char in word:
+            child = path[-1].children.get(char)
+            if child is None:
+                return
+            path.append(child)
+        path[-1].keys.discard(key)
+        # pangkas cabang yang sudah kosong
+        for depth in range(len(word), 0, -1):
+            node = path[depth]
+            if node.keys or node.children:
+                break
+            del path[depth - 1].children[word[depth - 1]]
+
+    def add(self, pkl_id: int, kind: str, text: str) -> None:
+        words = tuple(search_tokens(text).split())
+        if not words:
+            return
+        key = _suggestion_key(kind, text, pkl_id)
+        suggestion = self._suggestions.get(key)
+        if suggestion is None:
+            suggestion = self._suggestions[key] = _Suggestion(text.strip(), kind, words)
+            for word in words:
+                self._insert_word(word, key)
+        suggestion.pkl_ids.add(pkl_id)
+        self._by_vendor.setdefault(pkl_id, set()).add(key)
+
+    def remove_vendor(self, pkl_id: int) -> None:
+        for key in self._by_vendor.pop(pkl_id, ()):
+            suggestion = self._suggestions.get(key)
+            if suggestion is None:
+                continue
+            suggestion.pkl_ids.discard(pkl_id)
+            if not suggestion.pkl_ids:
+                del self._suggestions[key]
+                for word in suggestion.words:
+                    self._remove_word(word, key)
+
+    def _collect(self, prefix: str, limit: int) -> set[tuple[str, str]]:
+        node = self._root
+        for char in prefix:
+            node = node.children.get(char)
+            if node is None:
+                return set()
+        found: set[tuple[str, str]] = set()
+        # BFS: kata yang lebih pendek (lebih dekat ke prefix) didahulukan;
+        # berhenti setelah kandidat cukup
+        queue = deque([node])
+        while queue and len(found) < limit:
+            current = queue.popleft()
+            found.update(current.keys)
+            queue.extend(current.children.values())
+        return found
+
+    def search(self, query: str, limit: int) -> list[dict]:
+        words = search_tokens(query).split()
+        if not words:
+            return []
+        *complete, prefix = words
+        keys = self._collect(prefix, limit * _CANDIDATE_FACTOR)
+
+        results = []
+        for key in keys:
+            suggestion = self._suggestions[key]
+            # kata-kata sebelum kata terakhir harus ada sebagai awalan kata
+            if any(not any(w.startswith(word) for w in suggestion.words) for word in complete):
+                continue
+            results.append(suggestion)
+
+        full_query = ' '.join(words)
+        results.sort(key=lambda s: (
+            not ' '.join(s.words).startswith(full_query),
+            -len(s.pkl_ids),
+            _KIND_ORDER[s.kind],
+            len(s.text),
+            s.text.lower(),
+        ))
+        return [
+            {
+                'text': suggestion.text,
+                'type': suggestion.kind,
+                'pkl_id': next(iter(suggestion.pkl_ids)) if suggestion.kind == KIND_PKL else None,
+                'pkl_count': len(suggestion.pkl_ids),
+            }
+            for suggestion in results[:limit]
+        ]
+
+
+def _active_vendors(pkl_ids=None):
+    queryset = PKL.objects.filter(status_aktif=True, status_verifikasi='DITERIMA')
+    if pkl_ids is not None:
+        queryset = queryset.filter(id__in=pkl_ids)
+    return queryset
+
+
+def _load_entries(pkl_ids=None) -> Iterable[tuple[int, str, str]]:
+    vendors = _active_vendors(pkl_ids)
+    for pkl_id, nama_usaha, jenis_dagangan in vendors.values_list('id', 'nama_usaha', 'jenis_dagangan'):
+        yield pkl_id, KIND_PKL, nama_usaha
+        yield pkl_id, KIND_JENIS, jenis_dagangan
+    products = PKLProduct.objects.filter(is_available=True, pkl__in=vendors).values_list('pkl_id', 'name')
+    for pkl_id, name in products:
+        yield pkl_id, KIND_PRODUCT, name
+
+
+class _AutocompleteIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._trie = None
+        self._version = None
+        self._built_at = 0.0
+
+    def _rebuild(self, version) -> None:
+        trie = PrefixTrie()
+        for entry in _load_entries():
+            trie.add(*entry)
+        self._trie, self._version = trie, version
+        self._built_at = time.monotonic()
+
+    def _expired(self) -> bool:
+        return time.monotonic() - self._built_at > MAX_TRIE_AGE_SECONDS
+
+    def _replay(self, pkl_ids) -> None:
+        for pkl_id in pkl_ids:
+            self._trie.remove_vendor(pkl_id)
+        for entry in _load_entries(pkl_ids):
+            self._trie.add(*entry)
+
+    def _fresh(self) -> None:
+        version = shared_version(VERSION_KEY)
+        if version == self._version and not self._expired():
+            return
+        with self._lock:
+            if version == self._version and not self._expired():
+                return
+            if self._trie is None or self._expired() or not 0 < version - self._version <= MAX_REPLAY:
+                self._rebuild(version)
+                return
+            changes = list(
+                AutocompleteChange.objects.filter(version__gt=self._version, version__lte=version)
+                .values_list('pkl_ids', flat=True)
+            )
+            if len(changes) < version - self._version:
+                self._rebuild(version)
+                return
+            self._replay({pkl_id for pkl_ids in changes for pkl_id in pkl_ids})
+            self._version = version
+
+    def search(self, query: str, limit: int = DEFAULT_LIMIT) -> list[dict]:
+        self._fresh()
+        with self._lock:
+            return self._trie.search(query, limit)
+
+
+autocomplete_index = _AutocompleteIndex()
+
+
+def suggest(query: str, limit: int = DEFAULT_LIMIT) -> list[dict]:
+    return autocomplete_index.search(query, min(max(limit, 1), MAX_LIMIT))
+
+
+def _publish(pkl_ids: set[int]) -> None:
+    # versi dan lognya terlihat bersamaan; baris CacheVersion yang terkunci
+    # menjaga urutan antar publisher
+    with transaction.atomic():
+        version = bump_shared_version(VERSION_KEY)
+        AutocompleteChange.objects.create(version=version, pkl_ids=sorted(pkl_ids))
+        AutocompleteChange.objects.filter(version__lte=version - MAX_REPLAY).delete()
+
+
+def refresh_vendors(pkl_ids: Iterable[int]) -> None:
+    """Mark vendors whose name, category, status or products changed.
+
+    Published after the surrounding transaction commits, so other processes
+    replay committed rows only.
+    """
+    pkl_ids = set(pkl_ids)
+    if pkl_ids:
+        transaction.on_commit(lambda: _publish(pkl_ids))
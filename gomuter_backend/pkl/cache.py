@@ -0,0 +1,132 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F
+
+from .models import PKL, CacheVersion
+
+
+def _pkl_cache_key(user_id) -> str:
+    return f'pkl:profile:user:{user_id}'
+
+
+ACTIVE_LIST_VERSION_KEY = 'pkl:active-list-version'
+# Detik sebuah proses memakai versi yang sudah dibacanya sebelum membaca ulang.
+SHARED_VERSION_TTL = 1
+
+
+def invalidate_cached_pkl(user_id) -> None:
+    caches['local'].delete(_pkl_cache_key(user_id))
+
+
+def store_cached_pkl(pkl: PKL) -> None:
+    """Perbarui salinan cache setelah kolom PKL diubah lewat ``queryset.update()``."""
+    caches['local'].set(_pkl_cache_key(pkl.user_id), pkl, settings.AUTH_CACHE_TTL)
+
+
+def _shared_version_cache_key(key: str) -> str:
+    return f'shared-version:{key}'
+
+
+def shared_version(key: str) -> int:
+    """Version counter stored in ``CacheVersion``, so every process sees bumps.
+
+    Each process rereads it at most every ``SHARED_VERSION_TTL`` seconds.
+    """
+    def read():
+        version = CacheVersion.objects.filter(key=key).values_list('version', flat=True).first()
+        return version or 1
+
+    return caches['local'].get_or_set(_shared_version_cache_key(key), read, SHARED_VERSION_TTL)
+
+
+def bump_shared_version(key: str) -> int:
+    """Increment ``key`` and return the new version."""
+    with transaction.atomic():
+        if not CacheVersion.objects.filter(key=key).update(version=F('version') + 1):
+            try:
+                with transaction.atomic():
+                    CacheVersion.objects.create(key=key, version=2)
+            except IntegrityError:
+                CacheVersion.objects.filter(key=key).update(version=F('version') + 1)
+        # baris masih terkunci UPDATE di atas, jadi nilainya milik bump ini
+        version = CacheVersion.objects.filter(key=key).values_list('version', flat=True).get()
+    caches['local'].delete(_shared_version_cache_key(key))
+    return version
+
+
+def shared_versions(keys) -> dict[str, int]:
+    """:func:`shared_version` for many keys: one cache lookup, one query for misses."""
+    cache = caches['local']
+    cache_keys = {key: _shared_version_cache_key(key) for key in keys}
+    cached = cache.get_many(cache_keys.values())
+    versions = {key: cached[cache_key] for key, cache_key in cache_keys.items() if cache_key in cached}
+
+    missing = [key for key in cache_keys if key not in versions]
+    if missing:
+        stored = dict(CacheVersion.objects.filter(key__in=missing).values_list('key', 'version'))
+        fetched = {key: stored.get(key, 1) for key in missing}
+        cache.set_many({cache_keys[key]: version for key, version in fetched.items()}, SHARED_VERSION_TTL)
+        versions.update(fetched)
+    return versions
+
+
+def bump_shared_versions(keys) -> None:
+    """Increment every key in one upsert (rows locked in key order)."""
+    keys = sorted(set(keys))
+    if not keys:
+        return
+    quote = connection.ops.quote_name
+    table = quote(CacheVersion._meta.db_table)
+    sql = (
+        f"INSERT INTO {table} ({quote('key')}, {quote('version')}) "
+        f"VALUES {', '.join(['(%s, 2)'] * len(keys))} "
+        f"ON CONFLICT ({quote('key')}) DO UPDATE SET {quote('version')} = {table}.{quote('version')} + 1"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, keys)
+    caches['local'].delete_many([_shared_version_cache_key(key) for key in keys])
+
+
+def active_list_version() -> int:
+    """Versi himpunan PKL aktif; bagian dari key cache turunan (mis. tile peta)."""
+    return shared_version(ACTIVE_LIST_VERSION_KEY)
+
+
+def bump_active_list_version() -> None:
+    bump_shared_version(ACTIVE_LIST_VERSION_KEY)
+
+
+def get_request_pkl(request) -> PKL:
+    """Profil PKL milik ``request.user``, dari cache lokal bila ada.
+
+    Raises ``PKL.DoesNotExist`` seperti ``PKL.objects.get``. Instance yang
+    dikembalikan adalah salinan, jadi aman dimodifikasi lalu di-``save()``.
+    """
+    cache = caches['local']
+    key = _pkl_cache_key(request.user.pk)
+    pkl = cache.get(key)
+    if pkl is None:
+        pkl = PKL.objects.get(user=request.user)
+        cache.set(key, pkl, settings.AUTH_CACHE_TTL)
+    return pkl
+
+
+async def aget_request_pkl(request) -> PKL:
+    """Async counterpart of :func:`get_request_pkl`."""
+    cache = caches['local']
+    key = _pkl_cache_key(request.user.pk)
+    pkl = cache.get(key)
+    if pkl is None:
+        pkl = await PKL.objects.aget(user=request.user)
+        cache.set(key, pkl, settings.AUTH_CACHE_TTL)
+    return pkl
+
+
+def get_request_pkl_id(request) -> int:
+    """Id PKL milik ``request.user``; memakai klaim ``pkl_id`` token bila tersedia."""
+    token = getattr(request, 'auth', None)
+    pkl_id = token.get('pkl_id') if token is not None else None
+    if pkl_id:
+        return pkl_id
+    return get_request_pkl(request).pk
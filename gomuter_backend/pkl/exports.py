@@ -0,0 +1,139 @@
+"""Streaming CSV/NDJSON exports for admin data.
+
+Each dataset is a ``values_list`` query with the related columns joined in
+SQL, read through ``.iterator()`` so rows are encoded and sent as they come
+off the server-side cursor instead of being loaded into memory.
+"""
+import csv
+from datetime import datetime, time, timedelta
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+from .models import PKL, PKLDailyStats, PreOrder, PKLRating
+
+EXPORT_CHUNK_SIZE = 2000
+# Baris digabung per potongan agar tidak mengirim jutaan chunk kecil.
+EXPORT_LINES_PER_CHUNK = 500
+EXPORT_FORMATS = ('csv', 'ndjson')
+
+
+class _Echo:
+    """File-like object whose ``write`` just returns the value (for csv.writer)."""
+
+    def write(self, value):
+        return value
+
+
+def _filter_created(queryset, filters):
+    # Batas tanggal diubah ke rentang datetime agar index created_at terpakai.
+    if filters.get('from'):
+        start = timezone.make_aware(datetime.combine(filters['from'], time.min))
+        queryset = queryset.filter(created_at__gte=start)
+    if filters.get('to'):
+        end = timezone.make_aware(datetime.combine(filters['to'] + timedelta(days=1), time.min))
+        queryset = queryset.filter(created_at__lt=end)
+    if filters.get('pkl_id'):
+        queryset = queryset.filter(pkl_id=filters['pkl_id'])
+    return queryset
+
+
+def _pkl_rows(filters):
+    queryset = PKL.objects.order_by('id')
+    if filters.get('status_verifikasi'):
+        queryset = queryset.filter(status_verifikasi=filters['status_verifikasi'].upper())
+    if filters.get('status_aktif') is not None:
+        queryset = queryset.filter(status_aktif=filters['status_aktif'])
+    return queryset.values_list(
+        'id', 'user__username', 'user__email', 'nama_usaha', 'jenis_dagangan',
+        'jam_operasional', 'status_aktif', 'status_verifikasi',
+        'last_latitude', 'last_longitude', 'last_seen_at',
+    )
+
+
+def _stats_rows(filters):
+    queryset = PKLDailyStats.objects.order_by('date', 'pkl_id')
+    if filters.get('from'):
+        queryset = queryset.filter(date__gte=filters['from'])
+    if filters.get('to'):
+        queryset = queryset.filter(date__lte=filters['to'])
+    if filters.get('pkl_id'):
+        queryset = queryset.filter(pkl_id=filters['pkl_id'])
+    return queryset.values_list(
+        'pkl_id', 'pkl__nama_usaha', 'date', 'live_views', 'search_hits', 'auto_updates',
+    )
+
+
+def _preorder_rows(filters):
+    queryset = _filter_created(PreOrder.objects.order_by('id'), filters)
+    return queryset.values_list(
+        'id', 'pembeli__username', 'pkl_id', 'pkl__nama_usaha', 'status', 'dp_amount',
+        'dp_status', 'pickup_address', 'pickup_latitude', 'pickup_longitude',
+        'created_at', 'updated_at',
+    )
+
+
+def _rating_rows(filters):
+    queryset = _filter_created(PKLRating.objects.order_by('id'), filters)
+    return queryset.values_list(
+        'id', 'buyer__username', 'pkl_id', 'pkl__nama_usaha', 'score', 'comment', 'created_at',
+    )
+
+
+# dataset -> (header kolom, fungsi queryset)
+EXPORT_DATASETS = {
+    'pkls': (
+        ('id', 'username', 'email', 'nama_usaha', 'jenis_dagangan', 'jam_operasional',
+         'status_aktif', 'status_verifikasi', 'last_latitude', 'last_longitude', 'last_seen_at'),
+        _pkl_rows,
+    ),
+    'stats': (
+        ('pkl_id', 'nama_usaha', 'date', 'live_views', 'search_hits', 'auto_updates'),
+        _stats_rows,
+    ),
+    'preorders': (
+        ('id', 'pembeli', 'pkl_id', 'nama_usaha', 'status', 'dp_amount', 'dp_status',
+         'pickup_address', 'pickup_latitude', 'pickup_longitude', 'created_at', 'updated_at'),
+        _preorder_rows,
+    ),
+    'ratings': (
+        ('id', 'buyer', 'pkl_id', 'nama_usaha', 'score', 'comment', 'created_at'),
+        _rating_rows,
+    ),
+}
+
+
+def _batched(lines):
+    batch = []
+    for line in lines:
+        batch.append(line)
+        if len(batch) >= EXPORT_LINES_PER_CHUNK:
+            yield ''.join(batch)
+            batch = []
+    if batch:
+        yield ''.join(batch)
+
+
+def _csv_lines(header, rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(header)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def _ndjson_lines(header, rows):
+    encoder = DjangoJSONEncoder()
+    for row in rows:
+        yield encoder.encode(dict(zip(header, row))) + '\n'
+
+
+def export_response(dataset: str, output: str, filters: dict) -> StreamingHttpResponse:
+    header, build_queryset = EXPORT_DATASETS[dataset]
+    rows = build_queryset(filters).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    if output == 'ndjson':
+        response = StreamingHttpResponse(_batched(_ndjson_lines(header, rows)), content_type='application/x-ndjson')
+    else:
+        response = StreamingHttpResponse(_batched(_csv_lines(header, rows)), content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="gomuter-{dataset}.{output}"'
+    return response
@@ -0,0 +1,173 @@
+"""Shared proximity queries: vendors near a point, buyers near a point, batch distances.
+
+Active vendor positions live in a small per-process index bucketed by
+geohash cell. It is rebuilt from ``PKL.last_*`` whenever the active-list
+version changes or after ``VENDOR_INDEX_TTL_SECONDS``, and patched in place
+when this process records a ping. Buyer positions are too many to keep in
+memory; they are narrowed with a bounding box in SQL and streamed in chunks.
+"""
+import math
+import threading
+import time
+from dataclasses import dataclass
+from itertools import islice
+from typing import Iterable, Iterator, Optional
+
+from .cache import active_list_version
+from .models import PKL, BuyerLocation, ALLOWED_RADIUS_METERS, DEFAULT_RADIUS_METERS
+from .utils import encode_geohash, geohash_cell_count, geohash_cells_covering
+
+EARTH_RADIUS_M = 6371000.0
+# Sama dengan bola yang dipakai distances_m, agar bounding box tidak lebih
+# sempit dari radius haversine.
+METERS_PER_DEGREE = EARTH_RADIUS_M * math.pi / 180
+# Sel presisi 5 berukuran ~4.9 x 4.9 km; radius terbesar (1.5 km) hanya
+# menyentuh beberapa sel.
+VENDOR_INDEX_PRECISION = 5
+VENDOR_INDEX_TTL_SECONDS = 5
+# Di atas jumlah sel ini lebih murah memindai seluruh index.
+VENDOR_INDEX_MAX_CELLS = 64
+BUYER_CHUNK_SIZE = 1000
+
+
+@dataclass(frozen=True)
+class VendorPosition:
+    id: int
+    nama_usaha: str
+    latitude: float
+    longitude: float
+
+
+def bounding_box(latitude: float, longitude: float, radius_m: float) -> tuple[float, float, float, float]:
+    """Return ``(min_lat, min_lng, max_lat, max_lng)`` enclosing a circle of ``radius_m``."""
+    delta_lat = radius_m / METERS_PER_DEGREE
+    delta_lng = radius_m / (METERS_PER_DEGREE * max(math.cos(math.radians(latitude)), 0.01))
+    return latitude - delta_lat, longitude - delta_lng, latitude + delta_lat, longitude + delta_lng
+
+
+def distances_m(latitude: float, longitude: float, points: Iterable[tuple[float, float]]) -> list[float]:
+    """Haversine distance in meters from one point to many, origin terms computed once."""
+    sin, cos, asin, sqrt, radians = math.sin, math.cos, math.asin, math.sqrt, math.radians
+    phi1 = radians(latitude)
+    cos_phi1 = cos(phi1)
+    lambda1 = radians(longitude)
+    result = []
+    for lat, lng in points:
+        phi2 = radians(lat)
+        a = sin((phi2 - phi1) / 2) ** 2 + cos_phi1 * cos(phi2) * sin((radians(lng) - lambda1) / 2) ** 2
+        result.append(2 * EARTH_RADIUS_M * asin(sqrt(min(1.0, a))))
+    return result
+
+
+def pair_distances_m(pairs: Iterable[tuple[tuple[float, float], tuple[float, float]]]) -> list[Optional[float]]:
+    """Distance for each ``((lat, lng), (lat, lng))`` pair; ``None`` when a side is missing."""
+    result = []
+    for origin, target in pairs:
+        if None in (*origin, *target):
+            result.append(None)
+        else:
+            result.append(distances_m(origin[0], origin[1], [target])[0])
+    return result
+
+
+class _VendorPositionIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cells: dict[str, dict[int, VendorPosition]] = {}
+        self._cell_of: dict[int, str] = {}
+        self._version = None
+        self._loaded_at = 0.0
+
+    def _load(self, version) -> None:
+        rows = PKL.objects.filter(
+            status_aktif=True,
+            status_verifikasi='DITERIMA',
+            last_latitude__isnull=False,
+            last_longitude__isnull=False,
+        ).values_list('id', 'nama_usaha', 'last_latitude', 'last_longitude', 'geohash')
+        cells: dict[str, dict[int, VendorPosition]] = {}
+        cell_of = {}
+        for pkl_id, nama_usaha, latitude, longitude, geohash in rows:
+            cell = (geohash or encode_geohash(latitude, longitude))[:VENDOR_INDEX_PRECISION]
+            cells.setdefault(cell, {})[pkl_id] = VendorPosition(pkl_id, nama_usaha, latitude, longitude)
+            cell_of[pkl_id] = cell
+        self._cells, self._cell_of = cells, cell_of
+        self._version, self._loaded_at = version, time.monotonic()
+
+    def _fresh(self) -> None:
+        version = active_list_version()
+        with self._lock:
+            if version != self._version or time.monotonic() - self._loaded_at > VENDOR_INDEX_TTL_SECONDS:
+                self._load(version)
+
+    def record(self, pkl: PKL) -> None:
+        """Move an already indexed PKL after this process stored a new ping."""
+        with self._lock:
+            previous = self._cell_of.get(pkl.id)
+            if previous is None:
+                return
+            self._cells[previous].pop(pkl.id, None)
+            cell = pkl.geohash[:VENDOR_INDEX_PRECISION]
+            self._cells.setdefault(cell, {})[pkl.id] = VendorPosition(
+                pkl.id, pkl.nama_usaha, pkl.last_latitude, pkl.last_longitude,
+            )
+            self._cell_of[pkl.id] = cell
+
+    def candidates(self, min_lat: float, min_lng: float, max_lat: float, max_lng: float) -> list[VendorPosition]:
+        self._fresh()
+        with self._lock:
+            if geohash_cell_count(min_lat, min_lng, max_lat, max_lng, VENDOR_INDEX_PRECISION) > VENDOR_INDEX_MAX_CELLS:
+                return [position for cell in self._cells.values() for position in cell.values()]
+            cells = geohash_cells_covering(min_lat, min_lng, max_lat, max_lng, VENDOR_INDEX_PRECISION)
+            return [position for cell in cells for position in self._cells.get(cell, {}).values()]
+
+
+vendor_index = _VendorPositionIndex()
+
+
+def record_vendor_position(pkl: PKL) -> None:
+    vendor_index.record(pkl)
+
+
+def vendors_near_point(latitude: float, longitude: float, radius_m: float) -> list[tuple[VendorPosition, float]]:
+    """Active, verified vendors within ``radius_m`` of a point, nearest first."""
+    candidates = vendor_index.candidates(*bounding_box(latitude, longitude, radius_m))
+    if not candidates:
+        return []
+    distances = distances_m(latitude, longitude, ((c.latitude, c.longitude) for c in candidates))
+    nearby = [(candidate, distance) for candidate, distance in zip(candidates, distances) if distance <= radius_m]
+    nearby.sort(key=lambda item: item[1])
+    return nearby
+
+
+def buyers_near_point(
+    latitude: float,
+    longitude: float,
+    buyers=None,
+    radius_m: Optional[float] = None,
+    chunk_size: int = BUYER_CHUNK_SIZE,
+) -> Iterator[list[tuple[int, float, int]]]:
+    """Yield chunks of ``(buyer_id, distance_m, radius_m)`` for buyers near a point.
+
+    ``buyers`` narrows the search (a ``BuyerLocation`` queryset). With
+    ``radius_m=None`` each buyer's own radius decides whether the point is
+    "near" them, which is what notifications need.
+    """
+    search_radius = radius_m or max(ALLOWED_RADIUS_METERS)
+    min_lat, min_lng, max_lat, max_lng = bounding_box(latitude, longitude, search_radius)
+    queryset = BuyerLocation.objects.all() if buyers is None else buyers
+    rows = (
+        queryset.filter(latitude__range=(min_lat, max_lat), longitude__range=(min_lng, max_lng))
+        .values_list('buyer_id', 'latitude', 'longitude', 'radius_m')
+        .iterator(chunk_size=chunk_size)
+    )
+
+    while chunk := list(islice(rows, chunk_size)):
+        distances = distances_m(latitude, longitude, ((lat, lng) for _, lat, lng, _ in chunk))
+        matches = []
+        for (buyer_id, _, _, buyer_radius), distance in zip(chunk, distances):
+            limit = radius_m or buyer_radius or DEFAULT_RADIUS_METERS
+            if distance <= limit:
+                matches.append((buyer_id, distance, buyer_radius or DEFAULT_RADIUS_METERS))
+        if matches:
+            yield matches
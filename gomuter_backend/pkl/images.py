@@ -0,0 +1,113 @@
+import io
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, transaction
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from .models import PKLProduct
+
+logger = logging.getLogger(__name__)
+
+# Ukuran maksimum (lebar, tinggi) setiap varian gambar produk.
+PRODUCT_IMAGE_VARIANTS = {
+    'image_thumbnail': (240, 240),
+    'image_medium': (960, 960),
+}
+VARIANT_JPEG_QUALITY = 80
+
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='pkl-images')
+
+
+def render_variant(source, max_size: tuple[int, int]) -> bytes:
+    """Downscale an image file object to fit ``max_size`` and re-encode as JPEG."""
+    source.seek(0)
+    with Image.open(source) as img:
+        # JPEG decoder can scale while decoding, so large photos never fully load.
+        img.draft('RGB', max_size)
+        img = ImageOps.exif_transpose(img)
+        img.thumbnail(max_size, Image.Resampling.LANCZOS)
+        if img.mode in ('RGBA', 'LA', 'P'):
+            img = img.convert('RGBA')
+            background = Image.new('RGB', img.size, (255, 255, 255))
+            background.paste(img, mask=img.getchannel('A'))
+            img = background
+        elif img.mode != 'RGB':
+            img = img.convert('RGB')
+
+        buffer = io.BytesIO()
+        img.save(buffer, 'JPEG', quality=VARIANT_JPEG_QUALITY, optimize=True, progressive=True)
+    return buffer.getvalue()
+
+
+def delete_product_variants(product: PKLProduct) -> None:
+    for field_name in PRODUCT_IMAGE_VARIANTS:
+        field_file = getattr(product, field_name)
+        if field_file:
+            field_file.delete(save=False)
+        setattr(product, field_name, None)
+
+
+def generate_product_variants(product_id: int) -> Optional[dict]:
+    """Build every variant for a product image.
+
+    Returns byte sizes keyed by ``original`` and variant field name, or ``None``
+    when the product has no readable image.
+    """
+    product = PKLProduct.objects.filter(pk=product_id).first()
+    if product is None or not product.image:
+        return None
+
+    source_name = product.image.name
+    base_name = os.path.splitext(os.path.basename(source_name))[0]
+    sizes = {'original': product.image.size}
+
+    try:
+        with product.image.open('rb') as source:
+            rendered = {
+                field_name: render_variant(source, max_size)
+                for field_name, max_size in PRODUCT_IMAGE_VARIANTS.items()
+            }
+    except (UnidentifiedImageError, OSError):
+        logger.warning('Gambar produk %s tidak bisa diproses', product_id, exc_info=True)
+        return None
+
+    old_names = [getattr(product, name).name for name in PRODUCT_IMAGE_VARIANTS]
+    saved = {}
+    for field_name, content in rendered.items():
+        suffix = field_name.replace('image_', '')
+        field_file = getattr(product, field_name)
+        field_file.save(f'{base_name}_{suffix}.jpg', ContentFile(content), save=False)
+        saved[field_name] = field_file.name
+        sizes[field_name] = len(content)
+
+    # Gambar bisa diganti selama proses; jangan timpa varian milik gambar baru.
+    updated = PKLProduct.objects.filter(pk=product_id, image=source_name).update(**saved)
+    if not updated:
+        for field_name in PRODUCT_IMAGE_VARIANTS:
+            getattr(product, field_name).delete(save=False)
+        return None
+
+    for old_name in old_names:
+        if old_name and old_name not in saved.values():
+            product.image.storage.delete(old_name)
+    return sizes
+
+
+def _generate_in_background(product_id: int) -> None:
+    close_old_connections()
+    try:
+        generate_product_variants(product_id)
+    except Exception:
+        logger.exception('Gagal membuat varian gambar produk %s', product_id)
+    finally:
+        close_old_connections()
+
+
+def schedule_product_variants(product: PKLProduct) -> None:
+    """Generate variants off the request thread once the upload is committed."""
+    product_id = product.pk
+    transaction.on_commit(lambda: _executor.submit(_generate_in_background, product_id))
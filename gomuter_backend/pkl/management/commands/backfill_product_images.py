@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from pkl.images import generate_product_variants
+from pkl.models import PKLProduct
+
+
+class Command(BaseCommand):
+    help = 'Buat varian thumbnail/medium untuk gambar produk yang sudah ada.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Proses ulang produk yang sudah punya varian.',
+        )
+
+    def handle(self, *args, **options):
+        products = PKLProduct.objects.exclude(image='').exclude(image__isnull=True)
+        if not options['force']:
+            products = products.filter(
+                Q(image_thumbnail='') | Q(image_thumbnail__isnull=True)
+                | Q(image_medium='') | Q(image_medium__isnull=True)
+            )
+
+        processed = failed = 0
+        original_total = thumbnail_total = medium_total = 0
+        for product_id in products.values_list('id', flat=True).iterator():
+            sizes = generate_product_variants(product_id)
+            if sizes is None:
+                failed += 1
+                continue
+            processed += 1
+            original_total += sizes['original']
+            thumbnail_total += sizes['image_thumbnail']
+            medium_total += sizes['image_medium']
+
+        self.stdout.write(f'Produk diproses: {processed}, gagal: {failed}')
+        self.stdout.write(f'Total gambar asli: {original_total} bytes')
+        self.stdout.write(
+            f'Thumbnail: {thumbnail_total} bytes '
+            f'(hemat {original_total - thumbnail_total} bytes per tampilan daftar)'
+        )
+        self.stdout.write(
+            f'Medium: {medium_total} bytes '
+            f'(hemat {original_total - medium_total} bytes per tampilan detail)'
+        )
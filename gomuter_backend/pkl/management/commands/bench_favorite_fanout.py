@@ -0,0 +1,86 @@
+import random
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from pkl.models import PKL, LokasiPKL, BuyerLocation, FavoritePKL, ALLOWED_RADIUS_METERS
+from pkl.services import notify_favorite_pkl_active
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Ukur waktu notifikasi "PKL favorit aktif" untuk PKL dengan banyak '
+        'pengikut. Data sintetis dibuat di dalam transaksi lalu di-rollback.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--followers', type=int, default=10000)
+        parser.add_argument(
+            '--nearby-ratio', type=float, default=0.2,
+            help='Porsi pengikut yang berada di sekitar PKL (sisanya tersebar jauh).',
+        )
+        parser.add_argument('--repeat', type=int, default=3, help='Jumlah pengulangan yang diukur.')
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        followers = options['followers']
+        center_lat, center_lng = -6.2, 106.8
+
+        try:
+            with transaction.atomic():
+                vendor = User.objects.create(username='bench_fanout_pkl', role='PKL')
+                pkl = PKL.objects.create(
+                    user=vendor,
+                    nama_usaha='Benchmark Fan-out',
+                    jenis_dagangan='benchmark',
+                    jam_operasional='00:00-23:59',
+                    status_verifikasi='DITERIMA',
+                    status_aktif=True,
+                    last_latitude=center_lat,
+                    last_longitude=center_lng,
+                    last_seen_at=timezone.now(),
+                )
+                LokasiPKL.objects.create(pkl=pkl, latitude=center_lat, longitude=center_lng)
+                buyers = User.objects.bulk_create(
+                    [User(username=f'bench_fanout_{i}', role='USER') for i in range(followers)],
+                    batch_size=5000,
+                )
+                locations = []
+                for buyer in buyers:
+                    # sekitar 2 km untuk yang "dekat", sampai ~50 km untuk sisanya
+                    spread = 0.02 if random.random() < options['nearby_ratio'] else 0.5
+                    locations.append(BuyerLocation(
+                        buyer=buyer,
+                        latitude=center_lat + random.uniform(-spread, spread),
+                        longitude=center_lng + random.uniform(-spread, spread),
+                        radius_m=random.choice(ALLOWED_RADIUS_METERS),
+                    ))
+                BuyerLocation.objects.bulk_create(locations, batch_size=5000)
+                FavoritePKL.objects.bulk_create(
+                    [FavoritePKL(buyer=buyer, pkl=pkl) for buyer in buyers],
+                    batch_size=5000,
+                )
+
+                for run in range(options['repeat']):
+                    with CaptureQueriesContext(connection) as queries:
+                        started = time.perf_counter()
+                        created = notify_favorite_pkl_active(pkl)
+                        elapsed_ms = (time.perf_counter() - started) * 1000
+                    # run pertama membuat notifikasi; berikutnya terkena cooldown
+                    self.stdout.write(
+                        f'run {run + 1}: {elapsed_ms:.1f} ms, {len(queries)} query, '
+                        f'{len(created)} notifikasi dibuat'
+                    )
+                raise _Rollback()
+        except _Rollback:
+            pass
+
+        self.stdout.write(f'{followers} pengikut, data benchmark sudah di-rollback.')
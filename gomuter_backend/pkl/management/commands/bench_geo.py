@@ -0,0 +1,127 @@
+import random
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from pkl import geo
+from pkl.cache import bump_active_list_version
+from pkl.models import PKL, BuyerLocation, ALLOWED_RADIUS_METERS
+from pkl.utils import encode_geohash
+
+
+class _Rollback(Exception):
+    pass
+
+
+def _random_point(center_lat: float, center_lng: float, spread: float) -> tuple[float, float]:
+    return center_lat + random.uniform(-spread, spread), center_lng + random.uniform(-spread, spread)
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark modul pkl.geo (PKL/pembeli di sekitar titik, jarak batch) '
+        'dengan data sintetis yang di-rollback setelahnya.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--vendors', type=int, default=5000, help='Jumlah PKL aktif.')
+        parser.add_argument('--buyers', type=int, default=50000, help='Jumlah lokasi pembeli.')
+        parser.add_argument('--queries', type=int, default=1000, help='Jumlah query titik acak.')
+        parser.add_argument('--spread', type=float, default=0.3, help='Sebaran koordinat (derajat).')
+
+    def _timed(self, label, func, repeat=1):
+        samples = []
+        result = None
+        with CaptureQueriesContext(connection) as queries:
+            for _ in range(repeat):
+                started = time.perf_counter()
+                result = func()
+                samples.append((time.perf_counter() - started) * 1000)
+        p95 = sorted(samples)[max(int(len(samples) * 0.95) - 1, 0)]
+        self.stdout.write(
+            f'{label}: avg {statistics.mean(samples):.3f} ms, p95 {p95:.3f} ms, '
+            f'{len(queries) / repeat:.1f} query/panggilan'
+        )
+        return result
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        center_lat, center_lng, spread = -6.2, 106.8, options['spread']
+
+        try:
+            with transaction.atomic():
+                vendor_users = User.objects.bulk_create(
+                    [User(username=f'bench_geo_pkl_{i}', role='PKL') for i in range(options['vendors'])],
+                    batch_size=5000,
+                )
+                now = timezone.now()
+                vendors = []
+                for i, user in enumerate(vendor_users):
+                    latitude, longitude = _random_point(center_lat, center_lng, spread)
+                    vendors.append(PKL(
+                        user=user,
+                        nama_usaha=f'PKL {i}',
+                        jenis_dagangan='benchmark',
+                        jam_operasional='00:00-23:59',
+                        status_aktif=True,
+                        status_verifikasi='DITERIMA',
+                        last_latitude=latitude,
+                        last_longitude=longitude,
+                        last_seen_at=now,
+                        geohash=encode_geohash(latitude, longitude),
+                    ))
+                PKL.objects.bulk_create(vendors, batch_size=5000)
+
+                buyer_users = User.objects.bulk_create(
+                    [User(username=f'bench_geo_buyer_{i}', role='USER') for i in range(options['buyers'])],
+                    batch_size=5000,
+                )
+                BuyerLocation.objects.bulk_create([
+                    BuyerLocation(
+                        buyer=user,
+                        latitude=point[0],
+                        longitude=point[1],
+                        radius_m=random.choice(ALLOWED_RADIUS_METERS),
+                    )
+                    for user in buyer_users
+                    for point in [_random_point(center_lat, center_lng, spread)]
+                ], batch_size=5000)
+                bump_active_list_version()
+
+                points = [_random_point(center_lat, center_lng, spread) for _ in range(options['queries'])]
+                self.stdout.write(
+                    f"{options['vendors']} PKL aktif, {options['buyers']} pembeli, "
+                    f"{options['queries']} titik acak"
+                )
+
+                self._timed('vendor index (cold)', lambda: geo.vendors_near_point(center_lat, center_lng, 1000))
+                for radius in ALLOWED_RADIUS_METERS:
+                    iterator = iter(points)
+                    found = []
+                    self._timed(
+                        f'vendors_near_point r={radius} m',
+                        lambda: found.append(len(geo.vendors_near_point(*next(iterator), radius))),
+                        repeat=len(points),
+                    )
+                    self.stdout.write(f'  rata-rata {statistics.mean(found):.1f} PKL per titik')
+
+                iterator = iter(points[:50])
+                self._timed(
+                    'buyers_near_point (radius masing-masing pembeli)',
+                    lambda: sum(len(chunk) for chunk in geo.buyers_near_point(*next(iterator))),
+                    repeat=min(50, len(points)),
+                )
+
+                pairs = [(points[i], points[-i - 1]) for i in range(len(points))]
+                self._timed(f'pair_distances_m ({len(pairs)} pasangan)', lambda: geo.pair_distances_m(pairs), repeat=10)
+                raise _Rollback()
+        except _Rollback:
+            pass
+
+        bump_active_list_version()
+        self.stdout.write('Data benchmark sudah di-rollback.')
@@ -0,0 +1,139 @@
+import json
+import random
+import statistics
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from pkl.models import PKL
+
+ENDPOINTS = {
+    'pkl': '/api/pkl/update-location/',
+    'buyer': '/api/pkl/buyer/location/',
+}
+# pkl.views_async, untuk dibandingkan saat server dijalankan lewat ASGI
+ASYNC_ENDPOINTS = {
+    'pkl': '/api/pkl/async/update-location/',
+    'buyer': '/api/pkl/async/buyer/location/',
+}
+
+
+def _bench_user(username: str, role: str):
+    User = get_user_model()
+    user, created = User.objects.get_or_create(
+        username=username,
+        defaults={'role': role, 'email': f'{username}@gomuter.local'},
+    )
+    if created:
+        user.set_unusable_password()
+        user.save(update_fields=['password'])
+    if role == 'PKL':
+        PKL.objects.get_or_create(
+            user=user,
+            defaults={
+                'nama_usaha': 'Benchmark PKL',
+                'jenis_dagangan': 'benchmark',
+                'jam_operasional': '00:00-23:59',
+                'status_verifikasi': 'DITERIMA',
+            },
+        )
+    return user
+
+
+class Command(BaseCommand):
+    help = (
+        'Ukur throughput endpoint ping lokasi pada server yang sedang berjalan. '
+        'Jalankan server dua kali (mis. GOMUTER_DB_CONN_MAX_AGE=0 lalu '
+        'GOMUTER_DB_POOL=true) untuk membandingkan konfigurasi koneksi. '
+        'Untuk membandingkan WSGI dan ASGI per worker, jalankan satu worker '
+        '(mis. "gunicorn -w 1 gomuter_backend.wsgi" lalu "uvicorn --workers 1 '
+        'gomuter_backend.asgi:application") dan ukur dengan --variant sync/async '
+        'serta beberapa nilai --concurrency. '
+        'Set GOMUTER_LOCATION_THROTTLE=false dan GOMUTER_*_PING_MIN_INTERVAL=0 '
+        'pada server agar ping tidak ditolak/digabung.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000', help='Base URL server.')
+        parser.add_argument('--endpoint', choices=sorted(ENDPOINTS), default='pkl')
+        parser.add_argument(
+            '--variant', choices=('sync', 'async'), default='sync',
+            help='sync = view DRF, async = pkl.views_async (butuh server ASGI agar bermakna).',
+        )
+        parser.add_argument('--requests', type=int, default=500, help='Jumlah request per tingkat concurrency.')
+        parser.add_argument(
+            '--concurrency', type=int, nargs='+', default=[8],
+            help='Satu atau beberapa tingkat koneksi bersamaan, mis. 8 32 128.',
+        )
+        parser.add_argument('--timeout', type=float, default=30.0, help='Timeout per request (detik).')
+
+    def handle(self, *args, **options):
+        role = 'PKL' if options['endpoint'] == 'pkl' else 'USER'
+        user = _bench_user(f"bench_{options['endpoint']}", role)
+        token = str(RefreshToken.for_user(user).access_token)
+        endpoints = ASYNC_ENDPOINTS if options['variant'] == 'async' else ENDPOINTS
+        url = options['url'].rstrip('/') + endpoints[options['endpoint']]
+        timeout = options['timeout']
+
+        def ping(_):
+            payload = json.dumps({
+                'latitude': round(-6.2 + random.uniform(-0.01, 0.01), 6),
+                'longitude': round(106.8 + random.uniform(-0.01, 0.01), 6),
+            }).encode()
+            request = urllib.request.Request(
+                url,
+                data=payload,
+                method='POST',
+                headers={'Content-Type': 'application/json', 'Authorization': f'Bearer {token}'},
+            )
+            start = time.perf_counter()
+            try:
+                with urllib.request.urlopen(request, timeout=timeout) as response:
+                    response.read()
+                    code, timing = response.status, response.headers.get('Server-Timing', '')
+            except urllib.error.HTTPError as exc:
+                code, timing = exc.code, exc.headers.get('Server-Timing', '')
+            except OSError:
+                code, timing = 0, ''
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            acquire_ms = None
+            if 'dur=' in timing:
+                acquire_ms = float(timing.split('dur=', 1)[1].split(',', 1)[0])
+            return code, elapsed_ms, acquire_ms
+
+        self.stdout.write(f'URL: {url}')
+        served = []
+        for concurrency in options['concurrency']:
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                results = list(executor.map(ping, range(options['requests'])))
+            wall = time.perf_counter() - started
+
+            latencies = sorted(elapsed for _, elapsed, _ in results)
+            acquires = [acquire for _, _, acquire in results if acquire is not None]
+            codes = {}
+            for code, _, _ in results:
+                codes[code] = codes.get(code, 0) + 1
+
+            self.stdout.write(f"Request: {len(results)}, concurrency: {concurrency}, status: {codes}")
+            self.stdout.write(f'Throughput: {len(results) / wall:.1f} req/s')
+            self.stdout.write(
+                f'Latency p50: {statistics.median(latencies):.1f} ms, '
+                f'p95: {latencies[int(len(latencies) * 0.95) - 1]:.1f} ms'
+            )
+            if acquires:
+                self.stdout.write(f'DB acquire avg: {statistics.mean(acquires):.2f} ms, max: {max(acquires):.2f} ms')
+            # status 0 = koneksi ditolak/timeout; 5xx = worker kewalahan
+            if not any(code == 0 or code >= 500 for code in codes):
+                served.append(concurrency)
+
+        if len(options['concurrency']) > 1:
+            self.stdout.write(
+                f"Concurrency tertinggi tanpa error ({options['variant']}): "
+                f"{max(served) if served else '-'}"
+            )
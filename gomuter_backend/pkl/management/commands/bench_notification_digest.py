@@ -0,0 +1,127 @@
+import random
+import time
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from pkl.cache import bump_active_list_version
+from pkl.models import PKL, BuyerLocation, Notification, ALLOWED_RADIUS_METERS
+from pkl.serializers import NotificationSerializer
+from pkl.services import notify_nearby_pkls
+from pkl.utils import encode_geohash
+
+
+class _Rollback(Exception):
+    pass
+
+
+class _QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class Command(BaseCommand):
+    help = (
+        'Bandingkan pertumbuhan baris Notification per pembeli aktif per jam '
+        'antara notifikasi per PKL dan mode ringkasan (digest_enabled). Ping '
+        'pembeli disimulasikan dengan jam tiruan; data di-rollback setelahnya.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--vendors', type=int, default=100, help='Jumlah PKL aktif di area padat.')
+        parser.add_argument('--buyers', type=int, default=100, help='Jumlah pembeli aktif.')
+        parser.add_argument('--spread', type=float, default=0.005, help='Sebaran koordinat (derajat, ~550 m).')
+        parser.add_argument('--hours', type=float, default=1.0, help='Lama simulasi (jam).')
+        parser.add_argument('--ping-interval', type=int, default=60, help='Jarak antar ping pembeli (detik).')
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        center_lat, center_lng, spread = -6.2, 106.8, options['spread']
+        steps = int(options['hours'] * 3600 // options['ping_interval'])
+        buyer_hours = options['buyers'] * options['hours']
+
+        try:
+            with transaction.atomic():
+                vendor_users = User.objects.bulk_create(
+                    [User(username=f'bench_digest_pkl_{i}', role='PKL') for i in range(options['vendors'])],
+                    batch_size=5000,
+                )
+                vendors = []
+                for i, user in enumerate(vendor_users):
+                    latitude = center_lat + random.uniform(-spread, spread)
+                    longitude = center_lng + random.uniform(-spread, spread)
+                    vendors.append(PKL(
+                        user=user,
+                        nama_usaha=f'PKL {i}',
+                        jenis_dagangan='benchmark',
+                        jam_operasional='00:00-23:59',
+                        status_aktif=True,
+                        status_verifikasi='DITERIMA',
+                        last_latitude=latitude,
+                        last_longitude=longitude,
+                        last_seen_at=timezone.now(),
+                        geohash=encode_geohash(latitude, longitude),
+                    ))
+                PKL.objects.bulk_create(vendors, batch_size=5000)
+
+                buyer_users = User.objects.bulk_create(
+                    [User(username=f'bench_digest_buyer_{i}', role='USER') for i in range(options['buyers'])],
+                    batch_size=5000,
+                )
+                locations = BuyerLocation.objects.bulk_create([
+                    BuyerLocation(
+                        buyer=user,
+                        latitude=center_lat + random.uniform(-spread, spread),
+                        longitude=center_lng + random.uniform(-spread, spread),
+                        radius_m=random.choice(ALLOWED_RADIUS_METERS),
+                    )
+                    for user in buyer_users
+                ], batch_size=5000)
+                # muat ulang index posisi vendor (geo.vendor_index)
+                bump_active_list_version()
+                self.stdout.write(
+                    f"{options['vendors']} PKL, {options['buyers']} pembeli, {steps} ping/pembeli "
+                    f"selama {options['hours']:g} jam"
+                )
+
+                for digest_enabled in (False, True):
+                    for location in locations:
+                        location.digest_enabled = digest_enabled
+                    notifications = Notification.objects.filter(buyer__in=buyer_users)
+                    notifications.delete()
+
+                    # tiap mode mulai dari jam tiruan yang sama dan tabel kosong
+                    clock = timezone.now()
+                    queries = _QueryCounter()
+                    started = time.perf_counter()
+                    with mock.patch('django.utils.timezone.now') as fake_now, connection.execute_wrapper(queries):
+                        for step in range(steps):
+                            fake_now.return_value = clock + timedelta(seconds=step * options['ping_interval'])
+                            for location in locations:
+                                notify_nearby_pkls(location)
+                    elapsed = time.perf_counter() - started
+
+                    rows = notifications.count()
+                    sample = list(notifications.filter(buyer=buyer_users[0]).order_by('-created_at')[:50])
+                    feed_bytes = len(JSONRenderer().render(NotificationSerializer(sample, many=True).data))
+                    pings = steps * len(locations)
+                    self.stdout.write(
+                        f"{'digest' if digest_enabled else 'per PKL'}: {rows} baris, "
+                        f'{rows / buyer_hours:.1f} baris/pembeli-jam, '
+                        f'feed 50 teratas {feed_bytes} byte, '
+                        f'{queries.count / pings:.1f} query/ping, {elapsed * 1000 / pings:.2f} ms/ping'
+                    )
+                raise _Rollback()
+        except _Rollback:
+            pass
+
+        self.stdout.write('Data benchmark sudah di-rollback.')
@@ -0,0 +1,41 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+
+from pkl import ranking
+
+
+def _synthetic_features(size: int) -> dict[str, list]:
+    rated = [random.random() < 0.6 for _ in range(size)]
+    return {
+        'id': list(range(size)),
+        'text': [random.uniform(0.45, 1.0) for _ in range(size)],
+        'distance_m': [random.uniform(0, 3000) if random.random() < 0.9 else None for _ in range(size)],
+        'rating_avg': [random.uniform(1, 5) if has else None for has in rated],
+        'rating_count': [random.randint(1, 200) if has else 0 for has in rated],
+        'age_s': [random.uniform(0, 3600) for _ in range(size)],
+    }
+
+
+class Command(BaseCommand):
+    help = 'Benchmark pkl.ranking.score untuk beberapa ukuran himpunan kandidat sintetis (tanpa database).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='50,200,1000,10000', help='Ukuran kandidat, dipisah koma.')
+        parser.add_argument('--repeat', type=int, default=200, help='Jumlah pengulangan per ukuran.')
+
+    def handle(self, *args, **options):
+        rating_mean = ranking.DEFAULT_RATING_MEAN
+        for size in (int(value) for value in options['sizes'].split(',')):
+            features = _synthetic_features(size)
+            samples = []
+            for _ in range(options['repeat']):
+                started = time.perf_counter()
+                ranking.order(features, rating_mean=rating_mean)
+                samples.append((time.perf_counter() - started) * 1000)
+            p95 = sorted(samples)[max(int(len(samples) * 0.95) - 1, 0)]
+            self.stdout.write(
+                f'{size} kandidat: avg {statistics.mean(samples):.3f} ms, p95 {p95:.3f} ms (skor + urut)'
+            )
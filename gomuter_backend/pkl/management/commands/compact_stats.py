@@ -0,0 +1,54 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Min
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from pkl.models import PKLDailyStats
+from pkl.stats import compact, prune_hourly
+
+
+class Command(BaseCommand):
+    help = (
+        'Ringkas statistik per jam ke tabel harian, mingguan dan bulanan. '
+        'Jadwalkan berkala (mis. tiap jam via cron); hari ini selalu dibaca '
+        'langsung dari tabel per jam.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=2,
+            help='Jumlah hari tertutup terakhir yang diringkas ulang (default 2).',
+        )
+        parser.add_argument('--since', help='Ringkas mulai tanggal ini (YYYY-MM-DD), menggantikan --days.')
+        parser.add_argument(
+            '--rebuild-rollups', action='store_true',
+            help='Ringkas ulang sejak data harian pertama (sekali setelah deploy).',
+        )
+        parser.add_argument(
+            '--keep-hourly-days', type=int, default=14,
+            help='Hapus baris per jam yang lebih lama dari N hari (0 = jangan hapus).',
+        )
+
+    def handle(self, *args, **options):
+        yesterday = timezone.localdate() - timedelta(days=1)
+        if options['rebuild_rollups']:
+            start = PKLDailyStats.objects.aggregate(first=Min('date'))['first'] or yesterday
+        elif options['since']:
+            start = parse_date(options['since'])
+            if start is None:
+                raise CommandError('--since harus berformat YYYY-MM-DD.')
+        else:
+            start = yesterday - timedelta(days=max(options['days'], 1) - 1)
+
+        result = compact(start, yesterday)
+
+        self.stdout.write(
+            f"Diringkas sejak {start.isoformat()}: {result['days']} baris harian, "
+            f"{result['weeks']} mingguan, {result['months']} bulanan."
+        )
+
+        if options['keep_hourly_days'] > 0:
+            deleted = prune_hourly(options['keep_hourly_days'])
+            self.stdout.write(f'{deleted} baris per jam lama dihapus.')
@@ -0,0 +1,113 @@
+import math
+from collections import defaultdict
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from gomuter_backend.db_router import use_replica
+from pkl import ranking
+from pkl.models import Chat, FavoritePKL, PKLRating, PKLSearchLog, PreOrder
+
+
+def _parse_weights(raw: str) -> dict[str, float]:
+    weights = {}
+    for part in raw.split(','):
+        name, _, value = part.partition('=')
+        name = name.strip()
+        if name not in ranking.COMPONENTS:
+            raise CommandError(f'Komponen "{name}" tidak dikenal; pilih dari {", ".join(ranking.COMPONENTS)}.')
+        try:
+            weights[name] = float(value)
+        except ValueError:
+            raise CommandError(f'Bobot "{part}" harus berformat nama=angka.')
+    return weights
+
+
+class Command(BaseCommand):
+    help = (
+        'Evaluasi ranking pencarian secara offline: putar ulang PKLSearchLog '
+        'dengan beberapa set bobot. Sebuah PKL dianggap relevan bila pembeli '
+        'yang sama memfavoritkan, memesan, mengajak chat atau memberi rating '
+        'PKL tersebut tidak lama setelah pencarian.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=30, help='Ambil log pencarian N hari terakhir.')
+        parser.add_argument(
+            '--window-minutes', type=int, default=30,
+            help='Interaksi dalam rentang ini setelah pencarian dihitung sebagai relevan.',
+        )
+        parser.add_argument('--k', type=int, default=10, help='Cutoff untuk NDCG@k dan Hit@k.')
+        parser.add_argument('--limit', type=int, default=20000, help='Maksimum log yang diputar ulang.')
+        parser.add_argument(
+            '--weights', action='append', default=[],
+            help='Set bobot tambahan, mis. "text=0.5,distance=0.3,rating=0.1,freshness=0.1". Boleh diulang.',
+        )
+
+    def _interactions(self, buyer_ids, since) -> dict[int, list]:
+        """``buyer_id -> [(waktu, pkl_id)]`` dari semua sinyal keterlibatan."""
+        sources = (
+            (FavoritePKL.objects, 'buyer_id'),
+            (PreOrder.objects, 'pembeli_id'),
+            (Chat.objects, 'pembeli_id'),
+            (PKLRating.objects, 'buyer_id'),
+        )
+        events = defaultdict(list)
+        for manager, buyer_field in sources:
+            rows = manager.filter(
+                **{f'{buyer_field}__in': buyer_ids}, created_at__gte=since,
+            ).values_list(buyer_field, 'created_at', 'pkl_id')
+            for buyer_id, created_at, pkl_id in rows.iterator(chunk_size=5000):
+                events[buyer_id].append((created_at, pkl_id))
+        return events
+
+    def handle(self, *args, **options):
+        # analitik baca saja: pakai replica bila dikonfigurasi
+        with use_replica():
+            self._evaluate(options)
+
+    def _evaluate(self, options):
+        since = timezone.now() - timedelta(days=options['days'])
+        window = timedelta(minutes=options['window_minutes'])
+        k = options['k']
+
+        configs = {'teks saja': {'text': 1.0}, 'settings': None}
+        for raw in options['weights']:
+            configs[raw] = _parse_weights(raw)
+
+        logs = list(
+            PKLSearchLog.objects.filter(created_at__gte=since, buyer__isnull=False)
+            .order_by('-created_at')
+            .values_list('buyer_id', 'created_at', 'features', 'rating_mean')[:options['limit']]
+        )
+        events = self._interactions({buyer_id for buyer_id, *_ in logs}, since)
+
+        cases = []
+        for buyer_id, created_at, features, rating_mean in logs:
+            candidates = set(features.get('id', []))
+            relevant = {
+                pkl_id for at, pkl_id in events.get(buyer_id, ())
+                if created_at <= at <= created_at + window and pkl_id in candidates
+            }
+            if relevant:
+                cases.append((features, rating_mean, relevant))
+
+        self.stdout.write(f'{len(logs)} log pencarian, {len(cases)} dengan interaksi relevan.')
+        if not cases:
+            return
+
+        ideal = [1 / math.log2(i + 2) for i in range(k)]
+        for label, weights in configs.items():
+            mrr = ndcg = hits = 0.0
+            for features, rating_mean, relevant in cases:
+                ranked = ranking.order(features, weights, rating_mean)
+                positions = [i for i, pkl_id in enumerate(ranked) if pkl_id in relevant]
+                mrr += 1 / (positions[0] + 1)
+                dcg = sum(ideal[i] for i in positions if i < k)
+                ndcg += dcg / sum(ideal[:min(len(relevant), k)])
+                hits += 1 if positions[0] < k else 0
+            total = len(cases)
+            self.stdout.write(
+                f'{label}: MRR {mrr / total:.4f}, NDCG@{k} {ndcg / total:.4f}, Hit@{k} {hits / total:.4f}'
+            )
@@ -0,0 +1,66 @@
+import json
+from collections import Counter
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Count
+from django.utils import timezone
+
+from pkl.models import Notification
+
+
+class Command(BaseCommand):
+    help = (
+        'Hapus notifikasi yang sudah kedaluwarsa (Notification.expires_at, lihat '
+        'settings.NOTIFICATION_TTL_MINUTES) per batch, opsional diarsipkan dulu '
+        'ke file JSON Lines. Notifikasi PKL terdekat berumur menit, riwayat PKL '
+        'favorit disimpan sesuai GOMUTER_NOTIF_FAVORITE_RETENTION_DAYS. '
+        'Jalankan berkala via cron (mis. tiap 10 menit).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000, help='Jumlah baris per DELETE.')
+        parser.add_argument(
+            '--archive',
+            help='Tambahkan baris yang dihapus ke file JSON Lines ini sebelum dihapus.',
+        )
+        parser.add_argument('--dry-run', action='store_true', help='Hitung saja tanpa menghapus.')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size minimal 1.')
+
+        now = timezone.now()
+        expired = Notification.objects.filter(expires_at__lte=now)
+        if options['dry_run']:
+            counts = dict(expired.order_by().values_list('notif_type').annotate(total=Count('id')))
+            self.stdout.write(f'[dry-run] {sum(counts.values())} notifikasi kedaluwarsa: {counts}')
+            return
+
+        archive = open(options['archive'], 'a', encoding='utf-8') if options['archive'] else None
+        deleted = Counter()
+        try:
+            while True:
+                batch = list(
+                    expired.order_by('expires_at')
+                    .values_list('id', 'created_at', 'notif_type')[:options['batch_size']]
+                )
+                if not batch:
+                    break
+                ids = [row[0] for row in batch]
+                created = [row[1] for row in batch]
+                # rentang created_at membatasi DELETE ke partisi yang relevan
+                rows = Notification.objects.filter(id__in=ids, created_at__range=(min(created), max(created)))
+                if archive is not None:
+                    for row in rows.values():
+                        archive.write(json.dumps(row, cls=DjangoJSONEncoder) + '\n')
+                    archive.flush()
+                rows.delete()
+                deleted.update(row[2] for row in batch)
+        finally:
+            if archive is not None:
+                archive.close()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{sum(deleted.values())} notifikasi kedaluwarsa dihapus: {dict(deleted)}'
+        ))
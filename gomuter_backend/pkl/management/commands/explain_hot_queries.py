@@ -0,0 +1,235 @@
+import random
+import re
+from datetime import timedelta
+from typing import Optional
+
+from django.contrib.auth import get_user_model
+from django.contrib.postgres.search import SearchQuery
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from pkl.models import (
+    PKL,
+    LokasiPKL,
+    Chat,
+    ChatMessage,
+    PreOrder,
+    Notification,
+    PKLDailyStats,
+    PKLProduct,
+)
+from pkl.order_queue import OPEN_STATUSES
+from pkl.search import filter_jenis, trigram_enabled
+
+
+class _Rollback(Exception):
+    pass
+
+
+# Seq Scan pada partisi bulan depan yang masih kosong (biaya 0) tidak dihitung.
+_SEQ_SCAN_RE = re.compile(r'Seq Scan on \S+.*\(cost=(?!0\.00\.\.0\.00 )')
+_SORT_RE = re.compile(r'^(\s*->\s+)?Sort  \(', re.M)
+# Query ber-LIMIT yang harus dibaca berurutan dari index, tanpa node Sort.
+INDEX_ORDERED = {
+    'notification feed (NotificationListView)',
+    'unread notification feed (NotificationListView)',
+}
+
+
+def _seed(size: int) -> dict:
+    """Insert a synthetic dataset shaped like production traffic."""
+    User = get_user_model()
+    now = timezone.now()
+    vendors = max(size // 10, 20)
+    buyers = max(size // 100, 20)
+
+    users = User.objects.bulk_create(
+        [User(username=f'plan_pkl_{i}', role='PKL') for i in range(vendors)]
+        + [User(username=f'plan_buyer_{i}', role='USER') for i in range(buyers)]
+    )
+    vendor_users, buyer_users = users[:vendors], users[vendors:]
+    pkls = [
+        PKL(
+            user=user,
+            nama_usaha=f'PKL {i}',
+            jenis_dagangan=random.choice(['bakso', 'siomay', 'cilok', 'es teh']),
+            jam_operasional='08:00-20:00',
+            # sebagian kecil saja yang aktif, seperti di lapangan
+            status_aktif=i % 20 == 0,
+            status_verifikasi='DITERIMA' if i % 3 else 'PENDING',
+        )
+        for i, user in enumerate(vendor_users)
+    ]
+    for pkl in pkls:
+        pkl.refresh_search_fields()
+    PKL.objects.bulk_create(pkls, batch_size=5000)
+
+    LokasiPKL.objects.bulk_create([
+        LokasiPKL(pkl=random.choice(pkls), latitude=-6.2, longitude=106.8)
+        for _ in range(size)
+    ], batch_size=5000)
+    # pembeli contoh punya feed panjang (mis. 30 hari riwayat PKL favorit)
+    feed_heavy = buyer_users[:1] * len(buyer_users)
+    # umur notifikasi (menit); expire_notifications berjalan tiap ~10 menit,
+    # jadi hanya sebagian kecil baris yang sudah lewat expires_at
+    max_age = {Notification.TYPE_NEARBY: 35, Notification.TYPE_FAVORITE_ACTIVE: 7 * 24 * 60}
+    Notification.objects.bulk_create([
+        Notification(
+            buyer=random.choice(buyer_users + feed_heavy),
+            pkl=random.choice(pkls),
+            notif_type=notif_type,
+            message='seed',
+            is_read=random.random() < 0.8,
+            expires_at=Notification.expiry_for(notif_type, now - timedelta(minutes=random.randint(0, max_age[notif_type]))),
+        )
+        for notif_type in random.choices([Notification.TYPE_NEARBY, Notification.TYPE_FAVORITE_ACTIVE], k=size)
+    ], batch_size=5000)
+    chats = Chat.objects.bulk_create([
+        Chat(pembeli=buyer, pkl=random.choice(pkls)) for buyer in buyer_users
+    ])
+    ChatMessage.objects.bulk_create([
+        ChatMessage(chat=random.choice(chats), sender=random.choice(buyer_users), content='seed')
+        for _ in range(size)
+    ], batch_size=5000)
+    PreOrder.objects.bulk_create([
+        PreOrder(pembeli=random.choice(buyer_users), pkl=random.choice(pkls), deskripsi_pesanan='seed')
+        for _ in range(size)
+    ], batch_size=5000)
+    # katalog produk jauh lebih besar dari tabel lain (target 100k baris);
+    # search_vector diisi trigger database, "goang" sengaja jarang muncul
+    PKLProduct.objects.bulk_create([
+        PKLProduct(
+            pkl=random.choice(pkls),
+            name='cilok goang' if i % 500 == 0 else f"{random.choice(['bakso', 'siomay', 'es teh'])} {i}",
+            price=5000,
+        )
+        for i in range(size * 5)
+    ], batch_size=5000)
+    # setahun riwayat harian, jadi tren 7 hari hanya sebagian kecil tabel
+    PKLDailyStats.objects.bulk_create([
+        PKLDailyStats(pkl=pkl, date=(now - timedelta(days=day)).date())
+        for pkl in pkls[:max(1, size // 365)]
+        for day in range(365)
+    ], batch_size=5000)
+
+    return {
+        'pkl': pkls[0],
+        'buyer': buyer_users[0],
+        'chat': chats[0],
+        'now': now,
+    }
+
+
+def hot_queries(sample: dict) -> dict:
+    """Querysets mirroring the filters used by the busiest views/services."""
+    now = sample['now']
+    queries = {
+        'vendor track (trajectory.get_track)':
+            LokasiPKL.objects.filter(
+                pkl=sample['pkl'], timestamp__gte=now - timedelta(days=1), timestamp__lt=now,
+            ).order_by('timestamp'),
+        'active PKL list (ActivePKLListView)':
+            PKL.objects.filter(status_aktif=True, status_verifikasi='DITERIMA'),
+        'notification cooldown (services._cooled_down)':
+            Notification.objects.filter(
+                buyer=sample['buyer'],
+                notif_type=Notification.TYPE_NEARBY,
+                pkl=sample['pkl'],
+                created_at__range=(now - timedelta(minutes=30), now),
+            ),
+        'notification digest (services._notify_nearby_digest)':
+            Notification.objects.filter(
+                buyer=sample['buyer'],
+                notif_type=Notification.TYPE_NEARBY_DIGEST,
+                created_at__range=(now - timedelta(minutes=30), now),
+            ).order_by('-created_at')[:1],
+        'notification feed (NotificationListView)':
+            Notification.objects.filter(buyer=sample['buyer'], expires_at__gt=now).order_by('-created_at')[:50],
+        'unread notification feed (NotificationListView)':
+            Notification.objects.filter(
+                buyer=sample['buyer'], is_read=False, expires_at__gt=now,
+            ).order_by('-created_at')[:50],
+        'notification expiry (expire_notifications)':
+            Notification.objects.filter(expires_at__lte=now).order_by('expires_at')[:5000],
+        'chat messages (ChatMessagesView)':
+            ChatMessage.objects.filter(chat=sample['chat']).order_by('created_at'),
+        'vendor preorders (PKLPreOrderListView)':
+            PreOrder.objects.filter(pkl=sample['pkl']).order_by('-created_at'),
+        'vendor open orders (order_queue.snapshot)':
+            PreOrder.objects.filter(pkl=sample['pkl'], status__in=OPEN_STATUSES).order_by('created_at'),
+        'product search (search.search_products)':
+            PKLProduct.objects.filter(search_vector=SearchQuery('goang', search_type='raw', config='simple')),
+        'dashboard trend (AdminDashboardView)':
+            PKLDailyStats.objects.filter(date__gte=(now - timedelta(days=6)).date()),
+    }
+    if trigram_enabled():
+        queries['jenis filter (search.filter_jenis)'] = filter_jenis(PKL.objects.all(), 'bakso')
+        queries['search candidates (search.search_candidates)'] = PKL.objects.filter(
+            Q(search_nama__trigram_similar='baksoo') | Q(search_tokens__contains=' baks')
+        )
+    return queries
+
+
+def _problem(label: str, plan: str):
+    if _SEQ_SCAN_RE.search(plan):
+        return 'SEQ SCAN'
+    if label in INDEX_ORDERED and _SORT_RE.search(plan):
+        return 'SORT'
+    return None
+
+
+def explain_plans(rows: int, force_index: bool = False) -> list[tuple[str, str, Optional[str]]]:
+    """Seed ``rows`` rows, EXPLAIN every hot query and roll everything back.
+
+    Returns ``(label, plan, problem)`` per query; ``problem`` is ``'SEQ SCAN'``,
+    ``'SORT'`` (for :data:`INDEX_ORDERED`) or ``None``. ``force_index``
+    disables seq scans and sorts so the planner picks any usable index even
+    on a tiny dataset; a remaining one means no index fits (used by the tests).
+    """
+    results = []
+    try:
+        with transaction.atomic():
+            sample = _seed(rows)
+            with connection.cursor() as cursor:
+                for model in (PKL, LokasiPKL, Notification, ChatMessage, PreOrder, PKLDailyStats, PKLProduct):
+                    cursor.execute(f'ANALYZE {connection.ops.quote_name(model._meta.db_table)}')
+                if force_index:
+                    cursor.execute('SET LOCAL enable_seqscan = off')
+                    cursor.execute('SET LOCAL enable_sort = off')
+
+            for label, queryset in hot_queries(sample).items():
+                plan = queryset.explain()
+                results.append((label, plan, _problem(label, plan)))
+            raise _Rollback()
+    except _Rollback:
+        pass
+    return results
+
+
+class Command(BaseCommand):
+    help = (
+        'Isi dataset sintetis (di-rollback setelahnya), jalankan EXPLAIN untuk '
+        'query utama dan gagal jika ada yang memakai Seq Scan (atau Sort untuk '
+        'query di INDEX_ORDERED). Khusus PostgreSQL.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=20000, help='Jumlah baris per tabel besar.')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('Perintah ini hanya mendukung PostgreSQL.')
+
+        failures = []
+        for label, plan, problem in explain_plans(options['rows']):
+            self.stdout.write(f'[{problem or "ok"}] {label}')
+            if options['verbosity'] > 1 or problem:
+                self.stdout.write(plan)
+            if problem:
+                failures.append(label)
+
+        if failures:
+            raise CommandError(f'{len(failures)} query belum memakai index dengan benar: {", ".join(failures)}')
+        self.stdout.write(self.style.SUCCESS('Semua query utama memakai index.'))
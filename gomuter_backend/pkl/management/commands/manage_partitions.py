@@ -0,0 +1,62 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from pkl.models import LokasiPKL, Notification
+from pkl.partitions import (
+    create_partition,
+    drop_partition,
+    expired_partitions,
+    is_partitioned,
+    missing_months,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Kelola partisi bulanan LokasiPKL dan Notification: buat partisi untuk '
+        'bulan-bulan ke depan dan hapus partisi yang melewati masa simpan. '
+        'Jalankan harian via cron. Khusus PostgreSQL.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--months-ahead', type=int, default=2,
+            help='Jumlah bulan ke depan yang partisinya disiapkan.',
+        )
+        parser.add_argument(
+            '--lokasi-retain-months', type=int,
+            help='Simpan riwayat lokasi N bulan terakhir (termasuk bulan ini); tanpa opsi ini tidak ada yang dihapus.',
+        )
+        parser.add_argument(
+            '--notification-retain-months', type=int,
+            help='Simpan notifikasi N bulan terakhir (termasuk bulan ini); tanpa opsi ini tidak ada yang dihapus.',
+        )
+        parser.add_argument('--dry-run', action='store_true', help='Tampilkan rencana tanpa mengubah database.')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('Perintah ini hanya mendukung PostgreSQL.')
+
+        retention = {
+            LokasiPKL: options['lokasi_retain_months'],
+            Notification: options['notification_retain_months'],
+        }
+        prefix = '[dry-run] ' if options['dry_run'] else ''
+        for model, retain_months in retention.items():
+            table = model._meta.db_table
+            if not is_partitioned(model):
+                raise CommandError(f'{table} belum dipartisi; jalankan migrate terlebih dahulu.')
+            if retain_months is not None and retain_months < 1:
+                raise CommandError('Masa simpan minimal 1 bulan.')
+
+            for month in missing_months(model, options['months_ahead']):
+                if not options['dry_run']:
+                    create_partition(model, month)
+                self.stdout.write(f'{prefix}{table}: partisi {month:%Y-%m} dibuat.')
+
+            if retain_months is None:
+                continue
+            for month, name in expired_partitions(model, retain_months):
+                if not options['dry_run']:
+                    drop_partition(model, name)
+                self.stdout.write(f'{prefix}{table}: partisi {month:%Y-%m} ({name}) dihapus.')
@@ -0,0 +1,39 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.utils import timezone
+
+from pkl.services import deactivate_stale_pkls
+
+
+class Command(BaseCommand):
+    help = (
+        'Nonaktifkan PKL yang tidak mengirim ping lokasi melebihi ambang batas. '
+        'Jalankan via cron, atau dengan --loop sebagai proses yang terus berjalan.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--threshold-minutes', type=int, default=settings.PKL_STALE_AFTER_MINUTES,
+            help='Menit sejak ping terakhir sebelum PKL dianggap tidak aktif.',
+        )
+        parser.add_argument('--loop', action='store_true', help='Ulangi terus setiap --interval detik.')
+        parser.add_argument('--interval', type=int, default=60, help='Jeda antar sweep (detik) untuk --loop.')
+
+    def handle(self, *args, **options):
+        stale_after = timedelta(minutes=options['threshold_minutes'])
+        while True:
+            deactivated = deactivate_stale_pkls(stale_after)
+            if deactivated or options['verbosity'] > 1:
+                self.stdout.write(
+                    f'{timezone.now().isoformat()} {deactivated} PKL dinonaktifkan '
+                    f'(tanpa ping > {options["threshold_minutes"]} menit).'
+                )
+            if not options['loop']:
+                break
+            # Koneksi idle lama bisa diputus server; buka ulang bila perlu.
+            close_old_connections()
+            time.sleep(options['interval'])
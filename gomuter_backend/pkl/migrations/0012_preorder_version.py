@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pkl', '0011_pkl_tentang'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='preorder',
+            name='version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pkl', '0012_preorder_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pklproduct',
+            name='image_medium',
+            field=models.ImageField(blank=True, null=True, upload_to='pkl_products/variants/'),
+        ),
+        migrations.AddField(
+            model_name='pklproduct',
+            name='image_thumbnail',
+            field=models.ImageField(blank=True, null=True, upload_to='pkl_products/variants/'),
+        ),
+    ]
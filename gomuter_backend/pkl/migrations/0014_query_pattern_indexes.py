@@ -0,0 +1,51 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:50
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pkl', '0013_pklproduct_image_variants'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='chatmessage',
+            index=models.Index(fields=['chat', 'created_at'], name='chatmsg_chat_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lokasipkl',
+            index=models.Index(fields=['pkl', '-timestamp'], name='lokasi_pkl_latest_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['buyer', 'notif_type', 'pkl', 'created_at'], name='notif_cooldown_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['buyer', '-created_at'], name='notif_feed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['buyer', 'is_read', '-created_at'], name='notif_feed_unread_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pkl',
+            index=models.Index(fields=['status_aktif', 'status_verifikasi'], name='pkl_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pkldailystats',
+            index=models.Index(fields=['date'], name='dailystats_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='preorder',
+            index=models.Index(fields=['pkl', '-created_at'], name='preorder_pkl_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='preorder',
+            index=models.Index(fields=['pembeli', '-created_at'], name='preorder_buyer_created_idx'),
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:55
+
+from django.db import migrations, models
+
+from pkl.utils import encode_geohash
+
+
+def _latest_locations(LokasiPKL, vendor):
+    fields = ('pkl_id', 'latitude', 'longitude', 'timestamp')
+    if vendor == 'postgresql':
+        return LokasiPKL.objects.order_by('pkl_id', '-timestamp').distinct('pkl_id').values_list(*fields)
+    pkl_ids = LokasiPKL.objects.values_list('pkl_id', flat=True).distinct()
+    return [
+        LokasiPKL.objects.filter(pkl_id=pkl_id).order_by('-timestamp').values_list(*fields).first()
+        for pkl_id in pkl_ids
+    ]
+
+
+def backfill_current_position(apps, schema_editor):
+    PKL = apps.get_model('pkl', 'PKL')
+    LokasiPKL = apps.get_model('pkl', 'LokasiPKL')
+    for pkl_id, latitude, longitude, timestamp in _latest_locations(LokasiPKL, schema_editor.connection.vendor):
+        PKL.objects.filter(pk=pkl_id).update(
+            last_latitude=float(latitude),
+            last_longitude=float(longitude),
+            last_seen_at=timestamp,
+            geohash=encode_geohash(float(latitude), float(longitude)),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pkl', '0014_query_pattern_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pkl',
+            name='geohash',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=12),
+        ),
+        migrations.AddField(
+            model_name='pkl',
+            name='last_latitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='pkl',
+            name='last_longitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='pkl',
+            name='last_seen_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(backfill_current_position, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,85 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:00
+
+import datetime
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def seed_today_hourly(apps, schema_editor):
+    # Counter hari ini sebelumnya langsung ditulis ke tabel harian; salin ke
+    # tabel per jam agar tidak hilang saat hari ini diringkas ulang.
+    PKLDailyStats = apps.get_model('pkl', 'PKLDailyStats')
+    PKLHourlyStats = apps.get_model('pkl', 'PKLHourlyStats')
+    today = timezone.localdate()
+    midnight = timezone.make_aware(datetime.datetime.combine(today, datetime.time.min))
+    PKLHourlyStats.objects.bulk_create([
+        PKLHourlyStats(
+            pkl_id=row.pkl_id,
+            hour=midnight,
+            live_views=row.live_views,
+            search_hits=row.search_hits,
+            auto_updates=row.auto_updates,
+        )
+        for row in PKLDailyStats.objects.filter(date=today)
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pkl', '0015_pkl_current_position'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PKLHourlyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hour', models.DateTimeField()),
+                ('live_views', models.PositiveIntegerField(default=0)),
+                ('search_hits', models.PositiveIntegerField(default=0)),
+                ('auto_updates', models.PositiveIntegerField(default=0)),
+                ('pkl', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='hourly_stats', to='pkl.pkl')),
+            ],
+            options={
+                'ordering': ['-hour'],
+                'indexes': [models.Index(fields=['hour'], name='hourlystats_hour_idx')],
+                'unique_together': {('pkl', 'hour')},
+            },
+        ),
+        migrations.CreateModel(
+            name='PKLMonthlyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('live_views', models.PositiveIntegerField(default=0)),
+                ('search_hits', models.PositiveIntegerField(default=0)),
+                ('auto_updates', models.PositiveIntegerField(default=0)),
+                ('pkl', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='monthly_stats', to='pkl.pkl')),
+            ],
+            options={
+                'ordering': ['-month'],
+                'indexes': [models.Index(fields=['month'], name='monthlystats_month_idx')],
+                'unique_together': {('pkl', 'month')},
+            },
+        ),
+        migrations.CreateModel(
+            name='PKLWeeklyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('week_start', models.DateField()),
+                ('live_views', models.PositiveIntegerField(default=0)),
+                ('search_hits', models.PositiveIntegerField(default=0)),
+                ('auto_updates', models.PositiveIntegerField(default=0)),
+                ('pkl', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='weekly_stats', to='pkl.pkl')),
+            ],
+            options={
+                'ordering': ['-week_start'],
+                'indexes': [models.Index(fields=['week_start'], name='weeklystats_week_idx')],
+                'unique_together': {('pkl', 'week_start')},
+            },
+        ),
+        migrations.RunPython(seed_today_hourly, migrations.RunPython.noop),
+    ]
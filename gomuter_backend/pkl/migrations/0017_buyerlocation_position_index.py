@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:07
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pkl', '0016_stats_rollups'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='buyerlocation',
+            index=models.Index(fields=['latitude', 'longitude'], name='buyerloc_lat_lng_idx'),
+        ),
+    ]
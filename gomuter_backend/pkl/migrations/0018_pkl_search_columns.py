@@ -0,0 +1,86 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:08
+
+import django.contrib.postgres.indexes
+from django.conf import settings
+from django.db import migrations, models
+
+from pkl.utils import normalize_search_term, search_tokens
+
+TRIGRAM_INDEXES = [
+    django.contrib.postgres.indexes.GinIndex(fields=['search_nama'], name='pkl_search_nama_trgm', opclasses=['gin_trgm_ops']),
+    django.contrib.postgres.indexes.GinIndex(fields=['search_jenis'], name='pkl_search_jenis_trgm', opclasses=['gin_trgm_ops']),
+    django.contrib.postgres.indexes.GinIndex(fields=['search_tokens'], name='pkl_search_tokens_trgm', opclasses=['gin_trgm_ops']),
+]
+
+
+def backfill_search_columns(apps, schema_editor):
+    PKL = apps.get_model('pkl', 'PKL')
+    rows = []
+    for pkl in PKL.objects.only('id', 'nama_usaha', 'jenis_dagangan').iterator(chunk_size=2000):
+        pkl.search_nama = normalize_search_term(pkl.nama_usaha)
+        pkl.search_jenis = normalize_search_term(pkl.jenis_dagangan)
+        pkl.search_tokens = search_tokens(pkl.nama_usaha, pkl.jenis_dagangan)[:255]
+        rows.append(pkl)
+    PKL.objects.bulk_update(rows, ['search_nama', 'search_jenis', 'search_tokens'], batch_size=2000)
+
+
+def _trigram_available(schema_editor) -> bool:
+    if schema_editor.connection.vendor != 'postgresql':
+        return False
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")
+        return cursor.fetchone() is not None
+
+
+def create_trigram_indexes(apps, schema_editor):
+    # Index trigram butuh ekstensi pg_trgm (paket contrib PostgreSQL). Tanpa
+    # itu pencarian tetap berjalan, hanya tanpa index (lihat pkl.search).
+    if not _trigram_available(schema_editor):
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    PKL = apps.get_model('pkl', 'PKL')
+    for index in TRIGRAM_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {schema_editor.quote_name(index.name)}')
+        schema_editor.add_index(PKL, index)
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for index in TRIGRAM_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {schema_editor.quote_name(index.name)}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pkl', '0017_buyerlocation_position_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pkl',
+            name='search_jenis',
+            field=models.CharField(blank=True, default='', editable=False, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='pkl',
+            name='search_nama',
+            field=models.CharField(blank=True, default='', editable=False, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='pkl',
+            name='search_tokens',
+            field=models.CharField(blank=True, default='', editable=False, max_length=255),
+        ),
+        migrations.RunPython(backfill_search_columns, migrations.RunPython.noop),
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddIndex(model_name='pkl', index=index) for index in TRIGRAM_INDEXES
+            ],
+            database_operations=[
+                migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+            ],
+        ),
+    ]
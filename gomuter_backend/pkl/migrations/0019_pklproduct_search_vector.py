@@ -0,0 +1,72 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:02
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+SEARCH_INDEX = django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='pklproduct_search_gin')
+
+# Konfigurasi 'simple': tanpa stemming, cocok untuk nama makanan lokal.
+CREATE_TRIGGER_SQL = """
+CREATE OR REPLACE FUNCTION pkl_pklproduct_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('simple', coalesce(NEW.name, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(NEW.description, '')), 'B');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS pkl_pklproduct_search_vector ON {table};
+CREATE TRIGGER pkl_pklproduct_search_vector
+    BEFORE INSERT OR UPDATE OF name, description, search_vector ON {table}
+    FOR EACH ROW EXECUTE FUNCTION pkl_pklproduct_search_vector_update();
+"""
+
+DROP_TRIGGER_SQL = """
+DROP TRIGGER IF EXISTS pkl_pklproduct_search_vector ON {table};
+DROP FUNCTION IF EXISTS pkl_pklproduct_search_vector_update();
+"""
+
+
+def create_search_support(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    PKLProduct = apps.get_model('pkl', 'PKLProduct')
+    table = schema_editor.quote_name(PKLProduct._meta.db_table)
+    schema_editor.execute(CREATE_TRIGGER_SQL.format(table=table))
+    # mengisi ulang kolom lewat trigger untuk baris yang sudah ada
+    schema_editor.execute(f'UPDATE {table} SET name = name')
+    schema_editor.add_index(PKLProduct, SEARCH_INDEX)
+
+
+def drop_search_support(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    PKLProduct = apps.get_model('pkl', 'PKLProduct')
+    table = schema_editor.quote_name(PKLProduct._meta.db_table)
+    schema_editor.execute(f'DROP INDEX IF EXISTS {schema_editor.quote_name(SEARCH_INDEX.name)}')
+    schema_editor.execute(DROP_TRIGGER_SQL.format(table=table))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pkl', '0018_pkl_search_columns'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pklproduct',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddIndex(model_name='pklproduct', index=SEARCH_INDEX),
+            ],
+            database_operations=[
+                migrations.RunPython(create_search_support, drop_search_support),
+            ],
+        ),
+    ]
@@ -0,0 +1,116 @@
+"""Convert pkl_lokasipkl and pkl_notification to monthly range partitions.
+
+PostgreSQL only; other databases keep plain tables. The primary key becomes
+``(id, <time column>)`` because a partitioned table's unique constraints must
+contain the partition key; Django still treats ``id`` as the primary key.
+Existing rows are copied into the new partitions, so on a large table this
+migration should run in a maintenance window. New partitions are created by
+``manage_partitions`` (see pkl.partitions).
+"""
+from datetime import date, datetime
+
+from django.db import migrations
+from django.utils import timezone
+
+TABLES = (
+    ('pkl_lokasipkl', 'timestamp'),
+    ('pkl_notification', 'created_at'),
+)
+MONTHS_AHEAD = 2
+
+
+def _add_months(month: date, count: int) -> date:
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _month_bounds(month: date):
+    start = timezone.make_aware(datetime(month.year, month.month, 1))
+    end_month = _add_months(month, 1)
+    return start, timezone.make_aware(datetime(end_month.year, end_month.month, 1))
+
+
+def _rebuild(schema_editor, table: str, column: str, partitioned: bool) -> None:
+    qn = schema_editor.quote_name
+    old = f'{table}_old'
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT indexname, indexdef FROM pg_indexes WHERE tablename = %s AND indexname <> %s",
+            [table, f'{table}_pkey'],
+        )
+        index_defs = cursor.fetchall()
+        cursor.execute(
+            "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+            "WHERE conrelid = %s::regclass AND contype = 'f'",
+            [table],
+        )
+        foreign_keys = cursor.fetchall()
+        cursor.execute(f'SELECT min({qn(column)}) FROM {qn(table)}')
+        oldest = cursor.fetchone()[0]
+
+    schema_editor.execute(f'ALTER TABLE {qn(table)} RENAME TO {qn(old)}')
+    # nama index berlaku per schema; index tabel lama diberi nama sementara
+    schema_editor.execute(f'ALTER INDEX {qn(table + "_pkey")} RENAME TO {qn(old + "_pkey")}')
+    for position, (name, _) in enumerate(index_defs):
+        schema_editor.execute(f'ALTER INDEX {qn(name)} RENAME TO {qn(f"{old}_{position}_idx")}')
+
+    if partitioned:
+        schema_editor.execute(
+            f'CREATE TABLE {qn(table)} (LIKE {qn(old)} INCLUDING DEFAULTS INCLUDING CONSTRAINTS '
+            f'INCLUDING IDENTITY) PARTITION BY RANGE ({qn(column)})'
+        )
+        schema_editor.execute(f'ALTER TABLE {qn(table)} ADD PRIMARY KEY (id, {qn(column)})')
+        current = timezone.localdate().replace(day=1)
+        month = timezone.localtime(oldest).date().replace(day=1) if oldest else current
+        while month <= _add_months(current, MONTHS_AHEAD):
+            start, end = _month_bounds(month)
+            schema_editor.execute(
+                f'CREATE TABLE {qn(f"{table}_p{month:%Y%m}")} PARTITION OF {qn(table)} '
+                f'FOR VALUES FROM (%s) TO (%s)',
+                [start, end],
+            )
+            month = _add_months(month, 1)
+        # penampung baris di luar partisi bulanan (mis. manage_partitions telat)
+        schema_editor.execute(f'CREATE TABLE {qn(table + "_default")} PARTITION OF {qn(table)} DEFAULT')
+    else:
+        schema_editor.execute(
+            f'CREATE TABLE {qn(table)} (LIKE {qn(old)} INCLUDING DEFAULTS INCLUDING CONSTRAINTS '
+            f'INCLUDING IDENTITY)'
+        )
+        schema_editor.execute(f'ALTER TABLE {qn(table)} ADD PRIMARY KEY (id)')
+
+    schema_editor.execute(f'INSERT INTO {qn(table)} SELECT * FROM {qn(old)}')
+    schema_editor.execute(
+        f"SELECT setval(pg_get_serial_sequence(%s, 'id'), coalesce(max(id), 0) + 1, false) FROM {qn(table)}",
+        [table],
+    )
+    schema_editor.execute(f'DROP TABLE {qn(old)}')
+    for _, definition in index_defs:
+        schema_editor.execute(definition)
+    for name, definition in foreign_keys:
+        schema_editor.execute(f'ALTER TABLE {qn(table)} ADD CONSTRAINT {qn(name)} {definition}')
+
+
+def partition_tables(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for table, column in TABLES:
+        _rebuild(schema_editor, table, column, partitioned=True)
+
+
+def unpartition_tables(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for table, column in TABLES:
+        _rebuild(schema_editor, table, column, partitioned=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pkl', '0020_pkl_search_log'),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_tables, unpartition_tables),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pkl', '0021_partition_lokasi_notification'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='buyerlocation',
+            name='digest_enabled',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AlterField(
+            model_name='notification',
+            name='notif_type',
+            field=models.CharField(choices=[('NEARBY_PKL', 'PKL Terdekat'), ('FAVORITE_ACTIVE', 'PKL Favorit Aktif'), ('NEARBY_DIGEST', 'Ringkasan PKL Terdekat')], max_length=32),
+        ),
+    ]
@@ -0,0 +1,56 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_expires_at(apps, schema_editor):
+    Notification = apps.get_model('pkl', 'Notification')
+    for notif_type, ttl_minutes in settings.NOTIFICATION_TTL_MINUTES.items():
+        Notification.objects.filter(notif_type=notif_type, expires_at__isnull=True).update(
+            expires_at=F('created_at') + timedelta(minutes=ttl_minutes),
+        )
+    # tipe lama yang tidak lagi dikonfigurasi langsung dianggap kedaluwarsa
+    Notification.objects.filter(expires_at__isnull=True).update(expires_at=F('created_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pkl', '0022_buyer_notification_digest'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notification',
+            name='expires_at',
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.RunPython(backfill_expires_at, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='notification',
+            name='expires_at',
+            field=models.DateTimeField(),
+        ),
+        migrations.RemoveIndex(
+            model_name='notification',
+            name='notif_feed_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='notification',
+            name='notif_feed_unread_idx',
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['buyer', 'expires_at'], name='notif_feed_live_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['buyer', 'is_read', 'expires_at'], name='notif_feed_unread_live_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['expires_at'], name='notif_expires_idx'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:43
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pkl', '0023_notification_expires_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PKLOrderQueueState',
+            fields=[
+                ('pkl', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='order_queue_state', serialize=False, to='pkl.pkl')),
+                ('status_pending', models.IntegerField(default=0)),
+                ('status_diterima', models.IntegerField(default=0)),
+                ('status_ditolak', models.IntegerField(default=0)),
+                ('status_selesai', models.IntegerField(default=0)),
+                ('dp_belum_bayar', models.IntegerField(default=0)),
+                ('dp_menunggu_konfirmasi', models.IntegerField(default=0)),
+                ('dp_terkonfirmasi', models.IntegerField(default=0)),
+                ('version', models.PositiveBigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='preorder',
+            index=models.Index(condition=models.Q(('status__in', ['PENDING', 'DITERIMA'])), fields=['pkl', 'created_at'], name='preorder_pkl_open_idx'),
+        ),
+    ]
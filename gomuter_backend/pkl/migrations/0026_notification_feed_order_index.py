@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:06
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pkl', '0025_cache_version'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='notification',
+            name='notif_feed_live_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='notification',
+            name='notif_feed_unread_live_idx',
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['buyer', '-created_at'], include=('expires_at',), name='notif_feed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['buyer', 'is_read', '-created_at'], include=('expires_at',), name='notif_feed_unread_idx'),
+        ),
+    ]
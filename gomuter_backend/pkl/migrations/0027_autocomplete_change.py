@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pkl', '0026_notification_feed_order_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AutocompleteChange',
+            fields=[
+                ('version', models.PositiveBigIntegerField(primary_key=True, serialize=False)),
+                ('pkl_ids', models.JSONField(default=list)),
+            ],
+        ),
+    ]
@@ -1,9 +1,14 @@
+from datetime import timedelta
+
 from django.db import models
 from django.conf import settings
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MinValueValidator, MaxValueValidator
 
 from django.utils import timezone
 
+from .utils import normalize_search_term, search_tokens
 
 DEFAULT_RADIUS_METERS = 300
 ALLOWED_RADIUS_METERS = (300, 500, 1000, 1500)
@@ -24,7 +29,18 @@ class PKL(models.Model):
     qris_image_url = models.CharField(max_length=255, blank=True, null=True)
     qris_link = models.CharField(max_length=255, blank=True, null=True)
 
-    
+    # Posisi terakhir (salinan LokasiPKL terbaru) agar peta/jarak tidak perlu
+    # mencari baris lokasi terbaru per PKL. Diisi services.update_current_position.
+    last_latitude = models.FloatField(blank=True, null=True)
+    last_longitude = models.FloatField(blank=True, null=True)
+    last_seen_at = models.DateTimeField(blank=True, null=True)
+    geohash = models.CharField(max_length=12, blank=True, default='', db_index=True)
+
+    # Kolom pencarian yang dihitung ulang di save(); lihat pkl.search.
+    search_nama = models.CharField(max_length=100, blank=True, default='', editable=False)
+    search_jenis = models.CharField(max_length=100, blank=True, default='', editable=False)
+    search_tokens = models.CharField(max_length=255, blank=True, default='', editable=False)
+
     STATUS_VERIFIKASI_CHOICES = (
         ('PENDING', 'Pending'),
         ('DITERIMA', 'Diterima'),
@@ -36,11 +52,34 @@ class PKL(models.Model):
         default='PENDING'
     )
     catatan_verifikasi = models.TextField(blank=True, null=True)
-    
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status_aktif', 'status_verifikasi'], name='pkl_status_idx'),
+            # Trigram: LIKE '%...%' dan operator similarity memakai index.
+            GinIndex(fields=['search_nama'], opclasses=['gin_trgm_ops'], name='pkl_search_nama_trgm'),
+            GinIndex(fields=['search_jenis'], opclasses=['gin_trgm_ops'], name='pkl_search_jenis_trgm'),
+            GinIndex(fields=['search_tokens'], opclasses=['gin_trgm_ops'], name='pkl_search_tokens_trgm'),
+        ]
 
     def __str__(self):
         return self.nama_usaha
 
+    SEARCH_SOURCE_FIELDS = ('nama_usaha', 'jenis_dagangan')
+    SEARCH_FIELDS = ('search_nama', 'search_jenis', 'search_tokens')
+
+    def refresh_search_fields(self) -> None:
+        self.search_nama = normalize_search_term(self.nama_usaha)
+        self.search_jenis = normalize_search_term(self.jenis_dagangan)
+        self.search_tokens = search_tokens(self.nama_usaha, self.jenis_dagangan)[:255]
+
+    def save(self, *args, **kwargs):
+        self.refresh_search_fields()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and set(update_fields) & set(self.SEARCH_SOURCE_FIELDS):
+            kwargs['update_fields'] = set(update_fields) | set(self.SEARCH_FIELDS)
+        super().save(*args, **kwargs)
+
 
 class LokasiPKL(models.Model):
     pkl = models.ForeignKey(
@@ -54,6 +93,11 @@ class LokasiPKL(models.Model):
     timestamp = models.DateTimeField(auto_now_add=True)
     status = models.CharField(max_length=50, default='AKTIF')
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['pkl', '-timestamp'], name='lokasi_pkl_latest_idx'),
+        ]
+
     def __str__(self):
         return f"{self.pkl.nama_usaha} @ {self.latitude}, {self.longitude}"
 
@@ -95,6 +139,9 @@ class ChatMessage(models.Model):
 
     class Meta:
         ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['chat', 'created_at'], name='chatmsg_chat_created_idx'),
+        ]
 
     def __str__(self):
         return f'{self.sender} : {self.content[:20]}'
@@ -133,16 +180,55 @@ class PreOrder(models.Model):
     dp_amount = models.IntegerField(default=0)
     dp_status = models.CharField(max_length=30, choices=DP_STATUS_CHOICES, default='BELUM_BAYAR')
     bukti_dp_url = models.CharField(max_length=255, blank=True, null=True)
+    # Dinaikkan setiap transisi; dipakai sebagai guard optimistic concurrency.
+    version = models.PositiveIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['pkl', '-created_at'], name='preorder_pkl_created_idx'),
+            models.Index(fields=['pembeli', '-created_at'], name='preorder_buyer_created_idx'),
+            # order terbuka di endpoint antrean PKL (pkl.order_queue)
+            models.Index(
+                fields=['pkl', 'created_at'],
+                condition=models.Q(status__in=['PENDING', 'DITERIMA']),
+                name='preorder_pkl_open_idx',
+            ),
+        ]
 
     def __str__(self):
         return f'PreOrder {self.pembeli} -> {self.pkl.nama_usaha} ({self.status})'
 
 
+class PKLOrderQueueState(models.Model):
+    """Jumlah pre-order per status/dp_status milik satu PKL (lihat pkl.order_queue).
+
+    Dirawat setiap transisi; ``version`` naik pada setiap perubahan pre-order
+    PKL ini dan menjadi ETag endpoint antrean.
+    """
+
+    pkl = models.OneToOneField(
+        PKL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='order_queue_state',
+    )
+    status_pending = models.IntegerField(default=0)
+    status_diterima = models.IntegerField(default=0)
+    status_ditolak = models.IntegerField(default=0)
+    status_selesai = models.IntegerField(default=0)
+    dp_belum_bayar = models.IntegerField(default=0)
+    dp_menunggu_konfirmasi = models.IntegerField(default=0)
+    dp_terkonfirmasi = models.IntegerField(default=0)
+    version = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'Antrean {self.pkl_id} v{self.version}'
+
+
 class BuyerLocation(models.Model):
     buyer = models.OneToOneField(
         settings.AUTH_USER_MODEL,
@@ -152,8 +238,16 @@ class BuyerLocation(models.Model):
     latitude = models.FloatField()
     longitude = models.FloatField()
     radius_m = models.PositiveIntegerField(default=DEFAULT_RADIUS_METERS)
+    # notifikasi PKL terdekat digabung per jendela waktu (services.notify_nearby_pkls)
+    digest_enabled = models.BooleanField(default=False)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # prefilter bounding box di geo.buyers_near_point
+            models.Index(fields=['latitude', 'longitude'], name='buyerloc_lat_lng_idx'),
+        ]
+
     def __str__(self):
         return f'{self.buyer.username} @ {self.latitude},{self.longitude}'
 
@@ -181,9 +275,11 @@ class FavoritePKL(models.Model):
 class Notification(models.Model):
     TYPE_NEARBY = 'NEARBY_PKL'
     TYPE_FAVORITE_ACTIVE = 'FAVORITE_ACTIVE'
+    TYPE_NEARBY_DIGEST = 'NEARBY_DIGEST'
     TYPE_CHOICES = (
         (TYPE_NEARBY, 'PKL Terdekat'),
         (TYPE_FAVORITE_ACTIVE, 'PKL Favorit Aktif'),
+        (TYPE_NEARBY_DIGEST, 'Ringkasan PKL Terdekat'),
     )
 
     buyer = models.ForeignKey(
@@ -205,13 +301,37 @@ class Notification(models.Model):
     is_read = models.BooleanField(default=False)
     metadata = models.JSONField(default=dict, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    # lihat settings.NOTIFICATION_TTL_MINUTES; diisi otomatis saat save()
+    expires_at = models.DateTimeField()
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # cooldown check di services._cooled_down
+            models.Index(fields=['buyer', 'notif_type', 'pkl', 'created_at'], name='notif_cooldown_idx'),
+            # feed NotificationListView (semua / unread saja): dibaca urut
+            # created_at dan berhenti di LIMIT; expires_at disaring dari index
+            models.Index(fields=['buyer', '-created_at'], include=['expires_at'], name='notif_feed_idx'),
+            models.Index(
+                fields=['buyer', 'is_read', '-created_at'], include=['expires_at'], name='notif_feed_unread_idx',
+            ),
+            # expire_notifications
+            models.Index(fields=['expires_at'], name='notif_expires_idx'),
+        ]
 
     def __str__(self):
         return f'{self.notif_type} -> {self.buyer.username}'
 
+    @staticmethod
+    def expiry_for(notif_type: str, created_at):
+        return created_at + timedelta(minutes=settings.NOTIFICATION_TTL_MINUTES[notif_type])
+
+    def save(self, *args, **kwargs):
+        # bulk_create tidak lewat sini; pemanggilnya mengisi expires_at sendiri
+        if self.expires_at is None:
+            self.expires_at = self.expiry_for(self.notif_type, timezone.now())
+        super().save(*args, **kwargs)
+
 
 class PKLDailyStats(models.Model):
     pkl = models.ForeignKey(
@@ -227,6 +347,9 @@ class PKLDailyStats(models.Model):
     class Meta:
         unique_together = ('pkl', 'date')
         ordering = ['-date']
+        indexes = [
+            models.Index(fields=['date'], name='dailystats_date_idx'),
+        ]
 
     def __str__(self):
         return f'Stats {self.pkl.nama_usaha} - {self.date.isoformat()}'
@@ -238,6 +361,74 @@ class PKLDailyStats(models.Model):
         return stats
 
 
+class PKLHourlyStats(models.Model):
+    """Counter mentah per jam; diringkas ke harian/mingguan/bulanan oleh ``compact_stats``."""
+
+    pkl = models.ForeignKey(
+        PKL,
+        on_delete=models.CASCADE,
+        related_name='hourly_stats',
+    )
+    hour = models.DateTimeField()
+    live_views = models.PositiveIntegerField(default=0)
+    search_hits = models.PositiveIntegerField(default=0)
+    auto_updates = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('pkl', 'hour')
+        ordering = ['-hour']
+        indexes = [
+            models.Index(fields=['hour'], name='hourlystats_hour_idx'),
+        ]
+
+    def __str__(self):
+        return f'Stats {self.pkl.nama_usaha} - {self.hour.isoformat()}'
+
+
+class PKLWeeklyStats(models.Model):
+    pkl = models.ForeignKey(
+        PKL,
+        on_delete=models.CASCADE,
+        related_name='weekly_stats',
+    )
+    week_start = models.DateField()  # hari Senin
+    live_views = models.PositiveIntegerField(default=0)
+    search_hits = models.PositiveIntegerField(default=0)
+    auto_updates = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('pkl', 'week_start')
+        ordering = ['-week_start']
+        indexes = [
+            models.Index(fields=['week_start'], name='weeklystats_week_idx'),
+        ]
+
+    def __str__(self):
+        return f'Stats {self.pkl.nama_usaha} - minggu {self.week_start.isoformat()}'
+
+
+class PKLMonthlyStats(models.Model):
+    pkl = models.ForeignKey(
+        PKL,
+        on_delete=models.CASCADE,
+        related_name='monthly_stats',
+    )
+    month = models.DateField()  # tanggal 1
+    live_views = models.PositiveIntegerField(default=0)
+    search_hits = models.PositiveIntegerField(default=0)
+    auto_updates = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('pkl', 'month')
+        ordering = ['-month']
+        indexes = [
+            models.Index(fields=['month'], name='monthlystats_month_idx'),
+        ]
+
+    def __str__(self):
+        return f'Stats {self.pkl.nama_usaha} - bulan {self.month.strftime("%Y-%m")}'
+
+
 class PKLProduct(models.Model):
     pkl = models.ForeignKey(
         PKL,
@@ -248,13 +439,22 @@ class PKLProduct(models.Model):
     price = models.PositiveIntegerField()
     description = models.TextField(blank=True)
     image = models.ImageField(upload_to='pkl_products/', blank=True, null=True)
+    # Varian hasil resize (lihat pkl.images); diisi di background setelah upload.
+    image_thumbnail = models.ImageField(upload_to='pkl_products/variants/', blank=True, null=True)
+    image_medium = models.ImageField(upload_to='pkl_products/variants/', blank=True, null=True)
     is_featured = models.BooleanField(default=False)
     is_available = models.BooleanField(default=True)
+    # tsvector dari name (bobot A) + description (bobot B); diisi trigger
+    # database di PostgreSQL (migrasi 0019), kosong di database lain.
+    search_vector = SearchVectorField(null=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['-is_featured', 'name']
+        indexes = [
+            GinIndex(fields=['search_vector'], name='pklproduct_search_gin'),
+        ]
 
     def __str__(self):
         return f'{self.name} ({self.pkl.nama_usaha})'
@@ -286,3 +486,61 @@ class PKLRating(models.Model):
 
     def __str__(self):
         return f'{self.buyer.username} rated {self.pkl.nama_usaha}: {self.score}'
+
+
+class PKLSearchLog(models.Model):
+    """Pencarian yang disubmit beserta fitur kandidatnya, untuk evaluasi ranking offline."""
+
+    buyer = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='pkl_searches',
+    )
+    query = models.CharField(max_length=100)
+    jenis = models.CharField(max_length=100, blank=True)
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
+    # Kolom fitur per kandidat (lihat pkl.ranking.build_features) dan rata-rata
+    # rating global saat itu, agar ranking bisa diputar ulang dengan bobot lain.
+    features = models.JSONField(default=dict)
+    rating_mean = models.FloatField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['created_at'], name='searchlog_created_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.query} @ {self.created_at.isoformat()}'
+
+
+class CacheVersion(models.Model):
+    """Penghitung versi yang dibaca semua proses (web worker, cron).
+
+    Dipakai sebagai bagian key cache turunan, mis. daftar PKL aktif; lihat
+    ``pkl.cache.active_list_version``.
+    """
+
+    key = models.CharField(max_length=50, primary_key=True)
+    version = models.PositiveBigIntegerField(default=1)
+
+    def __str__(self):
+        return f'{self.key} v{self.version}'
+
+
+class AutocompleteChange(models.Model):
+    """PKL yang berubah pada satu versi trie autocomplete (lihat ``pkl.autocomplete``).
+
+    ``version`` sama dengan nilai ``CacheVersion`` autocomplete setelah
+    perubahan dipublikasikan; proses yang tertinggal memutar ulang id-id ini.
+    """
+
+    version = models.PositiveBigIntegerField(primary_key=True)
+    pkl_ids = models.JSONField(default=list)
+
+    def __str__(self):
+        return f'autocomplete v{self.version}'
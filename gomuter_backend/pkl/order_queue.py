@@ -0,0 +1,103 @@
+"""Per-vendor order queue counters (``PKLOrderQueueState``).
+
+Every pre-order write of a PKL (create, transition, DP proof, delete) calls
+:func:`record_change` in the same transaction, which adjusts the counters
+with ``F()`` expressions and bumps ``version``. The queue endpoint answers
+``If-None-Match`` from that one row, so a polling vendor whose queue did not
+change costs a primary-key lookup.
+
+A missing row is counted from ``PreOrder`` on first use, which covers
+vendors with orders from before this table; deleting a row resyncs it.
+"""
+from collections import Counter
+from typing import Iterable, Optional
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+from django.utils import timezone
+
+from .models import PKLOrderQueueState, PreOrder
+
+OPEN_STATUSES = ('PENDING', 'DITERIMA')
+STATUS_COLUMNS = {value: f'status_{value.lower()}' for value, _ in PreOrder.STATUS_CHOICES}
+DP_STATUS_COLUMNS = {value: f'dp_{value.lower()}' for value, _ in PreOrder.DP_STATUS_CHOICES}
+
+
+def _columns(status: Optional[str], dp_status: Optional[str]) -> list[str]:
+    return [column for column in (STATUS_COLUMNS.get(status), DP_STATUS_COLUMNS.get(dp_status)) if column]
+
+
+def _counts(pkl_id: int) -> dict[str, int]:
+    counts = {column: 0 for column in (*STATUS_COLUMNS.values(), *DP_STATUS_COLUMNS.values())}
+    rows = (
+        PreOrder.objects.filter(pkl_id=pkl_id)
+        .order_by()
+        .values_list('status', 'dp_status')
+        .annotate(total=Count('id'))
+    )
+    for status, dp_status, total in rows:
+        for column in _columns(status, dp_status):
+            counts[column] += total
+    return counts
+
+
+def _create(pkl_id: int) -> Optional[PKLOrderQueueState]:
+    """Insert the state row counted from ``PreOrder``; ``None`` if another request won."""
+    try:
+        with transaction.atomic():
+            return PKLOrderQueueState.objects.create(pkl_id=pkl_id, version=1, **_counts(pkl_id))
+    except IntegrityError:
+        return None
+
+
+def record_change(pkl_id: int, removed: Iterable[tuple] = (), added: Iterable[tuple] = (),
+                  create_missing: bool = True) -> None:
+    """Apply pre-order changes of one PKL to its counters.
+
+    ``removed``/``added`` are ``(status, dp_status)`` pairs leaving/entering
+    the queue; a change that moves neither (e.g. a new DP proof URL) still
+    bumps ``version``. Call inside the transaction writing the pre-orders.
+    Without a state row it is created from ``PreOrder``, which already
+    includes this change, unless ``create_missing`` is false.
+    """
+    delta = Counter()
+    for pair in removed:
+        delta.subtract(_columns(*pair))
+    for pair in added:
+        delta.update(_columns(*pair))
+    updates = {column: F(column) + value for column, value in delta.items() if value}
+
+    state = PKLOrderQueueState.objects.filter(pkl_id=pkl_id)
+    if state.update(**updates, version=F('version') + 1, updated_at=timezone.now()) or not create_missing:
+        return
+    if _create(pkl_id) is None:
+        # baris baru dibuat request lain yang belum melihat perubahan ini
+        state.update(**updates, version=F('version') + 1, updated_at=timezone.now())
+
+
+def get_state(pkl_id: int) -> PKLOrderQueueState:
+    state = PKLOrderQueueState.objects.filter(pkl_id=pkl_id).first()
+    if state is None:
+        state = _create(pkl_id) or PKLOrderQueueState.objects.get(pkl_id=pkl_id)
+    return state
+
+
+def etag(state: PKLOrderQueueState) -> str:
+    # version mulai lagi dari 1 bila baris dibuat ulang; updated_at membedakannya
+    return f'"queue-{state.pkl_id}-{state.version}-{int(state.updated_at.timestamp() * 1_000_000)}"'
+
+
+def snapshot(state: PKLOrderQueueState) -> dict:
+    """Counts plus the open orders (id, status, dp_status, updated_at), oldest first."""
+    open_orders = (
+        PreOrder.objects.filter(pkl_id=state.pkl_id, status__in=OPEN_STATUSES)
+        .order_by('created_at')
+        .values('id', 'status', 'dp_status', 'version', 'updated_at')
+    )
+    return {
+        'version': state.version,
+        'updated_at': state.updated_at,
+        'status_counts': {value: getattr(state, column) for value, column in STATUS_COLUMNS.items()},
+        'dp_status_counts': {value: getattr(state, column) for value, column in DP_STATUS_COLUMNS.items()},
+        'open_orders': list(open_orders),
+    }
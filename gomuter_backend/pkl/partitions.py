@@ -0,0 +1,117 @@
+"""Monthly range partitions of ``LokasiPKL`` and ``Notification`` (PostgreSQL).
+
+Migration 0021 turns both tables into partitioned tables with one partition
+per month (``<table>_pYYYYMM``) plus a ``<table>_default`` catch-all. The
+``manage_partitions`` command keeps months ahead available and drops whole
+months past retention, which replaces row-by-row DELETEs.
+"""
+import re
+from datetime import date, datetime
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import LokasiPKL, Notification
+
+# model -> kolom waktu yang menjadi partition key
+PARTITIONED_MODELS = {
+    LokasiPKL: 'timestamp',
+    Notification: 'created_at',
+}
+_PARTITION_SUFFIX_RE = re.compile(r'_p(\d{4})(\d{2})$')
+
+
+def add_months(month: date, count: int) -> date:
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def current_month() -> date:
+    return timezone.localdate().replace(day=1)
+
+
+def month_bounds(month: date) -> tuple[datetime, datetime]:
+    end = add_months(month, 1)
+    return (
+        timezone.make_aware(datetime(month.year, month.month, 1)),
+        timezone.make_aware(datetime(end.year, end.month, 1)),
+    )
+
+
+def partition_name(table: str, month: date) -> str:
+    return f'{table}_p{month:%Y%m}'
+
+
+def is_partitioned(model) -> bool:
+    if connection.vendor != 'postgresql':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s)',
+            [model._meta.db_table],
+        )
+        return cursor.fetchone() is not None
+
+
+def monthly_partitions(model) -> dict[date, str]:
+    """Attached monthly partitions of ``model``'s table, keyed by month."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT child.relname FROM pg_inherits '
+            'JOIN pg_class child ON child.oid = pg_inherits.inhrelid '
+            'WHERE pg_inherits.inhparent = to_regclass(%s)',
+            [model._meta.db_table],
+        )
+        names = [row[0] for row in cursor.fetchall()]
+    partitions = {}
+    for name in names:
+        match = _PARTITION_SUFFIX_RE.search(name)
+        if match:
+            partitions[date(int(match.group(1)), int(match.group(2)), 1)] = name
+    return partitions
+
+
+def create_partition(model, month: date) -> str:
+    """Create and attach the partition for ``month``.
+
+    Rows for that month that already landed in the default partition are
+    moved into the new partition first, otherwise ATTACH would fail.
+    """
+    table = model._meta.db_table
+    column = PARTITIONED_MODELS[model]
+    qn = connection.ops.quote_name
+    name = partition_name(table, month)
+    start, end = month_bounds(month)
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f'CREATE TABLE {qn(name)} (LIKE {qn(table)} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)')
+        cursor.execute(
+            f'WITH moved AS (DELETE FROM {qn(table + "_default")} '
+            f'WHERE {qn(column)} >= %s AND {qn(column)} < %s RETURNING *) '
+            f'INSERT INTO {qn(name)} SELECT * FROM moved',
+            [start, end],
+        )
+        cursor.execute(
+            f'ALTER TABLE {qn(table)} ATTACH PARTITION {qn(name)} FOR VALUES FROM (%s) TO (%s)',
+            [start, end],
+        )
+    return name
+
+
+def drop_partition(model, name: str) -> None:
+    qn = connection.ops.quote_name
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f'ALTER TABLE {qn(model._meta.db_table)} DETACH PARTITION {qn(name)}')
+        cursor.execute(f'DROP TABLE {qn(name)}')
+
+
+def missing_months(model, months_ahead: int) -> list[date]:
+    """Months from the current one to ``months_ahead`` ahead without a partition."""
+    existing = monthly_partitions(model)
+    wanted = [add_months(current_month(), offset) for offset in range(months_ahead + 1)]
+    return [month for month in wanted if month not in existing]
+
+
+def expired_partitions(model, retain_months: int) -> list[tuple[date, str]]:
+    """Partitions lying entirely before the last ``retain_months`` months (current included)."""
+    cutoff = add_months(current_month(), -(retain_months - 1))
+    return sorted((month, name) for month, name in monthly_partitions(model).items() if month < cutoff)
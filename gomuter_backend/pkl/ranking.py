@@ -0,0 +1,108 @@
+"""Blended ranking for PKL search results.
+
+Each candidate gets four component scores in ``[0, 1]``:
+
+* ``text``: fuzzy text similarity computed by the caller;
+* ``distance``: ``0.5 ** (distance_m / DISTANCE_HALF_M)``, ``0`` when unknown;
+* ``rating``: Bayesian-smoothed average, pulled towards the global mean
+  by ``RATING_PRIOR_COUNT`` virtual ratings, divided by ``MAX_RATING``;
+* ``freshness``: ``0.5 ** (age_s / FRESHNESS_HALF_LIFE_S)`` since the last ping.
+
+The final score is their weighted sum (``settings.PKL_RANKING_WEIGHTS``).
+Features are kept column-wise so a whole candidate set is scored in one pass,
+and so the same columns can be logged (``PKLSearchLog``) and replayed by the
+``evaluate_ranking`` command with other weights.
+"""
+from typing import Iterable, Optional
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Avg
+from django.utils import timezone
+
+from .models import PKLRating
+
+COMPONENTS = ('text', 'distance', 'rating', 'freshness')
+DISTANCE_HALF_M = 500.0
+FRESHNESS_HALF_LIFE_S = 600.0
+RATING_PRIOR_COUNT = 5
+MAX_RATING = 5.0
+# Dipakai bila belum ada rating sama sekali.
+DEFAULT_RATING_MEAN = 3.5
+RATING_MEAN_CACHE_KEY = 'pkl:ranking:rating-mean'
+RATING_MEAN_CACHE_TTL = 600
+
+
+def global_rating_mean() -> float:
+    """Average of all ratings, cached; the prior of the Bayesian rating."""
+    def compute():
+        value = PKLRating.objects.aggregate(avg=Avg('score'))['avg']
+        return float(value) if value is not None else DEFAULT_RATING_MEAN
+    return caches['default'].get_or_set(RATING_MEAN_CACHE_KEY, compute, RATING_MEAN_CACHE_TTL)
+
+
+def build_features(pkls: list, text_scores: Iterable[float], now=None) -> dict[str, list]:
+    """Feature columns for ``pkls`` (annotated as in ``ActivePKLListView``).
+
+    ``distance_m`` is read from the attribute attached by the view, if any.
+    """
+    now = now or timezone.now()
+    return {
+        'id': [pkl.id for pkl in pkls],
+        'text': [float(score) for score in text_scores],
+        'distance_m': [getattr(pkl, 'distance_m', None) for pkl in pkls],
+        'rating_avg': [float(pkl.average_rating) if pkl.average_rating is not None else None for pkl in pkls],
+        'rating_count': [pkl.rating_count or 0 for pkl in pkls],
+        'age_s': [(now - pkl.last_seen_at).total_seconds() if pkl.last_seen_at else None for pkl in pkls],
+    }
+
+
+def resolve_weights(weights: Optional[dict], has_distance: bool) -> dict[str, float]:
+    """Weights for the four components, summing to 1.
+
+    Without a caller position the distance weight is dropped and the rest
+    rescaled, so results are still comparable across requests.
+    """
+    weights = {name: max(float((weights or settings.PKL_RANKING_WEIGHTS).get(name, 0.0)), 0.0) for name in COMPONENTS}
+    if not has_distance:
+        weights['distance'] = 0.0
+    total = sum(weights.values())
+    if total <= 0:
+        return {name: 1.0 if name == 'text' else 0.0 for name in COMPONENTS}
+    return {name: value / total for name, value in weights.items()}
+
+
+def score(features: dict[str, list], weights: Optional[dict] = None, rating_mean: Optional[float] = None) -> list[float]:
+    """Blended score for every candidate in ``features``."""
+    distances = features['distance_m']
+    w = resolve_weights(weights, any(d is not None for d in distances))
+    mean = global_rating_mean() if rating_mean is None else rating_mean
+    prior = RATING_PRIOR_COUNT * mean
+
+    text = [min(max(value, 0.0), 1.0) for value in features['text']]
+    near = [0.5 ** (d / DISTANCE_HALF_M) if d is not None else 0.0 for d in distances]
+    rating = [
+        ((avg or 0.0) * count + prior) / (count + RATING_PRIOR_COUNT) / MAX_RATING
+        for avg, count in zip(features['rating_avg'], features['rating_count'])
+    ]
+    fresh = [0.5 ** (max(age, 0.0) / FRESHNESS_HALF_LIFE_S) if age is not None else 0.0 for age in features['age_s']]
+
+    wt, wd, wr, wf = w['text'], w['distance'], w['rating'], w['freshness']
+    return [
+        wt * t + wd * d + wr * r + wf * f
+        for t, d, r, f in zip(text, near, rating, fresh)
+    ]
+
+
+def order(features: dict[str, list], weights: Optional[dict] = None, rating_mean: Optional[float] = None) -> list[int]:
+    """Candidate ids, best first."""
+    scores = score(features, weights, rating_mean)
+    ranked = sorted(range(len(scores)), key=lambda i: scores[i], reverse=True)
+    return [features['id'][i] for i in ranked]
+
+
+def rank(pkls: list, features: dict[str, list], rating_mean: Optional[float] = None) -> list:
+    """Sort ``pkls`` by blended score (stored on each as ``rank_score``)."""
+    for pkl, value in zip(pkls, score(features, rating_mean=rating_mean)):
+        pkl.rank_score = value
+    return sorted(pkls, key=lambda pkl: pkl.rank_score, reverse=True)
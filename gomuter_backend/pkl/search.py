@@ -0,0 +1,96 @@
+"""Indexed PKL search over the precomputed ``search_*`` columns.
+
+``search_nama``/``search_jenis`` hold the normalized text (lowercase, no
+whitespace) and ``search_tokens`` the word tokens; all three carry a pg_trgm
+GIN index, so ``contains`` and trigram similarity run as index scans.
+
+Product search uses ``PKLProduct.search_vector`` (a tsvector kept up to date
+by a trigger, see migration 0019) and its GIN index.
+"""
+from functools import lru_cache
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramSimilarity
+from django.db import connection
+from django.db.models import F, FloatField, Q, Value
+from django.db.models.functions import Greatest
+
+from .models import PKLProduct
+from .utils import normalize_search_term, search_tokens
+
+PRODUCT_SEARCH_LIMIT = 500
+
+
+@lru_cache(maxsize=None)
+def trigram_enabled() -> bool:
+    """``True`` when the database has pg_trgm installed (see migration 0018)."""
+    if connection.vendor != 'postgresql':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+        return cursor.fetchone() is not None
+
+
+def filter_jenis(queryset, jenis: str):
+    term = normalize_search_term(jenis)
+    return queryset.filter(search_jenis__contains=term) if term else queryset
+
+
+def search_candidates(queryset, raw_query: str, limit: int) -> list:
+    """Candidates for fuzzy ranking: substring, word-prefix or trigram matches.
+
+    Without pg_trgm, misspellings cannot be matched in SQL; the first
+    ``limit`` rows are returned instead so the Python ranking still has
+    something to score.
+    """
+    normalized = normalize_search_term(raw_query)
+    condition = Q(search_nama__contains=normalized) | Q(search_jenis__contains=normalized)
+    for token in search_tokens(raw_query).split():
+        condition |= Q(search_tokens__contains=f' {token}')
+
+    if trigram_enabled():
+        condition |= Q(search_nama__trigram_similar=normalized) | Q(search_jenis__trigram_similar=normalized)
+        return list(
+            queryset.filter(condition)
+            .annotate(search_similarity=Greatest(
+                TrigramSimilarity('search_nama', normalized),
+                TrigramSimilarity('search_jenis', normalized),
+            ))
+            .order_by('-search_similarity')[:limit]
+        )
+
+    return list(queryset.filter(condition)[:limit]) or list(queryset[:limit])
+
+
+def _product_tsquery(raw_query: str) -> str:
+    # token hanya berisi karakter \w, jadi aman dipakai sebagai tsquery mentah;
+    # ":*" membuat setiap kata berlaku sebagai prefix ("cil" -> "cilok")
+    return ' & '.join(f'{token}:*' for token in search_tokens(raw_query).split())
+
+
+def search_products(raw_query: str, limit: int = PRODUCT_SEARCH_LIMIT) -> list[dict]:
+    """Available products of active, verified vendors matching every query word.
+
+    Returns up to ``limit`` rows (``id``, ``pkl_id``, ``name``, ``price``,
+    ``rank``), best match first. Outside PostgreSQL the match falls back to
+    ``icontains`` with a constant rank.
+    """
+    tsquery = _product_tsquery(raw_query)
+    if not tsquery:
+        return []
+
+    queryset = PKLProduct.objects.filter(
+        is_available=True,
+        pkl__status_aktif=True,
+        pkl__status_verifikasi='DITERIMA',
+    )
+    if connection.vendor == 'postgresql':
+        query = SearchQuery(tsquery, search_type='raw', config='simple')
+        queryset = queryset.filter(search_vector=query).annotate(rank=SearchRank(F('search_vector'), query))
+    else:
+        for token in search_tokens(raw_query).split():
+            queryset = queryset.filter(Q(name__icontains=token) | Q(description__icontains=token))
+        queryset = queryset.annotate(rank=Value(1.0, output_field=FloatField()))
+
+    return list(
+        queryset.order_by('-rank', 'id').values('id', 'pkl_id', 'name', 'price', 'rank')[:limit]
+    )
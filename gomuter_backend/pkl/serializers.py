@@ -14,6 +14,8 @@ from .models import (
     ALLOWED_RADIUS_METERS,
     PKLProduct,
 )
+from .images import delete_product_variants, schedule_product_variants
+from .geo import pair_distances_m
 
 
 class PKLSerializer(serializers.ModelSerializer):
@@ -47,6 +49,7 @@ class PKLListSerializer(serializers.ModelSerializer):
     latest_latitude = serializers.SerializerMethodField()
     latest_longitude = serializers.SerializerMethodField()
     latest_timestamp = serializers.SerializerMethodField()
+    distance_m = serializers.SerializerMethodField()
     average_rating = serializers.SerializerMethodField()
     rating_count = serializers.SerializerMethodField()
 
@@ -68,21 +71,25 @@ class PKLListSerializer(serializers.ModelSerializer):
             'latest_latitude',
             'latest_longitude',
             'latest_timestamp',
+            'distance_m',
             'average_rating',
             'rating_count',
         ]
 
+    # Posisi terakhir disalin ke PKL oleh services.update_current_position,
+    # jadi tidak perlu query LokasiPKL per baris.
     def get_latest_latitude(self, obj):
-        lokasi = obj.lokasi.order_by('-timestamp').first()
-        return lokasi.latitude if lokasi else None
+        return obj.last_latitude
 
     def get_latest_longitude(self, obj):
-        lokasi = obj.lokasi.order_by('-timestamp').first()
-        return lokasi.longitude if lokasi else None
+        return obj.last_longitude
 
     def get_latest_timestamp(self, obj):
-        lokasi = obj.lokasi.order_by('-timestamp').first()
-        return lokasi.timestamp if lokasi else None
+        return obj.last_seen_at
+
+    def get_distance_m(self, obj):
+        value = self._resolve_annotation(obj, 'distance_m')
+        return round(value, 1) if value is not None else None
 
     def _resolve_annotation(self, obj, attr):
         if hasattr(obj, attr):
@@ -105,6 +112,25 @@ class PKLListSerializer(serializers.ModelSerializer):
         return obj.ratings.count()
 
 
+class PKLProductSearchSerializer(PKLListSerializer):
+    """Hasil pencarian produk: PKL beserta produk yang cocok dengan query."""
+
+    match_score = serializers.SerializerMethodField()
+    matched_products = serializers.SerializerMethodField()
+
+    class Meta(PKLListSerializer.Meta):
+        fields = PKLListSerializer.Meta.fields + ['match_score', 'matched_products']
+
+    def get_match_score(self, obj):
+        return round(obj.match_score, 4)
+
+    def get_matched_products(self, obj):
+        return [
+            {'id': row['id'], 'name': row['name'], 'price': row['price']}
+            for row in obj.matched_products
+        ]
+
+
 class PKLVerifySerializer(serializers.ModelSerializer):
     class Meta:
         model = PKL
@@ -150,6 +176,7 @@ class ChatSerializer(serializers.ModelSerializer):
 class PreOrderSerializer(serializers.ModelSerializer):
     pkl_nama_usaha = serializers.CharField(source='pkl.nama_usaha', read_only=True)
     pembeli_username = serializers.CharField(source='pembeli.username', read_only=True)
+    pickup_distance_m = serializers.SerializerMethodField()
 
     class Meta:
         model = PreOrder
@@ -164,20 +191,32 @@ class PreOrderSerializer(serializers.ModelSerializer):
             'pickup_address',
             'pickup_latitude',
             'pickup_longitude',
+            'pickup_distance_m',
             'status',
             'dp_amount',
             'dp_status',
             'bukti_dp_url',
+            'version',
             'created_at',
             'updated_at',
         ]
-        read_only_fields = ['id', 'pembeli', 'pkl', 'status', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'pembeli', 'pkl', 'status', 'version', 'created_at', 'updated_at']
+
+    def get_pickup_distance_m(self, obj):
+        """Jarak titik ambil ke posisi terakhir PKL."""
+        if obj.pkl_id is None:
+            return None
+        distance = pair_distances_m([(
+            (obj.pickup_latitude, obj.pickup_longitude),
+            (obj.pkl.last_latitude, obj.pkl.last_longitude),
+        )])[0]
+        return round(distance, 1) if distance is not None else None
 
 
 class BuyerLocationSerializer(serializers.ModelSerializer):
     class Meta:
         model = BuyerLocation
-        fields = ['latitude', 'longitude', 'radius_m', 'updated_at']
+        fields = ['latitude', 'longitude', 'radius_m', 'digest_enabled', 'updated_at']
         read_only_fields = ['updated_at']
 
 
@@ -185,6 +224,7 @@ class BuyerLocationUpdateSerializer(serializers.Serializer):
     latitude = serializers.FloatField()
     longitude = serializers.FloatField()
     radius_m = serializers.IntegerField(required=False)
+    digest_enabled = serializers.BooleanField(required=False)
 
     def validate_radius_m(self, value):
         if value is None:
@@ -222,6 +262,7 @@ class NotificationSerializer(serializers.ModelSerializer):
             'metadata',
             'is_read',
             'created_at',
+            'expires_at',
         ]
         read_only_fields = fields
 
@@ -264,6 +305,8 @@ class PKLRatingSummarySerializer(serializers.Serializer):
 
 class PKLProductSerializer(serializers.ModelSerializer):
     image_url = serializers.SerializerMethodField()
+    image_thumbnail_url = serializers.SerializerMethodField()
+    image_medium_url = serializers.SerializerMethodField()
 
     class Meta:
         model = PKLProduct
@@ -273,20 +316,32 @@ class PKLProductSerializer(serializers.ModelSerializer):
             'price',
             'description',
             'image_url',
+            'image_thumbnail_url',
+            'image_medium_url',
             'is_featured',
             'is_available',
         ]
         read_only_fields = ['id']
 
-    def get_image_url(self, obj):
-        if not obj.image:
+    def _file_url(self, field_file):
+        if not field_file:
             return None
         request = self.context.get('request') if hasattr(self, 'context') else None
-        url = obj.image.url
+        url = field_file.url
         if request is not None:
             return request.build_absolute_uri(url)
         return url
 
+    def get_image_url(self, obj):
+        return self._file_url(obj.image)
+
+    # Selama varian belum selesai dibuat, pakai gambar asli.
+    def get_image_thumbnail_url(self, obj):
+        return self._file_url(obj.image_thumbnail or obj.image)
+
+    def get_image_medium_url(self, obj):
+        return self._file_url(obj.image_medium or obj.image)
+
 
 class PKLDetailSerializer(PKLListSerializer):
     products = PKLProductSerializer(many=True, read_only=True)
@@ -325,11 +380,20 @@ class PKLProductWriteSerializer(serializers.ModelSerializer):
 
     def create(self, validated_data):
         validated_data.pop('remove_image', None)
-        return super().create(validated_data)
+        product = super().create(validated_data)
+        if product.image:
+            schedule_product_variants(product)
+        return product
 
     def update(self, instance, validated_data):
         remove_image = validated_data.pop('remove_image', False)
+        new_image = validated_data.get('image')
         if remove_image and instance.image:
             instance.image.delete(save=False)
             instance.image = None
-        return super().update(instance, validated_data)
+        if remove_image or 'image' in validated_data:
+            delete_product_variants(instance)
+        product = super().update(instance, validated_data)
+        if new_image:
+            schedule_product_variants(product)
+        return product
@@ -1,114 +1,240 @@
-from datetime import timedelta
-from typing import Optional, Tuple
+from datetime import datetime, timedelta, timezone as dt_timezone
 
+from django.db import transaction
+from django.db.models import Q
 from django.utils import timezone
 
 from .models import (
     PKL,
-    LokasiPKL,
     BuyerLocation,
-    FavoritePKL,
     Notification,
     DEFAULT_RADIUS_METERS,
 )
-from .utils import haversine_distance_km
+from .autocomplete import refresh_vendors
+from .cache import bump_active_list_version, invalidate_cached_pkl, store_cached_pkl
+from .geo import buyers_near_point, record_vendor_position, vendors_near_point
+from .tiles import invalidate_position
+from .utils import encode_geohash
 
 NOTIFICATION_COOLDOWN_MINUTES = 30
-
-
-def _latest_coordinates(pkl: PKL) -> Optional[Tuple[float, float]]:
-    lokasi = pkl.lokasi.order_by('-timestamp').first()
-    if not lokasi:
-        return None
-    return float(lokasi.latitude), float(lokasi.longitude)
-
-
-def _should_skip_notification(buyer, pkl, notif_type: str) -> bool:
-    cutoff = timezone.now() - timedelta(minutes=NOTIFICATION_COOLDOWN_MINUTES)
-    queryset = Notification.objects.filter(
-        buyer=buyer,
-        notif_type=notif_type,
-        created_at__gte=cutoff,
+NOTIFICATION_DIGEST_WINDOW_MINUTES = 30
+# detail vendor di metadata ringkasan dibatasi; pkl_ids tetap lengkap
+NOTIFICATION_DIGEST_MAX_VENDORS = 20
+
+
+def update_current_position(pkl: PKL, latitude: float, longitude: float, seen_at) -> bool:
+    """Copy the newest ping onto the PKL row and mark it active.
+
+    Returns ``True`` when this ping activated the PKL.
+    """
+    previous_geohash = pkl.geohash
+    pkl.last_latitude = float(latitude)
+    pkl.last_longitude = float(longitude)
+    pkl.last_seen_at = seen_at
+    pkl.geohash = encode_geohash(pkl.last_latitude, pkl.last_longitude)
+    fields = ['last_latitude', 'last_longitude', 'last_seen_at', 'geohash']
+
+    if pkl.status_aktif:
+        # Syarat status_aktif: salinan cache bisa saja masih aktif padahal
+        # PKL sudah dinonaktifkan oleh sweep_stale_pkls.
+        updated = PKL.objects.filter(pk=pkl.pk, status_aktif=True).update(
+            **{field: getattr(pkl, field) for field in fields}
+        )
+        if updated:
+            store_cached_pkl(pkl)
+            record_vendor_position(pkl)
+            invalidate_position(previous_geohash, pkl.geohash)
+            return False
+
+    # save() memicu signal: cache profil dan versi daftar aktif diperbarui
+    pkl.status_aktif = True
+    pkl.save(update_fields=fields + ['status_aktif'])
+    return True
+
+
+def deactivate_stale_pkls(stale_after: timedelta) -> int:
+    """Set ``status_aktif=False`` for PKL whose last ping is older than ``stale_after``.
+
+    One set-based UPDATE; the cutoff is re-checked in the UPDATE itself so a
+    PKL that pings between the SELECT and the UPDATE stays active.
+    """
+    cutoff = timezone.now() - stale_after
+    stale = PKL.objects.filter(status_aktif=True).filter(
+        Q(last_seen_at__lt=cutoff) | Q(last_seen_at__isnull=True)
     )
-    if pkl:
-        queryset = queryset.filter(pkl=pkl)
-    return queryset.exists()
-
-
-def _create_notification(*, buyer, pkl, notif_type: str, message: str, radius_m: int, distance_m: Optional[float], metadata: Optional[dict] = None):
-    if _should_skip_notification(buyer, pkl, notif_type):
-        return None
-
-    return Notification.objects.create(
-        buyer=buyer,
-        pkl=pkl,
-        notif_type=notif_type,
-        message=message,
-        radius_m=radius_m,
-        distance_m=distance_m,
-        metadata=metadata or {},
+    rows = list(stale.values_list('id', 'user_id'))
+    if not rows:
+        return 0
+
+    pkl_ids = [pkl_id for pkl_id, _ in rows]
+    deactivated = stale.filter(id__in=pkl_ids).update(status_aktif=False)
+    # Hanya cache proses ini; salinan di worker lain habis dalam AUTH_CACHE_TTL
+    # dan update_current_position tidak memercayai status_aktif di salinan itu.
+    # Versi daftar aktif ada di database, jadi langsung terlihat semua proses.
+    for _, user_id in rows:
+        invalidate_cached_pkl(user_id)
+    if deactivated:
+        bump_active_list_version()
+        refresh_vendors(pkl_ids)
+    return deactivated
+
+
+def _cooled_down(notif_type: str, **filters) -> set[int]:
+    """``(buyer_id, pkl_id)`` pairs that already got ``notif_type`` within the cooldown."""
+    now = timezone.now()
+    cutoff = now - timedelta(minutes=NOTIFICATION_COOLDOWN_MINUTES)
+    # batas atas ikut disebut agar hanya partisi bulan berjalan yang dipindai
+    return set(
+        Notification.objects.filter(notif_type=notif_type, created_at__range=(cutoff, now), **filters)
+        .values_list('buyer_id', 'pkl_id')
     )
 
 
 def notify_nearby_pkls(location: BuyerLocation) -> list[Notification]:
-    """Check all active PKL and notify buyer when within radius."""
+    """Notify a buyer about every active PKL within their radius.
+
+    Buyers with ``digest_enabled`` get :func:`_notify_nearby_digest` instead
+    of one row per vendor.
+    """
     if not location:
         return []
 
     radius_m = location.radius_m or DEFAULT_RADIUS_METERS
-    radius_km = radius_m / 1000.0
-    created_notifications: list[Notification] = []
-
-    pkls = PKL.objects.filter(status_aktif=True, status_verifikasi='DITERIMA').prefetch_related('lokasi')
-    for pkl in pkls:
-        coords = _latest_coordinates(pkl)
-        if not coords:
-            continue
-        latest_lat, latest_lng = coords
-        distance_km = haversine_distance_km(location.latitude, location.longitude, latest_lat, latest_lng)
-        if distance_km <= radius_km:
-            distance_m = distance_km * 1000
-            notif = _create_notification(
-                buyer=location.buyer,
-                pkl=pkl,
-                notif_type=Notification.TYPE_NEARBY,
-                message=f"PKL {pkl.nama_usaha} berada sekitar {distance_m:.0f} m dari lokasimu.",
-                radius_m=radius_m,
-                distance_m=distance_m,
-                metadata={'distance_m': distance_m, 'pkl_id': pkl.id},
-            )
-            if notif:
-                created_notifications.append(notif)
-    return created_notifications
+    nearby = vendors_near_point(location.latitude, location.longitude, radius_m)
+    if not nearby:
+        return []
+    if location.digest_enabled:
+        return _notify_nearby_digest(location, nearby, radius_m)
+
+    cooled_down = _cooled_down(
+        Notification.TYPE_NEARBY,
+        buyer_id=location.buyer_id,
+        pkl_id__in=[vendor.id for vendor, _ in nearby],
+    )
+    expires_at = Notification.expiry_for(Notification.TYPE_NEARBY, timezone.now())
+    return Notification.objects.bulk_create([
+        Notification(
+            buyer_id=location.buyer_id,
+            pkl_id=vendor.id,
+            notif_type=Notification.TYPE_NEARBY,
+            message=f"PKL {vendor.nama_usaha} berada sekitar {distance_m:.0f} m dari lokasimu.",
+            radius_m=radius_m,
+            distance_m=distance_m,
+            metadata={'distance_m': distance_m, 'pkl_id': vendor.id},
+            expires_at=expires_at,
+        )
+        for vendor, distance_m in nearby
+        if (location.buyer_id, vendor.id) not in cooled_down
+    ])
+
+
+def digest_window_start(now: datetime) -> datetime:
+    """Start of the fixed ``NOTIFICATION_DIGEST_WINDOW_MINUTES`` window holding ``now``."""
+    window_s = NOTIFICATION_DIGEST_WINDOW_MINUTES * 60
+    epoch_s = int(now.timestamp())
+    return datetime.fromtimestamp(epoch_s - epoch_s % window_s, tz=dt_timezone.utc)
+
+
+def _notify_nearby_digest(location: BuyerLocation, nearby: list, radius_m: int) -> list[Notification]:
+    """Merge nearby vendors into the buyer's single digest row of the current window.
+
+    The first ping of a window inserts the row; later pings only rewrite it
+    (and mark it unread) when they bring vendors not listed yet. Returns the
+    written digest, or ``[]`` when nothing changed.
+
+    Overlapping pings of one buyer are serialized on their ``BuyerLocation``
+    row, so a window never gets two digests and no merge is lost.
+    """
+    with transaction.atomic():
+        BuyerLocation.objects.select_for_update().filter(pk=location.pk).exists()
+        return _merge_digest(location, nearby, radius_m)
+
+
+def _merge_digest(location: BuyerLocation, nearby: list, radius_m: int) -> list[Notification]:
+    now = timezone.now()
+    digest = (
+        Notification.objects
+        .filter(
+            buyer_id=location.buyer_id,
+            notif_type=Notification.TYPE_NEARBY_DIGEST,
+            created_at__range=(digest_window_start(now), now),
+        )
+        .order_by('-created_at')
+        .first()
+    )
+    metadata = digest.metadata if digest else {}
+    pkl_ids = list(metadata.get('pkl_ids', []))
+    known = set(pkl_ids)
+    added = [(vendor, distance_m) for vendor, distance_m in nearby if vendor.id not in known]
+    if not added:
+        return []
+
+    pkl_ids.extend(vendor.id for vendor, _ in added)
+    vendors = metadata.get('vendors', []) + [
+        {'pkl_id': vendor.id, 'nama_usaha': vendor.nama_usaha, 'distance_m': distance_m}
+        for vendor, distance_m in added
+    ]
+    vendors.sort(key=lambda item: item['distance_m'])
+    vendors = vendors[:NOTIFICATION_DIGEST_MAX_VENDORS]
+    nearest = vendors[0]
+    fields = {
+        'message': (
+            f"{len(pkl_ids)} PKL berada di sekitarmu; terdekat {nearest['nama_usaha']} "
+            f"({nearest['distance_m']:.0f} m)."
+        ),
+        'radius_m': radius_m,
+        'distance_m': nearest['distance_m'],
+        'is_read': False,
+        'metadata': {'pkl_ids': pkl_ids, 'vendors': vendors, 'updated_at': now.isoformat()},
+        # ringkasan yang diperbarui ikut diperpanjang masa berlakunya
+        'expires_at': Notification.expiry_for(Notification.TYPE_NEARBY_DIGEST, now),
+    }
+
+    if digest is None:
+        return [Notification.objects.create(
+            buyer_id=location.buyer_id,
+            notif_type=Notification.TYPE_NEARBY_DIGEST,
+            **fields,
+        )]
+    # created_at ikut disebut agar UPDATE langsung ke partisi yang tepat
+    Notification.objects.filter(pk=digest.pk, created_at=digest.created_at).update(**fields)
+    for name, value in fields.items():
+        setattr(digest, name, value)
+    return [digest]
 
 
 def notify_favorite_pkl_active(pkl: PKL) -> list[Notification]:
-    favorites = FavoritePKL.objects.filter(pkl=pkl).select_related('buyer', 'buyer__buyer_location')
-    coords = _latest_coordinates(pkl)
-    if not coords:
+    """Notify followers of ``pkl`` who are within their own radius of it.
+
+    Followers come from :func:`geo.buyers_near_point` in chunks; each chunk
+    gets one cooldown query and one ``bulk_create``.
+    """
+    if pkl.last_latitude is None or pkl.last_longitude is None:
         return []
 
-    latest_lat, latest_lng = coords
+    followers = BuyerLocation.objects.filter(buyer__favorite_pkls__pkl=pkl)
+    message = f"PKL favoritmu {pkl.nama_usaha} baru saja aktif di dekatmu."
+    expires_at = Notification.expiry_for(Notification.TYPE_FAVORITE_ACTIVE, timezone.now())
     created: list[Notification] = []
 
-    for favorite in favorites:
-        location = getattr(favorite.buyer, 'buyer_location', None)
-        if not location:
-            continue
-        radius_m = location.radius_m or DEFAULT_RADIUS_METERS
-        radius_km = radius_m / 1000.0
-        distance_km = haversine_distance_km(location.latitude, location.longitude, latest_lat, latest_lng)
-        if distance_km <= radius_km:
-            distance_m = distance_km * 1000
-            notif = _create_notification(
-                buyer=favorite.buyer,
+    for matches in buyers_near_point(pkl.last_latitude, pkl.last_longitude, buyers=followers):
+        cooled_down = _cooled_down(
+            Notification.TYPE_FAVORITE_ACTIVE,
+            pkl=pkl,
+            buyer_id__in=[buyer_id for buyer_id, _, _ in matches],
+        )
+        created.extend(Notification.objects.bulk_create([
+            Notification(
+                buyer_id=buyer_id,
                 pkl=pkl,
                 notif_type=Notification.TYPE_FAVORITE_ACTIVE,
-                message=f"PKL favoritmu {pkl.nama_usaha} baru saja aktif di dekatmu.",
+                message=message,
                 radius_m=radius_m,
                 distance_m=distance_m,
                 metadata={'distance_m': distance_m, 'pkl_id': pkl.id},
+                expires_at=expires_at,
             )
-            if notif:
-                created.append(notif)
+            for buyer_id, distance_m, radius_m in matches
+            if (buyer_id, pkl.id) not in cooled_down
+        ]))
     return created
@@ -0,0 +1,38 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .autocomplete import refresh_vendors
+from .cache import bump_active_list_version, invalidate_cached_pkl
+from .models import PKL, PKLProduct, PreOrder
+from .order_queue import record_change
+
+# Kolom yang memengaruhi isi trie autocomplete.
+_AUTOCOMPLETE_FIELDS = {'nama_usaha', 'jenis_dagangan', 'status_aktif', 'status_verifikasi'}
+_AUTOCOMPLETE_PRODUCT_FIELDS = {'name', 'is_available', 'pkl'}
+
+
+def _touches(update_fields, fields) -> bool:
+    return update_fields is None or bool(fields & set(update_fields))
+
+
+@receiver(post_save, sender=PKL)
+@receiver(post_delete, sender=PKL)
+def clear_cached_pkl(sender, instance, **kwargs):
+    invalidate_cached_pkl(instance.user_id)
+    # status aktif/verifikasi bisa berubah; cache daftar PKL aktif ikut kadaluarsa
+    bump_active_list_version()
+    if _touches(kwargs.get('update_fields'), _AUTOCOMPLETE_FIELDS):
+        refresh_vendors([instance.pk])
+
+
+@receiver(post_save, sender=PKLProduct)
+@receiver(post_delete, sender=PKLProduct)
+def refresh_product_suggestions(sender, instance, **kwargs):
+    if _touches(kwargs.get('update_fields'), _AUTOCOMPLETE_PRODUCT_FIELDS):
+        refresh_vendors([instance.pkl_id])
+
+
+@receiver(post_delete, sender=PreOrder)
+def release_order_queue_slot(sender, instance, **kwargs):
+    # saat PKL ikut dihapus, baris antreannya bisa sudah hilang; jangan dibuat ulang
+    record_change(instance.pkl_id, removed=[(instance.status, instance.dp_status)], create_missing=False)
@@ -0,0 +1,253 @@
+"""PKL counters: hourly writes, rollups into daily/weekly/monthly tables and range queries.
+
+Increments only touch ``PKLHourlyStats``. ``compact_stats`` rolls closed days
+(before today) up into ``PKLDailyStats``, ``PKLWeeklyStats`` and
+``PKLMonthlyStats``; anything for today is read straight from the hourly
+table, so the rollup tables never double count the current day.
+"""
+from collections import Counter
+from datetime import date, datetime, time, timedelta
+from typing import Iterable
+
+from django.db import connection, transaction
+from django.db.models import Sum
+from django.db.models.functions import TruncDate, TruncMonth, TruncWeek
+from django.utils import timezone
+
+from .models import PKLHourlyStats, PKLDailyStats, PKLWeeklyStats, PKLMonthlyStats
+
+STAT_FIELDS = ('live_views', 'search_hits', 'auto_updates')
+
+GRANULARITY_HOUR = 'hour'
+GRANULARITY_DAY = 'day'
+GRANULARITY_WEEK = 'week'
+GRANULARITY_MONTH = 'month'
+GRANULARITIES = (GRANULARITY_HOUR, GRANULARITY_DAY, GRANULARITY_WEEK, GRANULARITY_MONTH)
+MAX_BUCKETS = {
+    GRANULARITY_HOUR: 24 * 7,
+    GRANULARITY_DAY: 366,
+    GRANULARITY_WEEK: 157,
+    GRANULARITY_MONTH: 120,
+}
+
+
+class StatsRangeTooLarge(Exception):
+    """Rentang menghasilkan terlalu banyak bucket untuk granularity ini."""
+
+
+def _midnight(day: date) -> datetime:
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def _empty_totals() -> dict:
+    return {field: 0 for field in STAT_FIELDS}
+
+
+def _sums() -> dict:
+    return {field: Sum(field) for field in STAT_FIELDS}
+
+
+def increment_stats(pkl_ids: Iterable[int], field: str) -> None:
+    """Add 1 to ``field`` of the current hour for every id, in one upsert.
+
+    Repeated ids add more than 1. Rows are written in id order so two
+    concurrent batches lock them in the same order.
+    """
+    if field not in STAT_FIELDS:
+        raise ValueError(f'Unknown stat field: {field}')
+    counts = Counter(pkl_ids)
+    if not counts:
+        return
+
+    hour = connection.ops.adapt_datetimefield_value(
+        timezone.now().replace(minute=0, second=0, microsecond=0)
+    )
+    quote = connection.ops.quote_name
+    table = quote(PKLHourlyStats._meta.db_table)
+    column = quote(field)
+    params = []
+    for pkl_id in sorted(counts):
+        params.extend([pkl_id, hour] + [counts[pkl_id] if name == field else 0 for name in STAT_FIELDS])
+    row = f"({', '.join(['%s'] * (2 + len(STAT_FIELDS)))})"
+    sql = (
+        f"INSERT INTO {table} (pkl_id, hour, {', '.join(quote(name) for name in STAT_FIELDS)}) "
+        f"VALUES {', '.join([row] * len(counts))} "
+        f"ON CONFLICT (pkl_id, hour) DO UPDATE SET {column} = {table}.{column} + EXCLUDED.{column}"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+
+
+def increment_stat(pkl_id: int, field: str) -> None:
+    increment_stats([pkl_id], field)
+
+
+def today_totals(pkl_id: int | None = None) -> dict:
+    """Counters for today summed from the hourly table (all PKL when ``pkl_id`` is None)."""
+    queryset = PKLHourlyStats.objects.filter(hour__gte=_midnight(timezone.localdate()))
+    if pkl_id is not None:
+        queryset = queryset.filter(pkl_id=pkl_id)
+    totals = queryset.aggregate(**_sums())
+    return {field: totals[field] or 0 for field in STAT_FIELDS}
+
+
+def _upsert(model, unique_field: str, rows) -> int:
+    objects = [
+        model(pkl_id=row['pkl_id'], **{unique_field: row['period']}, **{field: row[field] or 0 for field in STAT_FIELDS})
+        for row in rows
+    ]
+    model.objects.bulk_create(
+        objects,
+        batch_size=1000,
+        update_conflicts=True,
+        unique_fields=['pkl', unique_field],
+        update_fields=list(STAT_FIELDS),
+    )
+    return len(objects)
+
+
+def compact(start: date, end: date) -> dict:
+    """Recompute daily rows for ``start``..``end`` and the weeks/months containing them.
+
+    Only closed days are compacted; ``end`` is clamped to yesterday. Rows are
+    upserted, so daily rows written before the hourly table existed are kept.
+    """
+    end = min(end, timezone.localdate() - timedelta(days=1))
+    if start > end:
+        return {'days': 0, 'weeks': 0, 'months': 0}
+
+    day_rows = (
+        PKLHourlyStats.objects.filter(hour__gte=_midnight(start), hour__lt=_midnight(end + timedelta(days=1)))
+        .annotate(period=TruncDate('hour'))
+        .values('pkl_id', 'period')
+        .annotate(**_sums())
+    )
+
+    week_first = start - timedelta(days=start.weekday())
+    month_first = start.replace(day=1)
+    rollup_source = PKLDailyStats.objects.filter(date__gte=min(week_first, month_first), date__lte=end)
+
+    with transaction.atomic():
+        days = _upsert(PKLDailyStats, 'date', day_rows)
+        week_rows = (
+            rollup_source.filter(date__gte=week_first)
+            .annotate(period=TruncWeek('date'))
+            .values('pkl_id', 'period')
+            .annotate(**_sums())
+        )
+        weeks = _upsert(PKLWeeklyStats, 'week_start', week_rows)
+        month_rows = (
+            rollup_source.filter(date__gte=month_first)
+            .annotate(period=TruncMonth('date'))
+            .values('pkl_id', 'period')
+            .annotate(**_sums())
+        )
+        months = _upsert(PKLMonthlyStats, 'month', month_rows)
+
+    return {'days': days, 'weeks': weeks, 'months': months}
+
+
+def prune_hourly(keep_days: int) -> int:
+    """Delete hourly rows older than ``keep_days`` (already rolled up into days)."""
+    cutoff = _midnight(timezone.localdate() - timedelta(days=keep_days))
+    deleted, _ = PKLHourlyStats.objects.filter(hour__lt=cutoff).delete()
+    return deleted
+
+
+def _month_after(day: date) -> date:
+    return (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def _bucket_starts(start, end, granularity):
+    """Bucket starts covering ``start``..``end`` (inclusive), snapped to the granularity."""
+    if granularity == GRANULARITY_HOUR:
+        current, stop, step = _midnight(start), _midnight(end + timedelta(days=1)), timedelta(hours=1)
+        while current < stop:
+            yield current
+            current += step
+        return
+    if granularity == GRANULARITY_WEEK:
+        start = start - timedelta(days=start.weekday())
+    elif granularity == GRANULARITY_MONTH:
+        start = start.replace(day=1)
+    current = start
+    while current <= end:
+        yield current
+        if granularity == GRANULARITY_MONTH:
+            current = _month_after(current)
+        elif granularity == GRANULARITY_WEEK:
+            current += timedelta(days=7)
+        else:
+            current += timedelta(days=1)
+
+
+def stats_range(pkl_id: int, start: date, end: date, granularity: str) -> dict:
+    """Counters for ``start``..``end`` bucketed by ``granularity``.
+
+    Each granularity reads its own table (hourly for ``hour``, daily for
+    ``day``, ...), so long ranges at coarse granularity only touch a handful of
+    rows. Today's counts always come from the hourly table.
+    """
+    starts = []
+    for bucket in _bucket_starts(start, end, granularity):
+        starts.append(bucket)
+        if len(starts) > MAX_BUCKETS[granularity]:
+            raise StatsRangeTooLarge()
+
+    buckets = {bucket: _empty_totals() for bucket in starts}
+    today = timezone.localdate()
+
+    if granularity == GRANULARITY_HOUR:
+        rows = (
+            PKLHourlyStats.objects.filter(pkl_id=pkl_id, hour__gte=starts[0], hour__lte=starts[-1])
+            .values('hour', *STAT_FIELDS)
+        )
+        for row in rows:
+            buckets[row['hour']] = {field: row[field] for field in STAT_FIELDS}
+    else:
+        model, period_field = {
+            GRANULARITY_DAY: (PKLDailyStats, 'date'),
+            GRANULARITY_WEEK: (PKLWeeklyStats, 'week_start'),
+            GRANULARITY_MONTH: (PKLMonthlyStats, 'month'),
+        }[granularity]
+        rows = model.objects.filter(
+            pkl_id=pkl_id,
+            **{f'{period_field}__gte': starts[0], f'{period_field}__lte': starts[-1]},
+        )
+        if granularity == GRANULARITY_DAY:
+            rows = rows.filter(date__lt=today)
+        for row in rows.values(period_field, *STAT_FIELDS):
+            buckets[row[period_field]] = {field: row[field] for field in STAT_FIELDS}
+
+        current = [bucket for bucket in starts if bucket <= today]
+        if current and end >= today:
+            live = today_totals(pkl_id)
+            target = buckets[current[-1]]
+            for field in STAT_FIELDS:
+                target[field] += live[field]
+
+    totals = _empty_totals()
+    for values in buckets.values():
+        for field in STAT_FIELDS:
+            totals[field] += values[field]
+
+    last = starts[-1]
+    if granularity == GRANULARITY_HOUR:
+        range_start, range_end = start, end
+    elif granularity == GRANULARITY_WEEK:
+        range_start, range_end = starts[0], last + timedelta(days=6)
+    elif granularity == GRANULARITY_MONTH:
+        range_start, range_end = starts[0], _month_after(last) - timedelta(days=1)
+    else:
+        range_start, range_end = starts[0], last
+
+    return {
+        'granularity': granularity,
+        'from': range_start.isoformat(),
+        'to': range_end.isoformat(),
+        'buckets': [
+            {'start': bucket.isoformat(), **values}
+            for bucket, values in sorted(buckets.items())
+        ],
+        'totals': totals,
+    }
@@ -1,3 +1,849 @@
-from django.test import TestCase
+import io
+import json
+import math
+import shutil
+import tempfile
+import threading
+from datetime import timedelta
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection, connections as db_connections
+from django.test import AsyncClient, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from PIL import Image
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .autocomplete import MAX_TRIE_AGE_SECONDS, VERSION_KEY as AUTOCOMPLETE_VERSION_KEY, _AutocompleteIndex, _publish
+from .cache import active_list_version, bump_shared_version, store_cached_pkl
+from .management.commands.explain_hot_queries import explain_plans
+from .geo import EARTH_RADIUS_M, VendorPosition, buyers_near_point, vendors_near_point
+from .images import PRODUCT_IMAGE_VARIANTS
+from .models import (
+    PKL,
+    BuyerLocation,
+    LokasiPKL,
+    Notification,
+    PKLHourlyStats,
+    PKLOrderQueueState,
+    PKLProduct,
+    PreOrder,
+)
+from .partitions import (
+    add_months,
+    create_partition,
+    current_month,
+    drop_partition,
+    expired_partitions,
+    month_bounds,
+    monthly_partitions,
+)
+from .ranking import order, resolve_weights, score
+from .search import search_products
+from .services import _notify_nearby_digest, deactivate_stale_pkls, update_current_position
+from .stats import increment_stats
+from .throttling import LocalBucketBackend
+from .tiles import get_tiles
+from .trajectory import get_track
+from .transitions import (
+    InvalidTransition,
+    TransitionConflict,
+    apply_transition,
+    bulk_transition_status,
+    transition_status,
+)
+from .utils import encode_geohash
+from .views_async import _run_fanout
+
+User = get_user_model()
+
+
+def make_pkl(username='pkl1', **kwargs):
+    user = User.objects.create_user(username=username, password='x', role='PKL')
+    defaults = {'nama_usaha': 'Bakso Pak Budi', 'jenis_dagangan': 'Bakso', 'jam_operasional': '10-22'}
+    defaults.update(kwargs)
+    return PKL.objects.create(user=user, **defaults)
+
+
+def make_buyer(username='buyer1'):
+    return User.objects.create_user(username=username, password='x', role='USER')
+
+
+def make_admin_client():
+    admin = User.objects.create_user(username='admin', password='x', role='ADMIN', is_staff=True)
+    client = APIClient()
+    client.force_authenticate(admin)
+    return client
+
+
+def make_preorder(pkl, buyer, **kwargs):
+    return PreOrder.objects.create(pkl=pkl, pembeli=buyer, deskripsi_pesanan='2 porsi', **kwargs)
+
+
+class PreOrderTransitionTests(TestCase):
+    def setUp(self):
+        self.pkl = make_pkl()
+        self.buyer = make_buyer()
+
+    def test_transition_status_bumps_version(self):
+        preorder = make_preorder(self.pkl, self.buyer)
+        transition_status(preorder, 'DITERIMA')
+        preorder.refresh_from_db()
+        self.assertEqual((preorder.status, preorder.version), ('DITERIMA', 1))
+
+    def test_same_status_is_a_no_op(self):
+        preorder = make_preorder(self.pkl, self.buyer, status='DITERIMA')
+        transition_status(preorder, 'DITERIMA')
+        preorder.refresh_from_db()
+        self.assertEqual(preorder.version, 0)
+
+    def test_finished_order_cannot_be_reopened(self):
+        preorder = make_preorder(self.pkl, self.buyer, status='SELESAI')
+        with self.assertRaises(InvalidTransition):
+            transition_status(preorder, 'DITERIMA')
+
+    def test_apply_transition_checks_status_changes(self):
+        preorder = make_preorder(self.pkl, self.buyer, status='SELESAI', dp_status='TERKONFIRMASI')
+        with self.assertRaises(InvalidTransition):
+            apply_transition(preorder, {'status': 'DITOLAK', 'dp_status': 'BELUM_BAYAR'})
+        preorder.refresh_from_db()
+        self.assertEqual((preorder.status, preorder.dp_status), ('SELESAI', 'TERKONFIRMASI'))
+
+    def test_apply_transition_allows_dp_change_without_status_move(self):
+        preorder = make_preorder(self.pkl, self.buyer, status='DITERIMA')
+        apply_transition(preorder, {'status': 'DITERIMA', 'dp_status': 'TERKONFIRMASI'})
+        preorder.refresh_from_db()
+        self.assertEqual(preorder.dp_status, 'TERKONFIRMASI')
+
+    def test_stale_version_conflicts(self):
+        preorder = make_preorder(self.pkl, self.buyer)
+        stale = PreOrder.objects.get(pk=preorder.pk)
+        transition_status(preorder, 'DITERIMA')
+        with self.assertRaises(TransitionConflict):
+            transition_status(stale, 'DITOLAK')
+
+    def test_non_numeric_version_is_invalid(self):
+        preorder = make_preorder(self.pkl, self.buyer)
+        with self.assertRaises(InvalidTransition):
+            transition_status(preorder, 'DITERIMA', expected_version='abc')
+
+    def test_bulk_transition_skips_unreachable_and_foreign_orders(self):
+        other = make_pkl('pkl2')
+        pending = make_preorder(self.pkl, self.buyer)
+        done = make_preorder(self.pkl, self.buyer, status='SELESAI')
+        foreign = make_preorder(other, self.buyer)
+
+        updated, skipped = bulk_transition_status(self.pkl, [pending.pk, done.pk, foreign.pk], 'DITOLAK')
+
+        self.assertEqual(updated, [pending.pk])
+        self.assertEqual(skipped, [done.pk, foreign.pk])
+        state = PKLOrderQueueState.objects.get(pkl=self.pkl)
+        self.assertEqual((state.status_pending, state.status_ditolak, state.status_selesai), (0, 1, 1))
+
+    def test_dp_verification_rejects_finished_order(self):
+        preorder = make_preorder(self.pkl, self.buyer, status='SELESAI', dp_status='MENUNGGU_KONFIRMASI')
+        client = APIClient()
+        client.force_authenticate(self.pkl.user)
+
+        response = client.post(
+            f'/api/pkl/preorder/{preorder.pk}/dp-verification/', {'action': 'TOLAK'}, format='json',
+        )
+
+        self.assertEqual(response.status_code, 400)
+        preorder.refresh_from_db()
+        self.assertEqual((preorder.status, preorder.dp_status), ('SELESAI', 'MENUNGGU_KONFIRMASI'))
+
+
+class PKLProfileTests(TestCase):
+    url = '/api/pkl/profile/'
+
+    def setUp(self):
+        self.pkl = make_pkl()
+        self.client = APIClient()
+        self.client.force_authenticate(self.pkl.user)
+
+    def test_edit_keeps_verification_done_by_another_worker(self):
+        response = self.client.put(self.url, {'tentang': 'Sejak 1998'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        stale = PKL.objects.get(pk=self.pkl.pk)
+
+        verify = make_admin_client().patch(
+            f'/api/pkl/admin/{self.pkl.pk}/verify/',
+            {'status_verifikasi': 'DITERIMA', 'catatan_verifikasi': 'Sesuai survei'},
+            format='json',
+        )
+        self.assertEqual(verify.status_code, 200)
+        # Worker ini masih memegang salinan profil dari sebelum verifikasi.
+        store_cached_pkl(stale)
+
+        response = self.client.put(self.url, {'jam_operasional': '16-23'}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.pkl.refresh_from_db()
+        self.assertEqual(
+            (self.pkl.status_verifikasi, self.pkl.catatan_verifikasi, self.pkl.tentang, self.pkl.jam_operasional),
+            ('DITERIMA', 'Sesuai survei', 'Sejak 1998', '16-23'),
+        )
+
+
+class PKLOrderQueueTests(TestCase):
+    url = '/api/pkl/preorder/pkl/queue/'
+
+    def setUp(self):
+        self.pkl = make_pkl()
+        self.buyer = make_buyer()
+        self.client = APIClient()
+        self.client.force_authenticate(self.pkl.user)
+
+    def test_unchanged_queue_returns_304(self):
+        preorder = make_preorder(self.pkl, self.buyer)
+        first = self.client.get(self.url)
+        self.assertEqual(first.status_code, 200)
+
+        again = self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(again.status_code, 304)
+
+        transition_status(preorder, 'DITERIMA')
+        changed = self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(changed.status_code, 200)
+        self.assertEqual(changed.data['status_counts']['DITERIMA'], 1)
+
+    def test_resynced_state_does_not_reuse_etag(self):
+        first = self.client.get(self.url)
+        PKLOrderQueueState.objects.filter(pkl=self.pkl).delete()
+        make_preorder(self.pkl, self.buyer)
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag'])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['version'], 1)
+        self.assertNotEqual(response['ETag'], first['ETag'])
+
+
+def use_temp_media_root(test):
+    media_root = tempfile.mkdtemp()
+    test.addCleanup(shutil.rmtree, media_root)
+    settings_override = override_settings(MEDIA_ROOT=media_root)
+    settings_override.enable()
+    test.addCleanup(settings_override.disable)
+
+
+def make_image_file(size, mode='RGB', color='red', fmt='PNG', name='bukti.png'):
+    buffer = io.BytesIO()
+    Image.new(mode, size, color).save(buffer, fmt)
+    return SimpleUploadedFile(name, buffer.getvalue())
+
+
+class DPProofUploadTests(TestCase):
+    url = '/api/pkl/upload/dp-proof/'
+
+    def setUp(self):
+        use_temp_media_root(self)
+        self.client = APIClient()
+        self.client.force_authenticate(make_buyer())
+
+    def _upload(self, file_obj):
+        return self.client.post(self.url, {'file': file_obj}, format='multipart')
+
+    def _stored(self, response):
+        return response.data['url'].split('/media/', 1)[1]
+
+    def test_identical_uploads_are_stored_once(self):
+        first = self._upload(make_image_file((40, 30)))
+        second = self._upload(make_image_file((40, 30)))
+
+        self.assertEqual((first.status_code, second.status_code), (201, 201))
+        self.assertEqual(first.data['url'], second.data['url'])
+        self.assertEqual(default_storage.listdir('dp_proofs')[1], [self._stored(first).split('/')[-1]])
+
+    @override_settings(DP_PROOF_MAX_BYTES=1024)
+    def test_file_over_size_cap_is_rejected(self):
+        response = self._upload(SimpleUploadedFile('bukti.jpg', b'x' * 2048))
+
+        self.assertEqual(response.status_code, 413)
+        self.assertFalse(default_storage.exists('dp_proofs'))
+
+    def test_large_transparent_png_is_downscaled_onto_white(self):
+        response = self._upload(make_image_file((3200, 1600), mode='RGBA', color=(0, 0, 0, 0)))
+
+        self.assertEqual(response.status_code, 201)
+        path = self._stored(response)
+        self.assertTrue(path.endswith('.jpg'))
+        with default_storage.open(path) as stored, Image.open(stored) as img:
+            self.assertEqual(img.size, (1600, 800))
+            self.assertGreater(min(img.getpixel((10, 10))), 245)
+
+    @mock.patch('pkl.uploads.DP_PROOF_MAX_PIXELS', 3000 * 1000)
+    def test_image_over_pixel_budget_is_rejected(self):
+        response = self._upload(make_image_file((3200, 1600)))
+
+        self.assertEqual(response.status_code, 413)
+        self.assertFalse(default_storage.exists('dp_proofs'))
+
+
+def _run_now(fn, *args):
+    fn(*args)
+
+
+# TransactionTestCase: job latar menutup koneksi lama (close_old_connections)
+# dan on_commit langsung berjalan di luar transaksi.
+@mock.patch('pkl.images._executor.submit', _run_now)
+class ProductImageVariantTests(TransactionTestCase):
+    def setUp(self):
+        use_temp_media_root(self)
+        self.pkl = make_pkl()
+        self.client = APIClient()
+        self.client.force_authenticate(self.pkl.user)
+
+    def _assert_variants(self, product):
+        product.refresh_from_db()
+        for field_name, bounds in PRODUCT_IMAGE_VARIANTS.items():
+            field_file = getattr(product, field_name)
+            self.assertTrue(field_file.name.endswith('.jpg'), field_name)
+            with field_file.open('rb') as stored, Image.open(stored) as img:
+                self.assertLessEqual(max(img.size), max(bounds))
+
+    def test_upload_writes_variant_urls_back(self):
+        response = self.client.post('/api/pkl/products/', {
+            'name': 'Bakso Urat', 'price': 15000, 'image': make_image_file((1200, 900), name='bakso.png'),
+        }, format='multipart')
+        self.assertEqual(response.status_code, 201)
+
+        product = PKLProduct.objects.get(pk=response.data['id'])
+        self._assert_variants(product)
+        listed = self.client.get('/api/pkl/products/').data[0]
+        self.assertTrue(listed['image_thumbnail_url'].endswith(product.image_thumbnail.url))
+        self.assertTrue(listed['image_medium_url'].endswith(product.image_medium.url))
+
+    def test_backfill_command_generates_missing_variants(self):
+        product = PKLProduct.objects.create(
+            pkl=self.pkl, name='Es Teh', price=5000,
+            image=make_image_file((600, 600), mode='RGBA', name='esteh.png'),
+        )
+        out = io.StringIO()
+
+        call_command('backfill_product_images', stdout=out)
+
+        self.assertIn('Produk diproses: 1, gagal: 0', out.getvalue())
+        self._assert_variants(product)
+
+
+@mock.patch('pkl.views_async.spawn_fanout')
+class AsyncLocationViewTests(TestCase):
+    pkl_url = '/api/pkl/async/update-location/'
+    buyer_url = '/api/pkl/async/buyer/location/'
+
+    def setUp(self):
+        self.client = AsyncClient()
+
+    def _auth(self, user):
+        return {'Authorization': f'Bearer {AccessToken.for_user(user)}'}
+
+    async def test_missing_or_invalid_token_is_401(self, spawn_fanout):
+        for headers in ({}, {'Authorization': 'Bearer bukan-token'}):
+            with self.subTest(headers=headers):
+                response = await self.client.post(
+                    self.pkl_url, {'latitude': -6.2, 'longitude': 106.8},
+                    content_type='application/json', headers=headers,
+                )
+                self.assertEqual(response.status_code, 401)
+                self.assertIn('WWW-Authenticate', response)
+
+    async def test_wrong_role_is_403(self, spawn_fanout):
+        buyer = await sync_to_async(make_buyer)()
+        response = await self.client.post(
+            self.pkl_url, {'latitude': -6.2, 'longitude': 106.8},
+            content_type='application/json', headers=self._auth(buyer),
+        )
+        self.assertEqual(response.status_code, 403)
+
+    async def test_ping_is_created_then_coalesced_then_throttled(self, spawn_fanout):
+        pkl = await sync_to_async(make_pkl)(status_verifikasi='DITERIMA')
+        burst = settings.LOCATION_THROTTLE_RATES['pkl-location'][0]
+        codes = []
+        for _ in range(burst + 1):
+            response = await self.client.post(
+                self.pkl_url, {'latitude': -6.2, 'longitude': 106.8},
+                content_type='application/json', headers=self._auth(pkl.user),
+            )
+            codes.append(response.status_code)
+
+        # ping aktivasi tidak dihitung untuk penggabungan, ping kedua membuka jendela interval
+        self.assertEqual(codes, [201, 201] + [202] * (burst - 2) + [429])
+        self.assertIn('Retry-After', response)
+        self.assertEqual(await LokasiPKL.objects.filter(pkl=pkl).acount(), 2)
+        await pkl.arefresh_from_db()
+        self.assertTrue(pkl.status_aktif)
+        spawn_fanout.assert_called_once()
+
+    async def test_buyer_location_passes_digest_enabled_through(self, spawn_fanout):
+        buyer = await sync_to_async(make_buyer)()
+        headers = self._auth(buyer)
+
+        created = await self.client.post(
+            self.buyer_url, {'latitude': -6.2, 'longitude': 106.8, 'digest_enabled': True},
+            content_type='application/json', headers=headers,
+        )
+        self.assertEqual(created.status_code, 201)
+        self.assertTrue(json.loads(created.content)['digest_enabled'])
+
+        # radius berbeda: bukan ping yang digabung, digest_enabled tidak dikirim
+        updated = await self.client.post(
+            self.buyer_url, {'latitude': -6.21, 'longitude': 106.81, 'radius_m': 1000},
+            content_type='application/json', headers=headers,
+        )
+        self.assertEqual(updated.status_code, 200)
+        location = await BuyerLocation.objects.aget(buyer=buyer)
+        self.assertEqual((location.radius_m, location.digest_enabled), (1000, True))
+        self.assertEqual(spawn_fanout.call_count, 2)
+
+        fetched = await self.client.get(self.buyer_url, headers=headers)
+        self.assertEqual(json.loads(fetched.content)['latitude'], -6.21)
+
+
+class FanoutErrorTests(SimpleTestCase):
+    def test_error_is_logged_inside_the_worker_thread(self):
+        def fail():
+            raise RuntimeError('boom')
+
+        with self.assertLogs('pkl.views_async', 'ERROR') as logs:
+            _run_fanout(fail)
+        self.assertIn('boom', logs.output[0])
+
+
+@skipUnless(connection.vendor == 'postgresql', 'partisi hanya ada di PostgreSQL')
+class PartitionTests(TransactionTestCase):
+    def setUp(self):
+        self.pkl = make_pkl()
+
+    def _ping_at(self, moment):
+        lokasi = LokasiPKL.objects.create(pkl=self.pkl, latitude=-6.2, longitude=106.8, status='AKTIF')
+        LokasiPKL.objects.filter(pk=lokasi.pk).update(timestamp=moment)
+        return lokasi.pk
+
+    def _partition_of(self, pk):
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT tableoid::regclass::text FROM pkl_lokasipkl WHERE id = %s', [pk])
+            row = cursor.fetchone()
+        return row[0] if row else None
+
+    def test_new_partition_takes_rows_from_default(self):
+        month = add_months(current_month(), 24)
+        self.assertNotIn(month, monthly_partitions(LokasiPKL))
+        pk = self._ping_at(month_bounds(month)[0] + timedelta(days=3))
+        self.assertEqual(self._partition_of(pk), 'pkl_lokasipkl_default')
+
+        name = create_partition(LokasiPKL, month)
+        self.addCleanup(drop_partition, LokasiPKL, name)
+
+        self.assertEqual(self._partition_of(pk), name)
+        self.assertEqual(monthly_partitions(LokasiPKL)[month], name)
+
+    def test_expired_partitions_are_dropped(self):
+        old_month = add_months(current_month(), -30)
+        old_name = create_partition(LokasiPKL, old_month)
+        old_pk = self._ping_at(month_bounds(old_month)[0])
+        recent_pk = self._ping_at(timezone.now())
+
+        expired = expired_partitions(LokasiPKL, retain_months=12)
+        self.assertIn((old_month, old_name), expired)
+        self.assertTrue(all(month < add_months(current_month(), -11) for month, _ in expired))
+
+        out = io.StringIO()
+        call_command('manage_partitions', months_ahead=0, lokasi_retain_months=12, stdout=out)
+
+        self.assertIn(f'({old_name}) dihapus', out.getvalue())
+        self.assertNotIn(old_month, monthly_partitions(LokasiPKL))
+        self.assertEqual(list(LokasiPKL.objects.filter(pk__in=[old_pk, recent_pk]).values_list('pk', flat=True)), [recent_pk])
+
+
+class IncrementStatsTests(TestCase):
+    def test_repeated_ids_add_up_in_the_current_hour_row(self):
+        first, second = make_pkl('pkl1'), make_pkl('pkl2')
+
+        increment_stats([first.pk, second.pk, first.pk], 'search_hits')
+        increment_stats([first.pk], 'search_hits')
+        increment_stats([first.pk], 'live_views')
+
+        # satu baris per PKL per jam: panggilan berikutnya menambah, bukan menyisipkan
+        rows = PKLHourlyStats.objects.order_by('pkl_id').values_list('pkl_id', 'search_hits', 'live_views')
+        self.assertEqual(list(rows), [(first.pk, 3, 1), (second.pk, 1, 0)])
+
+    def test_unknown_field_is_rejected(self):
+        with self.assertRaises(ValueError):
+            increment_stats([1], 'bogus')
+
+
+class AdminPKLTrackTests(TransactionTestCase):
+    # view ini membaca dari replica bila dikonfigurasi; replica uji hanya
+    # melihat data yang sudah di-commit
+    databases = '__all__'
+
+    def setUp(self):
+        self.pkl = make_pkl()
+        self.client = make_admin_client()
+        self.url = f'/api/pkl/admin/{self.pkl.pk}/track/'
+
+    def test_impossible_date_is_rejected(self):
+        response = self.client.get(self.url, {'from': '2026-02-30T00:00'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_tolerance_below_minimum_is_rejected(self):
+        response = self.client.get(self.url, {'tolerance_m': '0'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_track_is_capped_at_max_points(self):
+        LokasiPKL.objects.bulk_create([
+            LokasiPKL(pkl=self.pkl, latitude=-6.2 + (i % 2) * 0.01, longitude=106.8 + i * 0.01)
+            for i in range(10)
+        ])
+        now = timezone.now()
+
+        track = get_track(self.pkl.id, now - timedelta(hours=1), now + timedelta(hours=1), 1.0, 4)
+
+        self.assertTrue(track['truncated'])
+        self.assertEqual(len(track['points']), 4)
+
+        track = get_track(self.pkl.id, now - timedelta(hours=1), now + timedelta(hours=1), 1.0, 100)
+        self.assertFalse(track['truncated'])
+        self.assertEqual((track['raw_points'], len(track['points'])), (10, 10))
+
+
+class AdminExportTests(TransactionTestCase):
+    # view ini membaca dari replica bila dikonfigurasi; replica uji hanya
+    # melihat data yang sudah di-commit
+    databases = '__all__'
+
+    def test_impossible_date_is_rejected(self):
+        response = make_admin_client().get('/api/pkl/admin/export/preorders/', {'from': '2026-02-30'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_streams_csv(self):
+        make_preorder(make_pkl(), make_buyer())
+        response = make_admin_client().get('/api/pkl/admin/export/preorders/')
+        self.assertEqual(response.status_code, 200)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 2)
+
+
+class PKLStatsRangeTests(TransactionTestCase):
+    # view ini membaca dari replica bila dikonfigurasi; replica uji hanya
+    # melihat data yang sudah di-commit
+    databases = '__all__'
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(make_pkl().user)
+
+    def test_impossible_date_is_rejected(self):
+        response = self.client.get('/api/pkl/stats/', {'from': '2026-02-30'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_default_range(self):
+        response = self.client.get('/api/pkl/stats/')
+        self.assertEqual(response.status_code, 200)
+
+
+class StalePKLSweepTests(TestCase):
+    def test_sweep_bumps_version_seen_by_other_processes(self):
+        fresh = make_pkl('fresh', status_aktif=True, last_seen_at=timezone.now())
+        stale = make_pkl(
+            'stale', status_aktif=True, last_seen_at=timezone.now() - timedelta(hours=1),
+        )
+        version = active_list_version()
+
+        self.assertEqual(deactivate_stale_pkls(timedelta(minutes=15)), 1)
+
+        # proses lain tidak berbagi cache lokal, hanya database
+        caches['local'].clear()
+        self.assertGreater(active_list_version(), version)
+        stale.refresh_from_db()
+        fresh.refresh_from_db()
+        self.assertEqual((stale.status_aktif, fresh.status_aktif), (False, True))
+
+
+class ActivePKLListTests(TestCase):
+    def test_invalid_points_are_rejected(self):
+        client = APIClient()
+        for params in (
+            {'lat': 'nan', 'lng': '106', 'radius_m': '500'},
+            {'lat': '-6.2', 'lng': 'inf'},
+            {'lat': '1e308', 'lng': '1e308', 'radius_m': '1e308'},
+            {'lat': '-6.2', 'lng': '106.8', 'radius_m': '-5'},
+            {'lat': '-6.2', 'lng': '106.8', 'radius_m': '0'},
+            {'lat': '91', 'lng': '106.8'},
+        ):
+            with self.subTest(params=params):
+                self.assertEqual(client.get('/api/pkl/active/', params).status_code, 400)
+                self.assertEqual(client.get('/api/pkl/products/search/', {'q': 'bakso', **params}).status_code, 400)
+
+    def test_nearby_vendor_gets_distance(self):
+        make_pkl(
+            status_aktif=True, status_verifikasi='DITERIMA',
+            last_latitude=-6.2, last_longitude=106.8, last_seen_at=timezone.now(),
+        )
+        response = APIClient().get('/api/pkl/active/', {'lat': '-6.2', 'lng': '106.801', 'radius_m': '500'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), 1)
+        self.assertLess(response.data[0]['distance_m'], 500)
+
+
+def point_north_of(latitude, longitude, meters):
+    # sepanjang meridian jarak haversine tepat R * delta-lintang
+    return latitude + math.degrees(meters / EARTH_RADIUS_M), longitude
+
+
+@mock.patch('pkl.geo.VENDOR_INDEX_TTL_SECONDS', -1)
+class ProximityTests(TestCase):
+    origin = (-6.2, 106.8)
+
+    def test_vendors_at_the_radius_edge(self):
+        inside = make_pkl('inside', status_aktif=True, status_verifikasi='DITERIMA')
+        outside = make_pkl('outside', status_aktif=True, status_verifikasi='DITERIMA')
+        for pkl, meters in ((inside, 499.5), (outside, 500.5)):
+            latitude, longitude = point_north_of(*self.origin, meters)
+            PKL.objects.filter(pk=pkl.pk).update(
+                last_latitude=latitude, last_longitude=longitude, geohash=encode_geohash(latitude, longitude),
+            )
+
+        nearby = vendors_near_point(*self.origin, 500)
+
+        self.assertEqual([position.id for position, _ in nearby], [inside.pk])
+        self.assertAlmostEqual(nearby[0][1], 499.5, places=3)
+
+    def test_buyers_at_their_own_radius_edge(self):
+        buyers = {}
+        for name, meters, radius_m in (('dekat', 499.5, 500), ('jauh', 500.5, 500), ('lebar', 1400, 1500)):
+            buyers[name] = make_buyer(name)
+            latitude, longitude = point_north_of(*self.origin, meters)
+            BuyerLocation.objects.create(buyer=buyers[name], latitude=latitude, longitude=longitude, radius_m=radius_m)
+
+        found = {buyer_id: radius for chunk in buyers_near_point(*self.origin, chunk_size=1) for buyer_id, _, radius in chunk}
+        self.assertEqual(found, {buyers['dekat'].pk: 500, buyers['lebar'].pk: 1500})
+
+        found = [buyer_id for chunk in buyers_near_point(*self.origin, radius_m=500) for buyer_id, _, _ in chunk]
+        self.assertEqual(found, [buyers['dekat'].pk])
+
+
+@override_settings(PKL_RANKING_WEIGHTS={'text': 0.55, 'distance': 0.2, 'rating': 0.15, 'freshness': 0.1})
+class RankingTests(SimpleTestCase):
+    def _features(self, **overrides):
+        features = {
+            'id': [1, 2, 3, 4],
+            'text': [0.9, 0.9, 0.6, 1.0],
+            # 2: posisi tidak diketahui; 3: belum ada rating
+            'distance_m': [100.0, None, 50.0, 3000.0],
+            'rating_avg': [4.5, 4.5, None, 2.0],
+            'rating_count': [10, 10, 0, 20],
+            'age_s': [60.0, None, 0.0, 3600.0],
+        }
+        features.update(overrides)
+        return features
+
+    def test_blended_order(self):
+        self.assertEqual(order(self._features(), rating_mean=3.5), [1, 3, 4, 2])
+
+    def test_without_caller_position_distance_weight_is_redistributed(self):
+        features = self._features(distance_m=[None] * 4)
+        self.assertEqual(order(features, rating_mean=3.5), [1, 4, 2, 3])
+        weights = resolve_weights(None, has_distance=False)
+        for name, expected in {'text': 0.6875, 'distance': 0.0, 'rating': 0.1875, 'freshness': 0.125}.items():
+            self.assertAlmostEqual(weights[name], expected)
+
+    def test_missing_rating_falls_back_to_the_global_mean(self):
+        rating_only = {'text': 0, 'distance': 0, 'rating': 1, 'freshness': 0}
+        scores = score(self._features(), rating_only, rating_mean=3.5)
+        self.assertAlmostEqual(scores[2], 3.5 / 5)
+        self.assertEqual(order(self._features(), rating_only, rating_mean=3.5), [1, 2, 3, 4])
+
+    def test_invalid_weights_fall_back_to_text_only(self):
+        with override_settings(PKL_RANKING_WEIGHTS={'text': -1, 'rating': 0}):
+            self.assertEqual(
+                resolve_weights(None, has_distance=True),
+                {'text': 1.0, 'distance': 0.0, 'rating': 0.0, 'freshness': 0.0},
+            )
+
+
+class SearchTests(TestCase):
+    def setUp(self):
+        self.active = make_pkl('aktif', status_aktif=True, status_verifikasi='DITERIMA')
+        self.closed = make_pkl('libur', nama_usaha='Cilok Bu Tini', status_aktif=False, status_verifikasi='DITERIMA')
+        make_pkl('lain', nama_usaha='Sate Madura', jenis_dagangan='Sate', status_aktif=True, status_verifikasi='DITERIMA')
+
+    def test_renamed_vendor_is_found_right_away(self):
+        client = APIClient()
+        client.force_authenticate(self.active.user)
+        self.assertEqual(client.put('/api/pkl/profile/', {'nama_usaha': 'Cilok Goang Mas Joko'}, format='json').status_code, 200)
+
+        response = APIClient().get('/api/pkl/active/', {'q': 'cilok goang'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row['id'] for row in response.data], [self.active.pk])
+
+    @skipUnless(connection.vendor == 'postgresql', 'search_vector diisi trigger PostgreSQL')
+    def test_renamed_product_is_found_right_away(self):
+        product = PKLProduct.objects.create(pkl=self.active, name='Cilok Kuah', price=10000)
+        PKLProduct.objects.create(pkl=self.closed, name='Cilok Kuah Pedas', price=12000)
+        self.assertEqual([row['id'] for row in search_products('cilok')], [product.pk])
+
+        # update() melewati save(): trigger yang memperbarui search_vector
+        PKLProduct.objects.filter(pk=product.pk).update(name='Seblak Jeletot')
+
+        self.assertEqual(search_products('cilok'), [])
+        self.assertEqual([row['id'] for row in search_products('sebl jelet')], [product.pk])
+        response = APIClient().get('/api/pkl/products/search/', {'q': 'seblak'})
+        self.assertEqual([row['id'] for row in response.data], [self.active.pk])
+
+
+class AutocompleteIndexTests(TestCase):
+    def setUp(self):
+        caches['local'].clear()
+        caches['default'].clear()
+        self.index = _AutocompleteIndex()
+
+    def _texts(self, query):
+        return [row['text'] for row in self.index.search(query)]
+
+    def _create_vendor_elsewhere(self, nama_usaha):
+        # proses lain: bulk_create tidak memicu signal di proses ini
+        pkl, = PKL.objects.bulk_create([PKL(
+            user=make_buyer(nama_usaha.split()[0].lower()), nama_usaha=nama_usaha, jenis_dagangan='Mie',
+            jam_operasional='10-22', status_aktif=True, status_verifikasi='DITERIMA',
+        )])
+        return pkl
+
+    def test_change_from_another_process_is_replayed(self):
+        self.assertEqual(self._texts('bak'), [])
+        _publish({self._create_vendor_elsewhere('Bakso Malang').pk})
+        # tidak ada cache yang dibagi dengan proses lain, hanya database
+        caches['local'].clear()
+        caches['default'].clear()
+
+        with mock.patch.object(self.index, '_rebuild', wraps=self.index._rebuild) as rebuild:
+            self.assertEqual(self._texts('bak'), ['Bakso Malang'])
+        rebuild.assert_not_called()
+
+    def test_missing_change_log_triggers_rebuild(self):
+        self.assertEqual(self._texts('bak'), [])
+        self._create_vendor_elsewhere('Bakso Malang')
+        bump_shared_version(AUTOCOMPLETE_VERSION_KEY)
+        caches['local'].clear()
+
+        self.assertEqual(self._texts('bak'), ['Bakso Malang'])
+
+    def test_old_trie_is_rebuilt(self):
+        self.assertEqual(self._texts('cil'), [])
+        PKL.objects.filter(pk=make_pkl(nama_usaha='Cilok Goang').pk).update(
+            status_aktif=True, status_verifikasi='DITERIMA',
+        )
+        self.assertEqual(self._texts('cil'), [])
+
+        self.index._built_at -= MAX_TRIE_AGE_SECONDS + 1
+        self.assertEqual(self._texts('cil'), ['Cilok Goang'])
+
+
+# Cache milik worker lain: LocMem dengan LOCATION berbeda tidak berbagi isi.
+OTHER_WORKER_CACHES = override_settings(CACHES={
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'other-worker-default'},
+    'local': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'other-worker-local'},
+})
+
+
+@mock.patch('pkl.cache.SHARED_VERSION_TTL', 0)
+class MapTileTests(TestCase):
+    def setUp(self):
+        self.pkl = make_pkl(
+            status_aktif=True, status_verifikasi='DITERIMA', last_latitude=-6.2, last_longitude=106.8,
+            last_seen_at=timezone.now(), geohash=encode_geohash(-6.2, 106.8),
+        )
+        for worker in (override_settings(), OTHER_WORKER_CACHES):
+            with worker:
+                caches['default'].clear()
+                caches['local'].clear()
+
+    def _positions(self, zoom):
+        data = get_tiles(-6.21, 106.79, -6.19, 106.81, zoom)
+        return [(item['latitude'], item['longitude']) for item in data.get('vendors') or data['clusters']]
+
+    def test_move_in_one_worker_refreshes_tiles_of_another(self):
+        with OTHER_WORKER_CACHES:
+            self.assertEqual(self._positions(16), [(-6.2, 106.8)])
+            self.assertEqual(self._positions(12), [(-6.2, 106.8)])
+
+        # tetap di sel vendor dan sub-cell cluster yang sama
+        update_current_position(PKL.objects.get(pk=self.pkl.pk), -6.2001, 106.8001, timezone.now())
+
+        with OTHER_WORKER_CACHES:
+            self.assertEqual(self._positions(16), [(-6.2001, 106.8001)])
+            self.assertEqual(self._positions(12), [(-6.2001, 106.8001)])
+
+    def test_unchanged_tiles_are_served_from_cache(self):
+        self._positions(16)
+        # hanya membaca versi daftar aktif dan versi tile, tanpa query PKL
+        with self.assertNumQueries(2):
+            self.assertEqual(self._positions(16), [(-6.2, 106.8)])
+
+
+class NearbyDigestTests(TransactionTestCase):
+    def test_overlapping_pings_share_one_digest(self):
+        buyer = make_buyer()
+        location = BuyerLocation.objects.create(buyer=buyer, latitude=-6.2, longitude=106.8, digest_enabled=True)
+        vendors = [make_pkl(f'pkl{i}') for i in range(8)]
+        barrier = threading.Barrier(len(vendors))
+
+        def ping(vendor):
+            try:
+                barrier.wait()
+                _notify_nearby_digest(location, [(VendorPosition(vendor.id, vendor.nama_usaha, -6.2, 106.8), 50.0)], 300)
+            finally:
+                db_connections.close_all()
+
+        threads = [threading.Thread(target=ping, args=(vendor,)) for vendor in vendors]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        digests = list(Notification.objects.filter(buyer=buyer, notif_type=Notification.TYPE_NEARBY_DIGEST))
+        self.assertEqual(len(digests), 1)
+        self.assertCountEqual(digests[0].metadata['pkl_ids'], [vendor.id for vendor in vendors])
+
+
+class LocalBucketBackendTests(SimpleTestCase):
+    def test_bucket_refills_and_rejects(self):
+        backend = LocalBucketBackend()
+        self.assertEqual(backend.take('u', 2, 1.0, 100.0), 0.0)
+        self.assertEqual(backend.take('u', 2, 1.0, 100.0), 0.0)
+        self.assertAlmostEqual(backend.take('u', 2, 1.0, 100.0), 1.0)
+        self.assertEqual(backend.take('u', 2, 1.0, 101.5), 0.0)
+
+    def test_claim_interval(self):
+        backend = LocalBucketBackend()
+        self.assertTrue(backend.claim_interval('u', 5, 100.0))
+        self.assertFalse(backend.claim_interval('u', 5, 103.0))
+        self.assertTrue(backend.claim_interval('u', 5, 105.0))
+
+    def test_idle_entries_are_evicted(self):
+        backend = LocalBucketBackend()
+        backend.take('idle', 2, 1.0, 100.0)
+        backend.claim_interval('idle', 5, 100.0)
+        backend.take('busy', 2, 1.0, 150.0)
+
+        backend.take('busy', 2, 1.0, 100.0 + backend.sweep_interval)
+
+        self.assertEqual(set(backend._buckets), {'busy'})
+        self.assertEqual(backend._last_seen, {})
+
+
+@skipUnless(connection.vendor == 'postgresql', 'EXPLAIN checks need PostgreSQL')
+class HotQueryIndexTests(TestCase):
+    def test_hot_queries_can_use_an_index(self):
+        problems = {label: plan for label, plan, problem in explain_plans(500, force_index=True) if problem}
+        self.assertEqual(problems, {})
@@ -0,0 +1,168 @@
+"""Token-bucket throttling and ping coalescing for the location endpoints."""
+import threading
+import time
+from functools import lru_cache
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.module_loading import import_string
+from rest_framework.throttling import BaseThrottle
+
+
+class LocalBucketBackend:
+    """Bucket disimpan di memori proses; cukup untuk satu worker.
+
+    Entri yang sudah tidak berpengaruh (bucket penuh kembali, interval ping
+    lewat) dibuang paling sering tiap ``sweep_interval`` detik agar memori
+    tidak tumbuh mengikuti semua user yang pernah mengirim ping.
+    """
+
+    blocking = False
+    sweep_interval = 60.0
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # key -> (tokens, updated, expires_at)
+        self._buckets = {}
+        # key -> (last, expires_at)
+        self._last_seen = {}
+        self._counters = {}
+        self._next_sweep = 0.0
+
+    def _sweep(self, now: float) -> None:
+        if now < self._next_sweep:
+            return
+        self._next_sweep = now + self.sweep_interval
+        self._buckets = {key: entry for key, entry in self._buckets.items() if entry[2] > now}
+        self._last_seen = {key: entry for key, entry in self._last_seen.items() if entry[1] > now}
+
+    def take(self, key: str, capacity: int, refill_per_second: float, now: float) -> float:
+        """Consume one token; return 0 when allowed, else seconds until a token frees up."""
+        with self._lock:
+            self._sweep(now)
+            tokens, updated, _ = self._buckets.get(key, (capacity, now, now))
+            tokens = min(capacity, tokens + (now - updated) * refill_per_second)
+            wait = (1 - tokens) / refill_per_second if tokens < 1 else 0.0
+            if not wait:
+                tokens -= 1
+            # setelah waktu ini bucket penuh lagi, sama dengan tidak ada entri
+            self._buckets[key] = (tokens, now, now + (capacity - tokens) / refill_per_second)
+            return wait
+
+    def claim_interval(self, key: str, min_interval: float, now: float) -> bool:
+        """Return ``True`` if no ping was accepted for ``key`` within ``min_interval``."""
+        with self._lock:
+            self._sweep(now)
+            last, _ = self._last_seen.get(key, (None, None))
+            if last is not None and now - last < min_interval:
+                return False
+            self._last_seen[key] = (now, now + min_interval)
+            return True
+
+    def incr(self, counter: str) -> None:
+        with self._lock:
+            self._counters[counter] = self._counters.get(counter, 0) + 1
+
+    def counters(self) -> dict:
+        with self._lock:
+            return dict(self._counters)
+
+
+class CacheBucketBackend:
+    """Bucket disimpan di cache ``default`` (mis. Redis) agar dibagi antar worker.
+
+    Baca-tulis bucket tidak atomik; di bawah kontensi tinggi batasnya sedikit
+    longgar, yang masih bisa diterima untuk membatasi ping lokasi.
+    """
+
+    counter_names = ('rejected', 'coalesced')
+    blocking = True
+
+    def __init__(self):
+        self._cache = caches['default']
+
+    def take(self, key: str, capacity: int, refill_per_second: float, now: float) -> float:
+        cache_key = f'throttle:bucket:{key}'
+        tokens, updated = self._cache.get(cache_key, (capacity, now))
+        tokens = min(capacity, tokens + (now - updated) * refill_per_second)
+        timeout = int(capacity / refill_per_second) + 1
+        if tokens < 1:
+            self._cache.set(cache_key, (tokens, now), timeout)
+            return (1 - tokens) / refill_per_second
+        self._cache.set(cache_key, (tokens - 1, now), timeout)
+        return 0.0
+
+    def claim_interval(self, key: str, min_interval: float, now: float) -> bool:
+        # cache.add hanya berhasil bila key belum ada, jadi atomik di Redis.
+        return self._cache.add(f'throttle:ping:{key}', now, max(1, int(min_interval)))
+
+    def incr(self, counter: str) -> None:
+        cache_key = f'throttle:counter:{counter}'
+        if not self._cache.add(cache_key, 1, None):
+            self._cache.incr(cache_key)
+
+    def counters(self) -> dict:
+        scopes = settings.LOCATION_THROTTLE_RATES
+        keys = [f'{name}:{scope}' for name in self.counter_names for scope in scopes]
+        values = self._cache.get_many([f'throttle:counter:{key}' for key in keys])
+        return {key: values.get(f'throttle:counter:{key}', 0) for key in keys}
+
+
+@lru_cache(maxsize=None)
+def get_backend():
+    return import_string(settings.LOCATION_THROTTLE_BACKEND)()
+
+
+def counters() -> dict:
+    return get_backend().counters()
+
+
+def should_coalesce(scope: str, key: str) -> bool:
+    """True when a ping for ``key`` was accepted less than the scope's minimum interval ago."""
+    min_interval = settings.LOCATION_PING_MIN_INTERVAL.get(scope)
+    if not min_interval:
+        return False
+    backend = get_backend()
+    if backend.claim_interval(f'{scope}:{key}', min_interval, time.time()):
+        return False
+    backend.incr(f'coalesced:{scope}')
+    return True
+
+
+async def run_with_backend(func, *args):
+    """Call a sync throttling helper from async code.
+
+    Backends doing network I/O (``blocking``) run in a worker thread so they
+    do not stall the event loop; the in-process backend is called directly.
+    """
+    if getattr(get_backend(), 'blocking', True):
+        return await sync_to_async(func, thread_sensitive=False)(*args)
+    return func(*args)
+
+
+class LocationPingThrottle(BaseThrottle):
+    """Token bucket per user dan ``throttle_scope`` view, memakai LOCATION_THROTTLE_RATES."""
+
+    def __init__(self):
+        self._wait = None
+
+    def allow_request(self, request, view):
+        scope = getattr(view, 'throttle_scope', None)
+        rate = settings.LOCATION_THROTTLE_RATES.get(scope)
+        if rate is None or request.method != 'POST':
+            return True
+        if not request.user or not request.user.is_authenticated:
+            return True
+
+        capacity, per_minute = rate
+        backend = get_backend()
+        wait = backend.take(f'{scope}:{request.user.pk}', capacity, per_minute / 60.0, time.time())
+        if wait:
+            backend.incr(f'rejected:{scope}')
+            self._wait = wait
+            return False
+        return True
+
+    def wait(self):
+        return self._wait
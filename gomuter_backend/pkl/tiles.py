@@ -0,0 +1,140 @@
+"""Geohash-tiled map data: clusters at low zoom, individual PKL at high zoom.
+
+Tile payloads live in the ``default`` cache, which may be per process. Their
+keys include a per-tile version stored in the database (``CacheVersion``), so
+a PKL moving in one worker makes every worker rebuild the affected tiles.
+"""
+from collections import Counter
+
+from django.core.cache import caches
+from django.db.models import Q
+
+from .cache import active_list_version, bump_shared_versions, shared_versions
+from .models import PKL
+from .utils import geohash_cell_count, geohash_cells_covering
+
+# (zoom maksimum, presisi geohash tile) untuk mode cluster. Cluster di dalam
+# tile dikelompokkan per sub-cell (presisi tile + 1).
+CLUSTER_TILE_PRECISION = ((5, 2), (8, 3), (11, 4), (13, 5))
+VENDOR_TILE_PRECISION = 6
+MAX_TILES_PER_REQUEST = 64
+TILE_CACHE_TIMEOUT = 300
+
+MODE_CLUSTER = 'cluster'
+MODE_VENDOR = 'vendor'
+
+
+class TooManyTiles(Exception):
+    """Bounding box terlalu luas untuk zoom yang diminta."""
+
+
+def tile_precision(zoom: int) -> tuple[str, int]:
+    for max_zoom, precision in CLUSTER_TILE_PRECISION:
+        if zoom <= max_zoom:
+            return MODE_CLUSTER, precision
+    return MODE_VENDOR, VENDOR_TILE_PRECISION
+
+
+def _tile_version_key(mode: str, cell: str) -> str:
+    return f'map-tile:{mode}:{cell}'
+
+
+def _tile_key(version: int, tile_version: int, mode: str, cell: str) -> str:
+    return f'map:tile:{version}:{tile_version}:{mode}:{cell}'
+
+
+def _cluster_rows(rows: list[dict], precision: int) -> list[dict]:
+    groups: dict[str, list[dict]] = {}
+    for row in rows:
+        groups.setdefault(row['geohash'][:precision], []).append(row)
+
+    clusters = []
+    for prefix, members in groups.items():
+        count = len(members)
+        dominant = Counter(member['jenis_dagangan'] for member in members).most_common(1)[0][0]
+        clusters.append({
+            'geohash': prefix,
+            'count': count,
+            'latitude': sum(member['last_latitude'] for member in members) / count,
+            'longitude': sum(member['last_longitude'] for member in members) / count,
+            'dominant_jenis': dominant,
+            'pkl_id': members[0]['id'] if count == 1 else None,
+        })
+    return clusters
+
+
+def _vendor_rows(rows: list[dict]) -> list[dict]:
+    return [
+        {
+            'id': row['id'],
+            'nama_usaha': row['nama_usaha'],
+            'jenis_dagangan': row['jenis_dagangan'],
+            'latitude': row['last_latitude'],
+            'longitude': row['last_longitude'],
+            'last_seen_at': row['last_seen_at'].isoformat() if row['last_seen_at'] else None,
+        }
+        for row in rows
+    ]
+
+
+def _build_tiles(cells: list[str], mode: str) -> dict[str, list[dict]]:
+    condition = Q()
+    for cell in cells:
+        condition |= Q(geohash__startswith=cell)
+    rows = (
+        PKL.objects.filter(condition, status_aktif=True, status_verifikasi='DITERIMA')
+        .values('id', 'nama_usaha', 'jenis_dagangan', 'last_latitude', 'last_longitude', 'last_seen_at', 'geohash')
+    )
+
+    by_cell: dict[str, list[dict]] = {cell: [] for cell in cells}
+    precision = len(cells[0])
+    for row in rows:
+        by_cell[row['geohash'][:precision]].append(row)
+
+    if mode == MODE_CLUSTER:
+        return {cell: _cluster_rows(members, precision + 1) for cell, members in by_cell.items()}
+    return {cell: _vendor_rows(members) for cell, members in by_cell.items()}
+
+
+def get_tiles(min_lat: float, min_lng: float, max_lat: float, max_lng: float, zoom: int) -> dict:
+    """Map payload for a bounding box; each tile is cached until a PKL in it moves."""
+    mode, precision = tile_precision(zoom)
+    if geohash_cell_count(min_lat, min_lng, max_lat, max_lng, precision) > MAX_TILES_PER_REQUEST:
+        raise TooManyTiles()
+    cells = geohash_cells_covering(min_lat, min_lng, max_lat, max_lng, precision)
+
+    cache = caches['default']
+    version = active_list_version()
+    version_keys = {cell: _tile_version_key(mode, cell) for cell in cells}
+    tile_versions = shared_versions(version_keys.values())
+    keys = {cell: _tile_key(version, tile_versions[version_keys[cell]], mode, cell) for cell in cells}
+    cached = cache.get_many(keys.values())
+    tiles = {cell: cached[key] for cell, key in keys.items() if key in cached}
+
+    missing = [cell for cell in cells if cell not in tiles]
+    if missing:
+        built = _build_tiles(missing, mode)
+        cache.set_many({keys[cell]: payload for cell, payload in built.items()}, TILE_CACHE_TIMEOUT)
+        tiles.update(built)
+
+    items = [item for cell in cells for item in tiles[cell]]
+    return {
+        'zoom': zoom,
+        'mode': mode,
+        'tiles': cells,
+        'clusters' if mode == MODE_CLUSTER else 'vendors': items,
+    }
+
+
+def invalidate_position(previous_geohash: str, new_geohash: str) -> None:
+    """Bump the versions of every tile containing either geohash.
+
+    Cluster tiles are bumped even when the PKL stays in its sub-cell: the
+    centroid and a singleton's position are part of the payload.
+    """
+    keys = set()
+    for geohash in filter(None, (previous_geohash, new_geohash)):
+        keys.add(_tile_version_key(MODE_VENDOR, geohash[:VENDOR_TILE_PRECISION]))
+        for _, precision in CLUSTER_TILE_PRECISION:
+            keys.add(_tile_version_key(MODE_CLUSTER, geohash[:precision]))
+    bump_shared_versions(keys)
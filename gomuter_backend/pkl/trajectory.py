@@ -0,0 +1,116 @@
+"""Douglas–Peucker simplification of PKL tracks streamed from LokasiPKL."""
+import math
+from typing import Iterable, Iterator
+
+from .models import LokasiPKL
+
+EARTH_RADIUS_M = 6371000.0
+# Jumlah titik mentah maksimum yang ditahan di memori sekaligus.
+SIMPLIFY_WINDOW = 5000
+# Ukuran batch fetch dari server-side cursor.
+FETCH_CHUNK_SIZE = 2000
+
+
+def _to_xy(point, ref_lat_cos: float) -> tuple[float, float]:
+    # Proyeksi equirectangular; cukup akurat untuk jarak dalam satu kota.
+    lat, lng = math.radians(point[0]), math.radians(point[1])
+    return lng * ref_lat_cos * EARTH_RADIUS_M, lat * EARTH_RADIUS_M
+
+
+def _segment_distance(p, a, b) -> float:
+    ax, ay = a
+    bx, by = b
+    px, py = p
+    dx, dy = bx - ax, by - ay
+    if dx == 0 and dy == 0:
+        return math.hypot(px - ax, py - ay)
+    t = max(0.0, min(1.0, ((px - ax) * dx + (py - ay) * dy) / (dx * dx + dy * dy)))
+    return math.hypot(px - (ax + t * dx), py - (ay + t * dy))
+
+
+def douglas_peucker(points: list, tolerance_m: float) -> list:
+    """Simplify ``points`` (tuples starting with lat, lng) to ``tolerance_m`` meters.
+
+    Iterative, so long tracks do not hit the recursion limit.
+    """
+    if len(points) < 3 or tolerance_m <= 0:
+        return list(points)
+
+    ref_lat_cos = math.cos(math.radians(points[0][0]))
+    projected = [_to_xy(point, ref_lat_cos) for point in points]
+    keep = [False] * len(points)
+    keep[0] = keep[-1] = True
+
+    stack = [(0, len(points) - 1)]
+    while stack:
+        start, end = stack.pop()
+        max_distance = 0.0
+        index = start
+        for i in range(start + 1, end):
+            distance = _segment_distance(projected[i], projected[start], projected[end])
+            if distance > max_distance:
+                max_distance = distance
+                index = i
+        if max_distance > tolerance_m:
+            keep[index] = True
+            stack.append((start, index))
+            stack.append((index, end))
+
+    return [point for point, kept in zip(points, keep) if kept]
+
+
+def simplify_stream(points: Iterable, tolerance_m: float, window: int = SIMPLIFY_WINDOW) -> Iterator:
+    """Simplify an arbitrarily long point stream in fixed-size windows.
+
+    The last point of each window is carried over as the first point of the
+    next, so the output stays one connected line while memory stays bounded
+    by ``window``.
+    """
+    buffer = []
+    for point in points:
+        buffer.append(point)
+        if len(buffer) >= window:
+            simplified = douglas_peucker(buffer, tolerance_m)
+            yield from simplified[:-1]
+            buffer = [buffer[-1]]
+    if buffer:
+        yield from douglas_peucker(buffer, tolerance_m)
+
+
+def get_track(pkl_id: int, start, end, tolerance_m: float, max_points: int) -> dict:
+    """Simplified track of a PKL between ``start`` (inclusive) and ``end`` (exclusive).
+
+    Rows are read through a server-side cursor and never materialized as
+    model instances. At most ``max_points`` simplified points are returned;
+    reading stops there and ``truncated`` is set, so memory stays bounded by
+    the window and ``max_points`` whatever the range and tolerance.
+    """
+    rows = (
+        LokasiPKL.objects.filter(pkl_id=pkl_id, timestamp__gte=start, timestamp__lt=end)
+        .order_by('timestamp')
+        .values_list('latitude', 'longitude', 'timestamp')
+        .iterator(chunk_size=FETCH_CHUNK_SIZE)
+    )
+    raw_count = 0
+
+    def points():
+        nonlocal raw_count
+        for latitude, longitude, timestamp in rows:
+            raw_count += 1
+            yield float(latitude), float(longitude), timestamp
+
+    simplified = []
+    truncated = False
+    stream = simplify_stream(points(), tolerance_m)
+    for latitude, longitude, timestamp in stream:
+        if len(simplified) >= max_points:
+            truncated = True
+            break
+        simplified.append([latitude, longitude, timestamp.isoformat()])
+    # tutup server-side cursor bila pembacaan berhenti di tengah
+    stream.close()
+    return {
+        'raw_points': raw_count,
+        'points': simplified,
+        'truncated': truncated,
+    }
@@ -0,0 +1,120 @@
+from typing import Iterable, Optional
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import PKL, PreOrder
+from .order_queue import record_change
+
+# Status tujuan yang boleh dicapai dari setiap status pre-order.
+PREORDER_TRANSITIONS = {
+    'PENDING': ('DITERIMA', 'DITOLAK', 'SELESAI'),
+    'DITERIMA': ('DITOLAK', 'SELESAI'),
+    'DITOLAK': ('DITERIMA',),
+    'SELESAI': (),
+}
+
+
+class InvalidTransition(Exception):
+    """Perpindahan status tidak diizinkan dari status saat ini."""
+
+
+class TransitionConflict(Exception):
+    """Pre-order sudah diubah request lain sejak terakhir dibaca."""
+
+    def __init__(self, preorder_id: int):
+        super().__init__(f'PreOrder {preorder_id} changed concurrently')
+        self.preorder_id = preorder_id
+
+
+def _check_status(current: str, new_status: str) -> None:
+    if new_status != current and new_status not in PREORDER_TRANSITIONS.get(current, ()):
+        raise InvalidTransition(f'Status tidak bisa diubah dari {current} ke {new_status}.')
+
+
+def _parse_version(value) -> Optional[int]:
+    if value in (None, ''):
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise InvalidTransition('version harus berupa angka.')
+
+
+def apply_transition(preorder: PreOrder, changes: dict, expected_version=None) -> PreOrder:
+    """Apply ``changes`` with a single conditional UPDATE.
+
+    The row is only written when its status, dp_status and version still match
+    what the caller read, otherwise :class:`TransitionConflict` is raised.
+    A ``status`` in ``changes`` must be reachable via ``PREORDER_TRANSITIONS``.
+    """
+    if 'status' in changes:
+        _check_status(preorder.status, changes['status'])
+    version = _parse_version(expected_version)
+    if version is None:
+        version = preorder.version
+    now = timezone.now()
+    before = (preorder.status, preorder.dp_status)
+
+    with transaction.atomic():
+        updated = PreOrder.objects.filter(
+            pk=preorder.pk,
+            status=preorder.status,
+            dp_status=preorder.dp_status,
+            version=version,
+        ).update(**changes, version=F('version') + 1, updated_at=now)
+        if not updated:
+            raise TransitionConflict(preorder.pk)
+        after = (changes.get('status', before[0]), changes.get('dp_status', before[1]))
+        record_change(preorder.pkl_id, removed=[before], added=[after])
+
+    for field, value in changes.items():
+        setattr(preorder, field, value)
+    preorder.version = version + 1
+    preorder.updated_at = now
+    return preorder
+
+
+def transition_status(preorder: PreOrder, new_status: str, expected_version=None) -> PreOrder:
+    if new_status == preorder.status:
+        # Retry dari klien untuk status yang sama tidak perlu menulis ulang.
+        return preorder
+    return apply_transition(preorder, {'status': new_status}, expected_version)
+
+
+def bulk_transition_status(pkl: PKL, preorder_ids: Iterable[int], new_status: str) -> tuple[list[int], list[int]]:
+    """Move many pre-orders of one PKL to ``new_status`` in one UPDATE.
+
+    Returns ``(updated_ids, skipped_ids)``; skipped ids are unknown, owned by
+    another PKL or not in a status that can reach ``new_status``.
+    """
+    requested = list(dict.fromkeys(int(pk) for pk in preorder_ids))
+    sources = [
+        source for source, targets in PREORDER_TRANSITIONS.items()
+        if new_status in targets
+    ]
+
+    with transaction.atomic():
+        movable = list(
+            PreOrder.objects.select_for_update()
+            .filter(pkl=pkl, id__in=requested, status__in=sources)
+            .values_list('id', 'status', 'dp_status')
+        )
+        if movable:
+            PreOrder.objects.filter(id__in=[pk for pk, _, _ in movable]).update(
+                status=new_status,
+                version=F('version') + 1,
+                updated_at=timezone.now(),
+            )
+            record_change(
+                pkl.id,
+                removed=[(status, dp_status) for _, status, dp_status in movable],
+                added=[(new_status, dp_status) for _, _, dp_status in movable],
+            )
+
+    moved = {pk for pk, _, _ in movable}
+    return (
+        [pk for pk in requested if pk in moved],
+        [pk for pk in requested if pk not in moved],
+    )
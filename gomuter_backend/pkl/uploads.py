@@ -0,0 +1,107 @@
+import hashlib
+import os
+import tempfile
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from PIL import Image, UnidentifiedImageError
+
+DP_PROOF_DIR = 'dp_proofs'
+DP_PROOF_MAX_DIMENSION = 1600
+DP_PROOF_JPEG_QUALITY = 85
+# Batas piksel yang boleh di-decode. draft() hanya mengecilkan decode JPEG;
+# PNG/WebP selalu di-decode penuh (~4 byte per piksel).
+DP_PROOF_MAX_PIXELS = 24_000_000
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+
+class UploadTooLarge(Exception):
+    """File melebihi batas ukuran upload."""
+
+
+def _max_bytes() -> int:
+    return getattr(settings, 'DP_PROOF_MAX_BYTES', 5 * 1024 * 1024)
+
+
+def _extension(filename: str) -> str:
+    extension = os.path.splitext(filename or '')[1].lstrip('.').lower()
+    return extension if extension.isalnum() else 'bin'
+
+
+def _spool(file_obj, destination) -> str:
+    """Copy ``file_obj`` chunk by chunk into ``destination`` and return its sha256."""
+    limit = _max_bytes()
+    digest = hashlib.sha256()
+    size = 0
+    for chunk in file_obj.chunks(UPLOAD_CHUNK_SIZE):
+        size += len(chunk)
+        if size > limit:
+            raise UploadTooLarge()
+        digest.update(chunk)
+        destination.write(chunk)
+    destination.flush()
+    destination.seek(0)
+    return digest.hexdigest()
+
+
+def _flatten(img: Image.Image) -> Image.Image:
+    """RGB copy of ``img`` with transparent areas on white instead of black."""
+    if img.mode in ('RGBA', 'LA') or (img.mode == 'P' and 'transparency' in img.info):
+        img = img.convert('RGBA')
+        background = Image.new('RGB', img.size, 'white')
+        background.paste(img, mask=img.getchannel('A'))
+        return background
+    return img.convert('RGB') if img.mode != 'RGB' else img
+
+
+def _downscale(source, destination) -> bool:
+    """Write a downscaled JPEG of ``source`` to ``destination``.
+
+    Returns ``False`` when the file is not an image or already small enough,
+    in which case the original bytes should be stored unchanged. Raises
+    ``UploadTooLarge`` when decoding would exceed ``DP_PROOF_MAX_PIXELS``.
+    """
+    try:
+        with Image.open(source) as img:
+            if max(img.size) <= DP_PROOF_MAX_DIMENSION:
+                return False
+            bounds = (DP_PROOF_MAX_DIMENSION, DP_PROOF_MAX_DIMENSION)
+            img.draft('RGB', bounds)
+            # img.size sudah ukuran hasil draft (JPEG) atau ukuran penuh (format lain)
+            if img.width * img.height > DP_PROOF_MAX_PIXELS:
+                raise UploadTooLarge()
+            img.thumbnail(bounds, Image.Resampling.LANCZOS)
+            _flatten(img).save(destination, 'JPEG', quality=DP_PROOF_JPEG_QUALITY, optimize=True)
+    except (UnidentifiedImageError, OSError, Image.DecompressionBombError):
+        return False
+    finally:
+        source.seek(0)
+    destination.flush()
+    destination.seek(0)
+    return True
+
+
+def store_dp_proof(file_obj) -> str:
+    """Store an uploaded DP proof under its content hash and return the path.
+
+    The upload is streamed to a temporary file while hashing, and images are
+    only decoded up to ``DP_PROOF_MAX_PIXELS``. Identical uploads (e.g. client
+    retries) map to the same name and are written only once.
+    """
+    if file_obj.size is not None and file_obj.size > _max_bytes():
+        raise UploadTooLarge()
+
+    with tempfile.TemporaryFile() as spooled, tempfile.TemporaryFile() as scaled:
+        digest = _spool(file_obj, spooled)
+        is_scaled = _downscale(spooled, scaled)
+        extension = 'jpg' if is_scaled else _extension(file_obj.name)
+        name = f'{DP_PROOF_DIR}/{digest}.{extension}'
+        if default_storage.exists(name):
+            return name
+
+        saved = default_storage.save(name, File(scaled if is_scaled else spooled, name=name))
+        if saved != name:
+            # Upload identik yang bersamaan sudah menulis file yang sama.
+            default_storage.delete(saved)
+        return name
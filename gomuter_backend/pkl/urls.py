@@ -4,8 +4,12 @@ from .views import (
     PKLProfileView,
     PKLUpdateLocationView,
     PKLTodayStatsView,
+    PKLStatsRangeView,
     BuyerLocationView,
     ActivePKLListView,
+    PKLAutocompleteView,
+    PKLProductSearchView,
+    PKLMapTileView,
     FavoritePKLListCreateView,
     FavoritePKLDeleteView,
     PKLDetailView,
@@ -15,10 +19,15 @@ from .views import (
     AdminPKLVerifyView,
     AdminMonitoringPKLView,
     AdminDashboardView,
+    AdminMetricsView,
+    AdminPKLTrackView,
+    AdminExportView,
     CreatePreOrderView,
     MyPreOrderListView,
     PKLPreOrderListView,
+    PKLOrderQueueView,
     UpdatePreOrderStatusView,
+    BulkUpdatePreOrderStatusView,
     SubmitDPProofView,
     PKLDPVerificationView,
     DPProofUploadView,
@@ -27,6 +36,7 @@ from .views import (
     PKLProductListCreateView,
     PKLProductDetailView,
 )
+from .views_async import BuyerLocationAsyncView, PKLUpdateLocationAsyncView
 from .views_chat import ChatListView, StartChatView, ChatMessagesView
 
 urlpatterns = [
@@ -34,7 +44,11 @@ urlpatterns = [
     path('profile/', PKLProfileView.as_view(), name='pkl-profile'),
     path('update-location/', PKLUpdateLocationView.as_view(), name='pkl-update-location'),
     path('stats/today/', PKLTodayStatsView.as_view(), name='pkl-stats-today'),
+    path('stats/', PKLStatsRangeView.as_view(), name='pkl-stats-range'),
     path('buyer/location/', BuyerLocationView.as_view(), name='buyer-location'),
+    # versi async (ASGI) dari dua endpoint ping lokasi di atas
+    path('async/update-location/', PKLUpdateLocationAsyncView.as_view(), name='pkl-update-location-async'),
+    path('async/buyer/location/', BuyerLocationAsyncView.as_view(), name='buyer-location-async'),
     path('buyer/favorites/', FavoritePKLListCreateView.as_view(), name='buyer-favorite-list-create'),
     path('buyer/favorites/<int:pkl_id>/', FavoritePKLDeleteView.as_view(), name='buyer-favorite-delete'),
     path('buyer/notifications/', NotificationListView.as_view(), name='buyer-notification-list'),
@@ -46,6 +60,9 @@ urlpatterns = [
 
     # public/pembeli endpoints
     path('active/', ActivePKLListView.as_view(), name='pkl-active-list'),
+    path('autocomplete/', PKLAutocompleteView.as_view(), name='pkl-autocomplete'),
+    path('products/search/', PKLProductSearchView.as_view(), name='pkl-product-search'),
+    path('map/tiles/', PKLMapTileView.as_view(), name='pkl-map-tiles'),
     path('<int:pk>/', PKLDetailView.as_view(), name='pkl-detail'),
     path('<int:pkl_id>/rating/', PKLRatingView.as_view(), name='pkl-rating'),
 
@@ -54,7 +71,10 @@ urlpatterns = [
     path('admin/pkls/', AdminPKLListView.as_view(), name='admin-pkl-list'),
     path('admin/pending/', AdminPKLPendingListView.as_view(), name='admin-pkl-pending'),
     path('admin/<int:pk>/verify/', AdminPKLVerifyView.as_view(), name='admin-pkl-verify'),
+    path('admin/<int:pk>/track/', AdminPKLTrackView.as_view(), name='admin-pkl-track'),
     path('admin/monitor/', AdminMonitoringPKLView.as_view(), name='admin-pkl-monitor'),
+    path('admin/metrics/', AdminMetricsView.as_view(), name='admin-metrics'),
+    path('admin/export/<str:dataset>/', AdminExportView.as_view(), name='admin-export'),
 
     # chat endpoints
     path('chat/', ChatListView.as_view(), name='chat-list'),
@@ -65,6 +85,8 @@ urlpatterns = [
     path('preorder/create/', CreatePreOrderView.as_view(), name='preorder-create'),
     path('preorder/my/', MyPreOrderListView.as_view(), name='preorder-my'),
     path('preorder/pkl/', PKLPreOrderListView.as_view(), name='preorder-pkl'),
+    path('preorder/pkl/queue/', PKLOrderQueueView.as_view(), name='preorder-pkl-queue'),
+    path('preorder/bulk-status/', BulkUpdatePreOrderStatusView.as_view(), name='preorder-bulk-status'),
     path('preorder/<int:preorder_id>/status/', UpdatePreOrderStatusView.as_view(), name='preorder-update-status'),
     path('preorder/<int:preorder_id>/upload-dp/', SubmitDPProofView.as_view(), name='preorder-upload-dp'),
     path('preorder/<int:preorder_id>/dp-verification/', PKLDPVerificationView.as_view(), name='preorder-dp-verification'),
@@ -1,15 +1,100 @@
 import math
+import re
 
+_TOKEN_RE = re.compile(r'\w+')
+_GEOHASH_BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+_GEOHASH_INDEX = {char: index for index, char in enumerate(_GEOHASH_BASE32)}
 
-def haversine_distance_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
-    """Return distance in kilometers between two coordinate pairs."""
-    radius = 6371.0  # Earth radius in km
 
-    phi1 = math.radians(lat1)
-    phi2 = math.radians(lat2)
-    delta_phi = math.radians(lat2 - lat1)
-    delta_lambda = math.radians(lon2 - lon1)
+def encode_geohash(latitude: float, longitude: float, precision: int = 9) -> str:
+    """Encode a coordinate as a geohash string of ``precision`` characters."""
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True
+    while len(chars) < precision:
+        value, bounds = (longitude, lng_range) if even else (latitude, lat_range)
+        mid = (bounds[0] + bounds[1]) / 2
+        if value >= mid:
+            bits = (bits << 1) | 1
+            bounds[0] = mid
+        else:
+            bits <<= 1
+            bounds[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(_GEOHASH_BASE32[bits])
+            bits = 0
+            bit_count = 0
+    return ''.join(chars)
 
-    a = math.sin(delta_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(delta_lambda / 2) ** 2
-    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
-    return radius * c
+
+def geohash_bounds(geohash: str) -> tuple[float, float, float, float]:
+    """Return ``(min_lat, min_lng, max_lat, max_lng)`` of a geohash cell."""
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    even = True
+    for char in geohash:
+        value = _GEOHASH_INDEX[char]
+        for shift in range(4, -1, -1):
+            bounds = lng_range if even else lat_range
+            mid = (bounds[0] + bounds[1]) / 2
+            if (value >> shift) & 1:
+                bounds[0] = mid
+            else:
+                bounds[1] = mid
+            even = not even
+    return lat_range[0], lng_range[0], lat_range[1], lng_range[1]
+
+
+def geohash_cell_size(precision: int) -> tuple[float, float]:
+    """Return ``(height_deg, width_deg)`` of cells at ``precision``."""
+    total_bits = precision * 5
+    lng_bits = (total_bits + 1) // 2
+    lat_bits = total_bits // 2
+    return 180.0 / (2 ** lat_bits), 360.0 / (2 ** lng_bits)
+
+
+def geohash_cells_covering(min_lat: float, min_lng: float, max_lat: float, max_lng: float, precision: int) -> list[str]:
+    """List the geohash cells at ``precision`` that intersect a bounding box."""
+    height, width = geohash_cell_size(precision)
+    start_lat = math.floor((min_lat + 90.0) / height) * height - 90.0
+    start_lng = math.floor((min_lng + 180.0) / width) * width - 180.0
+    cells = []
+    lat = start_lat
+    while lat < max_lat:
+        lng = start_lng
+        while lng < max_lng:
+            center_lat = min(max(lat + height / 2, -90.0), 90.0)
+            center_lng = min(max(lng + width / 2, -180.0), 180.0)
+            cells.append(encode_geohash(center_lat, center_lng, precision))
+            lng += width
+        lat += height
+    return list(dict.fromkeys(cells))
+
+
+def geohash_cell_count(min_lat: float, min_lng: float, max_lat: float, max_lng: float, precision: int) -> int:
+    """Upper bound of :func:`geohash_cells_covering` without building the list."""
+    height, width = geohash_cell_size(precision)
+    rows = math.floor((max_lat + 90.0) / height) - math.floor((min_lat + 90.0) / height) + 1
+    cols = math.floor((max_lng + 180.0) / width) - math.floor((min_lng + 180.0) / width) + 1
+    return max(rows, 0) * max(cols, 0)
+
+
+def normalize_search_term(value: str | None) -> str:
+    """Lowercase and drop all whitespace (``"Bakso  Malang"`` -> ``"baksomalang"``)."""
+    return ''.join(value.lower().split()) if value else ''
+
+
+def search_tokens(*values: str | None) -> str:
+    """Distinct lowercase word tokens, space separated and padded with spaces.
+
+    The padding lets ``contains=' bak'`` act as a word-prefix match.
+    """
+    tokens = []
+    for value in values:
+        tokens.extend(_TOKEN_RE.findall((value or '').lower()))
+    return f" {' '.join(dict.fromkeys(tokens))} " if tokens else ''
@@ -1,19 +1,24 @@
-import uuid
 from decimal import Decimal
 from difflib import SequenceMatcher
 
 from datetime import timedelta
 
-from django.db.models import Q, F, Avg, Count, Sum, Max
+from django.db import transaction
+from django.db.models import Q, Avg, Count, Sum
 from django.core.files.storage import default_storage
+from django.http import Http404
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from django.utils.http import parse_etags
 from rest_framework import generics, permissions
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.parsers import MultiPartParser, FormParser
 
+from gomuter_backend import db_metrics
+
 from .models import (
     PKL,
     LokasiPKL,
@@ -24,12 +29,14 @@ from .models import (
     PKLDailyStats,
     PKLRating,
     PKLProduct,
+    PKLSearchLog,
     DEFAULT_RADIUS_METERS,
 )
 from .serializers import (
     PKLSerializer,
     LokasiPKLSerializer,
     PKLListSerializer,
+    PKLProductSearchSerializer,
     PKLDetailSerializer,
     PKLVerifySerializer,
     PreOrderSerializer,
@@ -43,7 +50,46 @@ from .serializers import (
     PKLProductSerializer,
     PKLProductWriteSerializer,
 )
-from .services import notify_nearby_pkls, notify_favorite_pkl_active
+from .cache import get_request_pkl, get_request_pkl_id
+from .services import notify_nearby_pkls, notify_favorite_pkl_active, update_current_position
+from .tiles import TooManyTiles, get_tiles
+from .geo import distances_m, vendors_near_point
+from .search import filter_jenis, search_candidates, search_products
+from .autocomplete import DEFAULT_LIMIT as AUTOCOMPLETE_DEFAULT_LIMIT, suggest
+from .utils import normalize_search_term
+from .ranking import build_features, global_rating_mean, rank
+from .trajectory import get_track
+from .exports import EXPORT_DATASETS, EXPORT_FORMATS, export_response
+from .stats import (
+    GRANULARITIES,
+    GRANULARITY_DAY,
+    StatsRangeTooLarge,
+    increment_stat,
+    increment_stats,
+    stats_range,
+    today_totals,
+)
+from . import order_queue, throttling
+from .throttling import LocationPingThrottle, should_coalesce
+from .images import delete_product_variants
+from .uploads import UploadTooLarge, store_dp_proof
+from .transitions import (
+    InvalidTransition,
+    TransitionConflict,
+    apply_transition,
+    bulk_transition_status,
+    transition_status,
+)
+
+BULK_TRANSITION_LIMIT = 100
+TRACK_DEFAULT_TOLERANCE_M = 10.0
+TRACK_MIN_TOLERANCE_M = 1.0
+TRACK_MAX_TOLERANCE_M = 10000.0
+# Batas titik hasil penyederhanaan per response; sisanya ditandai truncated.
+TRACK_MAX_POINTS = 20000
+TRACK_MAX_RANGE = timedelta(days=31)
+# Batas radius_m untuk pencarian PKL terdekat (ActivePKLListView, PKLProductSearchView).
+NEARBY_MAX_RADIUS_M = 50000.0
 
 
 class IsPKL(permissions.BasePermission):
@@ -58,24 +104,12 @@ class IsPembeli(permissions.BasePermission):
         return bool(request.user and request.user.is_authenticated and request.user.role == 'USER')
 
 
-def _increment_daily_stat(pkl: PKL, field: str) -> None:
-    today = timezone.localdate()
-    stats, _created = PKLDailyStats.objects.get_or_create(pkl=pkl, date=today)
-    PKLDailyStats.objects.filter(pk=stats.pk).update(**{field: F(field) + 1})
-
-
-def _get_today_stats(pkl: PKL) -> PKLDailyStats:
-    today = timezone.localdate()
-    stats, _ = PKLDailyStats.objects.get_or_create(pkl=pkl, date=today)
-    return stats
-
-
 class PKLProfileView(APIView):
     permission_classes = [permissions.IsAuthenticated, IsPKL]
 
     def get(self, request):
         try:
-            pkl = PKL.objects.get(user=request.user)
+            pkl = get_request_pkl(request)
         except PKL.DoesNotExist:
             return Response(
                 {"detail": "Profil PKL belum dibuat."},
@@ -104,28 +138,40 @@ class PKLProfileView(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
     def put(self, request):
-        try:
-            pkl = PKL.objects.get(user=request.user)
-        except PKL.DoesNotExist:
-            return Response(
-                {"detail": "Profil PKL belum dibuat."},
-                status=status.HTTP_404_NOT_FOUND,
-            )
-
-        serializer = PKLSerializer(pkl, data=request.data, partial=True)
-        if serializer.is_valid():
-            serializer.save()
-            return Response(serializer.data)
+        # Jangan pakai salinan cache: save() menulis seluruh baris dan akan
+        # menimpa verifikasi admin, posisi ping, atau status_aktif dari sweeper.
+        with transaction.atomic():
+            try:
+                pkl = PKL.objects.select_for_update().get(user=request.user)
+            except PKL.DoesNotExist:
+                return Response(
+                    {"detail": "Profil PKL belum dibuat."},
+                    status=status.HTTP_404_NOT_FOUND,
+                )
+
+            serializer = PKLSerializer(pkl, data=request.data, partial=True)
+            if serializer.is_valid():
+                serializer.save()
+                return Response(serializer.data)
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+def _coalesced_response():
+    return Response(
+        {"detail": "Lokasi diterima (digabung dengan ping sebelumnya).", "coalesced": True},
+        status=status.HTTP_202_ACCEPTED,
+    )
+
+
 class PKLUpdateLocationView(APIView):
     permission_classes = [permissions.IsAuthenticated, IsPKL]
+    throttle_classes = [LocationPingThrottle]
+    throttle_scope = 'pkl-location'
 
     def post(self, request):
         try:
-            pkl = PKL.objects.get(user=request.user)
+            pkl = get_request_pkl(request)
         except PKL.DoesNotExist:
             return Response(
                 {"detail": "Profil PKL belum dibuat."},
@@ -134,14 +180,14 @@ class PKLUpdateLocationView(APIView):
 
         serializer = LokasiPKLSerializer(data=request.data)
         if serializer.is_valid():
-            was_active = pkl.status_aktif
+            # PKL yang belum aktif selalu diproses agar aktivasi tidak tertunda.
+            if pkl.status_aktif and should_coalesce(self.throttle_scope, request.user.pk):
+                return _coalesced_response()
             lokasi = serializer.save(pkl=pkl, status='AKTIF')
-            # tandai PKL aktif setelah update lokasi
-            pkl.status_aktif = True
-            pkl.save(update_fields=['status_aktif'])
-            if not was_active and pkl.status_aktif:
+            # salin posisi ke PKL dan tandai aktif setelah update lokasi
+            if update_current_position(pkl, lokasi.latitude, lokasi.longitude, lokasi.timestamp):
                 notify_favorite_pkl_active(pkl)
-            _increment_daily_stat(pkl, 'auto_updates')
+            increment_stat(pkl.id, 'auto_updates')
             return Response(LokasiPKLSerializer(lokasi).data, status=status.HTTP_201_CREATED)
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -152,20 +198,69 @@ class PKLTodayStatsView(APIView):
 
     def get(self, request):
         try:
-            pkl = PKL.objects.get(user=request.user)
+            pkl = get_request_pkl(request)
         except PKL.DoesNotExist:
             return Response(
                 {"detail": "Profil PKL belum dibuat."},
                 status=status.HTTP_404_NOT_FOUND,
             )
 
-        stats = _get_today_stats(pkl)
+        stats = {'date': timezone.localdate(), **today_totals(pkl.id)}
         serializer = PKLDailyStatsSerializer(stats)
         return Response(serializer.data)
 
 
+class PKLStatsRangeView(APIView):
+    """
+    GET /api/pkl/stats/?from=YYYY-MM-DD&to=YYYY-MM-DD&granularity=hour|day|week|month
+    Statistik PKL sendiri per bucket. Rentang di-snap ke awal/akhir
+    minggu/bulan; default 30 hari terakhir per hari.
+    """
+    permission_classes = [permissions.IsAuthenticated, IsPKL]
+    use_read_replica = True
+
+    def get(self, request):
+        try:
+            pkl_id = get_request_pkl_id(request)
+        except PKL.DoesNotExist:
+            return Response(
+                {"detail": "Profil PKL belum dibuat."},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+
+        granularity = request.query_params.get('granularity', GRANULARITY_DAY).lower()
+        if granularity not in GRANULARITIES:
+            return Response(
+                {"detail": f"granularity harus salah satu dari: {', '.join(GRANULARITIES)}."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        today = timezone.localdate()
+        end = _parse_query_date(request.query_params['to']) if request.query_params.get('to') else today
+        start = (
+            _parse_query_date(request.query_params['from'])
+            if request.query_params.get('from') else end - timedelta(days=29)
+        )
+        if start is None or end is None or start > end:
+            return Response(
+                {"detail": "from/to harus berformat YYYY-MM-DD dan from <= to."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        try:
+            data = stats_range(pkl_id, start, end, granularity)
+        except StatsRangeTooLarge:
+            return Response(
+                {"detail": "Rentang terlalu panjang untuk granularity ini."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        return Response(data, status=status.HTTP_200_OK)
+
+
 class BuyerLocationView(APIView):
     permission_classes = [permissions.IsAuthenticated, IsPembeli]
+    throttle_classes = [LocationPingThrottle]
+    throttle_scope = 'buyer-location'
 
     def get(self, request):
         try:
@@ -183,6 +278,13 @@ class BuyerLocationView(APIView):
             latitude = serializer.validated_data['latitude']
             longitude = serializer.validated_data['longitude']
             radius_m = serializer.validated_data.get('radius_m')
+            digest_enabled = serializer.validated_data.get('digest_enabled')
+
+            # perubahan radius/mode ringkasan memakai key berbeda sehingga tidak ikut digabung
+            digest_key = '-' if digest_enabled is None else int(digest_enabled)
+            coalesce_key = f'{request.user.pk}:{radius_m or "-"}:{digest_key}'
+            if should_coalesce(self.throttle_scope, coalesce_key):
+                return _coalesced_response()
 
             if radius_m is None:
                 try:
@@ -190,13 +292,16 @@ class BuyerLocationView(APIView):
                 except BuyerLocation.DoesNotExist:  # type: ignore[attr-defined]
                     radius_m = DEFAULT_RADIUS_METERS
 
+            defaults = {
+                'latitude': latitude,
+                'longitude': longitude,
+                'radius_m': radius_m,
+            }
+            if digest_enabled is not None:
+                defaults['digest_enabled'] = digest_enabled
             location, created = BuyerLocation.objects.update_or_create(
                 buyer=request.user,
-                defaults={
-                    'latitude': latitude,
-                    'longitude': longitude,
-                    'radius_m': radius_m,
-                },
+                defaults=defaults,
             )
 
             notify_nearby_pkls(location)
@@ -210,7 +315,16 @@ class BuyerLocationView(APIView):
 # === VIEW UNTUK PEMBELI ===
 
 class ActivePKLListView(generics.ListAPIView):
-    """Daftar PKL aktif dengan dukungan filter query param + fuzzy search."""
+    """Daftar PKL aktif dengan dukungan filter query param + fuzzy search.
+
+    ``lat``/``lng`` menambahkan ``distance_m`` (dan mengurutkan dari yang
+    terdekat bila tanpa ``q``); ``radius_m`` membatasi ke PKL dalam radius.
+    ``search_hits`` hanya dicatat untuk pencarian yang disubmit (``commit=1``),
+    bukan untuk hasil sementara saat pengguna masih mengetik.
+
+    Hasil ``q`` diurutkan oleh ``pkl.ranking`` (teks x jarak x rating x
+    kesegaran lokasi); pencarian yang disubmit dicatat ke ``PKLSearchLog``.
+    """
 
     serializer_class = PKLListSerializer
     permission_classes = [permissions.AllowAny]
@@ -231,31 +345,95 @@ class ActivePKLListView(generics.ListAPIView):
         jenis = request.query_params.get('jenis')
         search_query = request.query_params.get('q')
 
+        try:
+            point = self._parse_point(request.query_params)
+        except ValueError:
+            return Response(
+                {"detail": "lat (-90..90), lng (-180..180) dan radius_m (maks. 50000) harus berupa angka valid."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
         if jenis:
-            queryset = queryset.filter(jenis_dagangan__icontains=jenis)
+            queryset = filter_jenis(queryset, jenis)
+
+        if point and point[2]:
+            nearby_ids = [vendor.id for vendor, _ in vendors_near_point(*point)]
+            queryset = queryset.filter(id__in=nearby_ids)
 
         queryset = self.filter_queryset(queryset)
 
+        text_scores = None
         if search_query:
-            results = self._apply_fuzzy_search(queryset, search_query)
+            scored = self._apply_fuzzy_search(queryset, search_query)
+            text_scores = [score for score, _ in scored]
+            results = [pkl for _, pkl in scored]
         else:
             results = list(queryset)
 
+        if point:
+            self._attach_distances(results, point[0], point[1])
+
+        features = None
+        if search_query:
+            features = build_features(results, text_scores)
+            rating_mean = global_rating_mean()
+            results = rank(results, features, rating_mean)
+        elif point:
+            results.sort(key=lambda pkl: (pkl.distance_m is None, pkl.distance_m or 0))
+
         serializer = self.get_serializer(results, many=True)
 
-        if jenis or search_query:
+        committed = request.query_params.get('commit', '').lower() in ('1', 'true', 'yes')
+        if (jenis or search_query) and committed:
             self._record_search_hits(results)
+            if features is not None:
+                PKLSearchLog.objects.create(
+                    buyer=request.user if request.user.is_authenticated else None,
+                    query=search_query[:100],
+                    jenis=(jenis or '')[:100],
+                    latitude=point[0] if point else None,
+                    longitude=point[1] if point else None,
+                    features=features,
+                    rating_mean=rating_mean,
+                )
 
         return Response(serializer.data)
 
+    @staticmethod
+    def _parse_point(params):
+        """``(lat, lng, radius_m | None)`` dari query param, atau None bila lat/lng kosong.
+
+        Raises ``ValueError`` bila bukan angka atau di luar jangkauan.
+        """
+        if not params.get('lat') or not params.get('lng'):
+            return None
+        latitude, longitude = float(params['lat']), float(params['lng'])
+        radius = float(params['radius_m']) if params.get('radius_m') else None
+        # perbandingan juga menolak nan dan inf
+        if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+            raise ValueError('lat/lng di luar jangkauan')
+        if radius is not None and not 0 < radius <= NEARBY_MAX_RADIUS_M:
+            raise ValueError('radius_m di luar jangkauan')
+        return latitude, longitude, radius
+
+    @staticmethod
+    def _attach_distances(pkls, latitude, longitude):
+        located = [pkl for pkl in pkls if pkl.last_latitude is not None and pkl.last_longitude is not None]
+        distances = distances_m(latitude, longitude, ((pkl.last_latitude, pkl.last_longitude) for pkl in located))
+        for pkl in pkls:
+            pkl.distance_m = None
+        for pkl, distance in zip(located, distances):
+            pkl.distance_m = distance
+
     def _apply_fuzzy_search(self, queryset, raw_query):
-        normalized_query = self._normalize_term(raw_query)
+        """``(skor teks, pkl)`` untuk kandidat yang lolos ambang kemiripan."""
+        normalized_query = normalize_search_term(raw_query)
         if not normalized_query:
-            return list(queryset[:50])
+            return [(0.0, pkl) for pkl in queryset[:50]]
 
-        candidates = list(queryset[: self.fuzzy_limit])
+        candidates = search_candidates(queryset, raw_query, self.fuzzy_limit)
         if not candidates:
-            return candidates
+            return []
 
         scored = []
         for pkl in candidates:
@@ -263,18 +441,16 @@ class ActivePKLListView(generics.ListAPIView):
             scored.append((best_score, pkl))
 
         scored.sort(key=lambda item: item[0], reverse=True)
-        filtered = [pkl for score, pkl in scored if score >= self.fuzzy_threshold]
+        filtered = [item for item in scored if item[0] >= self.fuzzy_threshold]
 
         if not filtered:
-            filtered = [pkl for _, pkl in scored[:20]]
+            filtered = scored[:20]
 
         return filtered
 
     def _best_similarity(self, normalized_query, pkl):
-        fields = [
-            self._normalize_term(getattr(pkl, 'nama_usaha', '') or ''),
-            self._normalize_term(getattr(pkl, 'jenis_dagangan', '') or ''),
-        ]
+        # search_nama/search_jenis sudah dinormalisasi saat PKL disimpan
+        fields = [pkl.search_nama, pkl.search_jenis]
         scores = [self._similarity(normalized_query, field) for field in fields if field]
         if not scores:
             return 0.0
@@ -283,12 +459,7 @@ class ActivePKLListView(generics.ListAPIView):
 
     def _record_search_hits(self, pkls):
         limited = pkls[:20] if isinstance(pkls, list) else list(pkls[:20])
-        for pkl in limited:
-            _increment_daily_stat(pkl, 'search_hits')
-
-    @staticmethod
-    def _normalize_term(value):
-        return ''.join(value.lower().split()) if value else ''
+        increment_stats([pkl.id for pkl in limited], 'search_hits')
 
     @staticmethod
     def _similarity(source, target):
@@ -297,6 +468,126 @@ class ActivePKLListView(generics.ListAPIView):
         return SequenceMatcher(None, source, target).ratio()
 
 
+class PKLAutocompleteView(APIView):
+    """Saran pencarian (nama PKL, jenis dagangan, nama produk) dari trie in-memory.
+
+    Tidak menyentuh database maupun statistik; hit dicatat oleh
+    ``ActivePKLListView`` saat pencarian disubmit.
+    """
+
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request):
+        query = request.query_params.get('q', '')
+        try:
+            limit = int(request.query_params.get('limit', AUTOCOMPLETE_DEFAULT_LIMIT))
+        except ValueError:
+            return Response({"detail": "limit harus berupa angka."}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'query': query, 'suggestions': suggest(query, limit)})
+
+
+class PKLProductSearchView(APIView):
+    """Cari PKL berdasarkan produk yang dijual (``PKLProduct.name``/``description``).
+
+    Memakai index full-text produk (lihat ``pkl.search.search_products``);
+    PKL diurutkan dari skor kecocokan produk terbaiknya. ``lat``/``lng``
+    menambahkan ``distance_m``, ``radius_m`` membatasi ke PKL dalam radius,
+    dan ``order=distance`` mengurutkan dari yang terdekat.
+    """
+
+    permission_classes = [permissions.AllowAny]
+    max_vendors = 50
+    max_products_per_vendor = 5
+
+    def get(self, request):
+        query = (request.query_params.get('q') or '').strip()
+        if not query:
+            return Response({"detail": "Parameter q wajib diisi."}, status=status.HTTP_400_BAD_REQUEST)
+        order = request.query_params.get('order', 'relevance')
+        if order not in ('relevance', 'distance'):
+            return Response(
+                {"detail": "order harus 'relevance' atau 'distance'."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        try:
+            point = ActivePKLListView._parse_point(request.query_params)
+        except ValueError:
+            return Response(
+                {"detail": "lat (-90..90), lng (-180..180) dan radius_m (maks. 50000) harus berupa angka valid."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        matches = {}
+        for row in search_products(query):
+            matches.setdefault(row['pkl_id'], []).append(row)
+        if point and point[2]:
+            nearby_ids = {vendor.id for vendor, _ in vendors_near_point(*point)}
+            matches = {pkl_id: rows for pkl_id, rows in matches.items() if pkl_id in nearby_ids}
+
+        pkls = list(
+            PKL.objects.filter(id__in=matches).annotate(
+                average_rating=Avg('ratings__score'),
+                rating_count=Count('ratings', distinct=True),
+            )
+        )
+        for pkl in pkls:
+            rows = matches[pkl.id]
+            pkl.match_score = rows[0]['rank']
+            pkl.matched_products = rows[:self.max_products_per_vendor]
+            pkl.distance_m = None
+        if point:
+            ActivePKLListView._attach_distances(pkls, point[0], point[1])
+
+        if order == 'distance' and point:
+            pkls.sort(key=lambda pkl: (pkl.distance_m is None, pkl.distance_m or 0, -pkl.match_score))
+        else:
+            pkls.sort(key=lambda pkl: (
+                -pkl.match_score,
+                -len(matches[pkl.id]),
+                pkl.distance_m is None,
+                pkl.distance_m or 0,
+            ))
+
+        serializer = PKLProductSearchSerializer(pkls[:self.max_vendors], many=True)
+        return Response(serializer.data)
+
+
+class PKLMapTileView(APIView):
+    """
+    GET /api/pkl/map/tiles/?bbox=<min_lng>,<min_lat>,<max_lng>,<max_lat>&zoom=<z>
+    Zoom rendah -> cluster (jumlah, titik tengah, jenis dominan);
+    zoom tinggi -> PKL individual.
+    """
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request):
+        try:
+            min_lng, min_lat, max_lng, max_lat = (
+                float(value) for value in request.query_params.get('bbox', '').split(',')
+            )
+            zoom = int(request.query_params.get('zoom', ''))
+        except ValueError:
+            return Response(
+                {"detail": "bbox (min_lng,min_lat,max_lng,max_lat) dan zoom wajib diisi."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        if not (-90 <= min_lat <= max_lat <= 90 and -180 <= min_lng <= max_lng <= 180):
+            return Response(
+                {"detail": "bbox tidak valid."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        try:
+            data = get_tiles(min_lat, min_lng, max_lat, max_lng, zoom)
+        except TooManyTiles:
+            return Response(
+                {"detail": "Area terlalu luas untuk zoom ini."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        return Response(data, status=status.HTTP_200_OK)
+
+
 class FavoritePKLListCreateView(APIView):
     permission_classes = [permissions.IsAuthenticated, IsPembeli]
 
@@ -356,7 +647,7 @@ class PKLDetailView(generics.RetrieveAPIView):
 
     def retrieve(self, request, *args, **kwargs):
         instance = self.get_object()
-        _increment_daily_stat(instance, 'live_views')
+        increment_stat(instance.id, 'live_views')
         serializer = self.get_serializer(instance)
         return Response(serializer.data)
 
@@ -440,7 +731,10 @@ class PKLProductListCreateView(APIView):
     parser_classes = [MultiPartParser, FormParser]
 
     def _get_pkl(self, request):
-        return get_object_or_404(PKL, user=request.user)
+        try:
+            return get_request_pkl(request)
+        except PKL.DoesNotExist:
+            raise Http404
 
     def get(self, request):
         pkl = self._get_pkl(request)
@@ -496,6 +790,7 @@ class PKLProductDetailView(APIView):
         product = self._get_object(request, product_id)
         if product.image:
             product.image.delete(save=False)
+        delete_product_variants(product)
         product.delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
@@ -510,6 +805,7 @@ class AdminPKLListView(generics.ListAPIView):
 
     serializer_class = PKLListSerializer
     permission_classes = [IsAdmin]
+    use_read_replica = True
 
     def get_queryset(self):
         queryset = PKL.objects.all().annotate(
@@ -585,12 +881,14 @@ class AdminMonitoringPKLView(generics.ListAPIView):
 
 class AdminDashboardView(APIView):
     permission_classes = [IsAdmin]
+    use_read_replica = True
 
     def get(self, request):
         today = timezone.localdate()
         trend_start = today - timedelta(days=6)
+        # Hari ini belum diringkas ke tabel harian; diambil dari tabel per jam.
         trend_rows = (
-            PKLDailyStats.objects.filter(date__gte=trend_start)
+            PKLDailyStats.objects.filter(date__gte=trend_start, date__lt=today)
             .values('date')
             .annotate(
                 live_views=Sum('live_views'),
@@ -599,6 +897,7 @@ class AdminDashboardView(APIView):
             )
         )
         trend_map = {row['date']: row for row in trend_rows}
+        trend_map[today] = today_totals()
         trend_data = []
         for offset in range(6, -1, -1):
             current_date = today - timedelta(days=offset)
@@ -667,8 +966,7 @@ class AdminDashboardView(APIView):
         stale_cutoff = now - timedelta(days=3)
         stale_active = (
             PKL.objects.filter(status_verifikasi='DITERIMA', status_aktif=True)
-            .annotate(latest_location=Max('lokasi__timestamp'))
-            .filter(Q(latest_location__lt=stale_cutoff) | Q(latest_location__isnull=True))
+            .filter(Q(last_seen_at__lt=stale_cutoff) | Q(last_seen_at__isnull=True))
             .count()
         )
 
@@ -739,8 +1037,157 @@ class AdminDashboardView(APIView):
         return Response(response_data, status=status.HTTP_200_OK)
 
 
+class AdminMetricsView(APIView):
+    """
+    GET /api/pkl/admin/metrics/
+    Statistik runtime proses ini (mis. waktu tunggu koneksi database).
+    """
+    permission_classes = [IsAdmin]
+
+    def get(self, request):
+        return Response(
+            {
+                'db': db_metrics.snapshot(),
+                'location_throttle': throttling.counters(),
+            },
+            status=status.HTTP_200_OK,
+        )
+
+
+def _parse_track_datetime(value):
+    try:
+        parsed = parse_datetime(value)
+    except ValueError:
+        # format benar tapi tanggalnya tidak ada, mis. 2026-02-30
+        return None
+    if parsed is not None and timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def _parse_query_date(value):
+    try:
+        return parse_date(value)
+    except ValueError:
+        return None
+
+
+class AdminPKLTrackView(APIView):
+    """
+    GET /api/pkl/admin/<pk>/track/?from=<iso>&to=<iso>&tolerance_m=<meter>
+    Jejak lokasi PKL dalam rentang waktu, disederhanakan dengan
+    Douglas-Peucker. Default: 24 jam terakhir, toleransi 10 m.
+    Maksimal TRACK_MAX_POINTS titik; bila terpotong, ``truncated`` bernilai
+    true dan rentang berikutnya bisa diminta mulai dari titik terakhir.
+    """
+    permission_classes = [IsAdmin]
+    use_read_replica = True
+
+    def get(self, request, pk):
+        pkl = get_object_or_404(PKL, pk=pk)
+
+        end = timezone.now()
+        start = end - timedelta(days=1)
+        if request.query_params.get('to'):
+            end = _parse_track_datetime(request.query_params['to'])
+        if request.query_params.get('from'):
+            start = _parse_track_datetime(request.query_params['from'])
+        if start is None or end is None:
+            return Response(
+                {"detail": "Format from/to harus ISO 8601."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if start >= end or end - start > TRACK_MAX_RANGE:
+            return Response(
+                {"detail": "Rentang waktu tidak valid (maksimal 31 hari)."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        try:
+            tolerance_m = float(request.query_params.get('tolerance_m', TRACK_DEFAULT_TOLERANCE_M))
+        except ValueError:
+            tolerance_m = -1
+        if not TRACK_MIN_TOLERANCE_M <= tolerance_m <= TRACK_MAX_TOLERANCE_M:
+            return Response(
+                {"detail": "tolerance_m harus berupa angka 1 - 10000."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        track = get_track(pkl.id, start, end, tolerance_m, TRACK_MAX_POINTS)
+        return Response(
+            {
+                'pkl_id': pkl.id,
+                'from': start.isoformat(),
+                'to': end.isoformat(),
+                'tolerance_m': tolerance_m,
+                **track,
+            },
+            status=status.HTTP_200_OK,
+        )
+
+
+class AdminExportView(APIView):
+    """
+    GET /api/pkl/admin/export/<dataset>/?output=csv|ndjson&from=&to=&pkl_id=
+    dataset: pkls, stats, preorders, ratings. Data dikirim bertahap
+    (streaming), jadi aman untuk rentang yang sangat besar.
+    Filter ``pkls``: status_verifikasi, status_aktif.
+    """
+    permission_classes = [IsAdmin]
+    use_read_replica = True
+
+    def get(self, request, dataset):
+        if dataset not in EXPORT_DATASETS:
+            raise Http404
+
+        output = request.query_params.get('output', 'csv').lower()
+        if output not in EXPORT_FORMATS:
+            return Response(
+                {"detail": "output harus csv atau ndjson."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        filters = {}
+        for key in ('from', 'to'):
+            value = request.query_params.get(key)
+            if value:
+                filters[key] = _parse_query_date(value)
+                if filters[key] is None:
+                    return Response(
+                        {"detail": f"{key} harus berformat YYYY-MM-DD."},
+                        status=status.HTTP_400_BAD_REQUEST,
+                    )
+
+        pkl_id = request.query_params.get('pkl_id')
+        if pkl_id:
+            if not pkl_id.isdigit():
+                return Response(
+                    {"detail": "pkl_id harus berupa angka."},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            filters['pkl_id'] = int(pkl_id)
+
+        filters['status_verifikasi'] = request.query_params.get('status_verifikasi')
+        status_aktif = request.query_params.get('status_aktif')
+        if status_aktif is not None:
+            filters['status_aktif'] = status_aktif.lower() in ('true', '1')
+
+        return export_response(dataset, output, filters)
+
+
 # === PRE-ORDER ===
 
+def _preorder_conflict_response(preorder_id):
+    current = PreOrder.objects.filter(pk=preorder_id).first()
+    return Response(
+        {
+            "detail": "Pre-order sudah diubah oleh pihak lain. Muat ulang data.",
+            "current": PreOrderSerializer(current).data if current else None,
+        },
+        status=status.HTTP_409_CONFLICT,
+    )
+
+
 class CreatePreOrderView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
@@ -781,12 +1228,14 @@ class CreatePreOrderView(APIView):
 
         serializer = PreOrderSerializer(data=payload)
         if serializer.is_valid():
-            preorder = serializer.save(
-                pembeli=request.user,
-                pkl=pkl,
-                status='PENDING',
-                dp_status='BELUM_BAYAR',
-            )
+            with transaction.atomic():
+                preorder = serializer.save(
+                    pembeli=request.user,
+                    pkl=pkl,
+                    status='PENDING',
+                    dp_status='BELUM_BAYAR',
+                )
+                order_queue.record_change(pkl.id, added=[(preorder.status, preorder.dp_status)])
             return Response(PreOrderSerializer(preorder).data, status=status.HTTP_201_CREATED)
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -796,7 +1245,7 @@ class MyPreOrderListView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request):
-        preorders = PreOrder.objects.filter(pembeli=request.user).order_by('-created_at')
+        preorders = PreOrder.objects.filter(pembeli=request.user).select_related('pkl', 'pembeli').order_by('-created_at')
         serializer = PreOrderSerializer(preorders, many=True)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
@@ -806,18 +1255,45 @@ class PKLPreOrderListView(APIView):
 
     def get(self, request):
         try:
-            pkl = PKL.objects.get(user=request.user)
+            pkl_id = get_request_pkl_id(request)
         except PKL.DoesNotExist:
             return Response(
                 {"detail": "Profil PKL belum dibuat."},
                 status=status.HTTP_404_NOT_FOUND,
             )
 
-        preorders = PreOrder.objects.filter(pkl=pkl).order_by('-created_at')
+        preorders = PreOrder.objects.filter(pkl_id=pkl_id).select_related('pkl', 'pembeli').order_by('-created_at')
         serializer = PreOrderSerializer(preorders, many=True)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 
+class PKLOrderQueueView(APIView):
+    """
+    GET /api/pkl/preorder/pkl/queue/
+    Ringkasan antrean pre-order PKL: jumlah per status/dp_status dan order
+    terbuka (PENDING/DITERIMA) tanpa detail. Kirim ETag terakhir lewat
+    If-None-Match; bila antrean belum berubah dijawab 304 tanpa body.
+    """
+    permission_classes = [permissions.IsAuthenticated, IsPKL]
+
+    def get(self, request):
+        try:
+            pkl_id = get_request_pkl_id(request)
+        except PKL.DoesNotExist:
+            return Response(
+                {"detail": "Profil PKL belum dibuat."},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+
+        state = order_queue.get_state(pkl_id)
+        etag = order_queue.etag(state)
+        headers = {'ETag': etag, 'Cache-Control': 'private, no-cache'}
+        client_etags = parse_etags(request.headers.get('If-None-Match', ''))
+        if '*' in client_etags or etag in (value.removeprefix('W/') for value in client_etags):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        return Response(order_queue.snapshot(state), status=status.HTTP_200_OK, headers=headers)
+
+
 class UpdatePreOrderStatusView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
@@ -843,12 +1319,70 @@ class UpdatePreOrderStatusView(APIView):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        preorder.status = new_status
-        preorder.save(update_fields=['status'])
+        try:
+            preorder = transition_status(preorder, new_status, request.data.get('version'))
+        except InvalidTransition as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        except TransitionConflict:
+            return _preorder_conflict_response(preorder.pk)
+
         serializer = PreOrderSerializer(preorder)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 
+class BulkUpdatePreOrderStatusView(APIView):
+    """
+    POST /api/pkl/preorder/bulk-status/
+    Body: {"ids": [1, 2, 3], "status": "DITERIMA"}
+    """
+    permission_classes = [permissions.IsAuthenticated, IsPKL]
+
+    def post(self, request):
+        try:
+            pkl = get_request_pkl(request)
+        except PKL.DoesNotExist:
+            return Response(
+                {"detail": "Profil PKL belum dibuat."},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+
+        new_status = request.data.get('status')
+        if new_status not in ['DITERIMA', 'DITOLAK', 'SELESAI']:
+            return Response(
+                {"detail": "Status tidak valid."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        ids = request.data.get('ids')
+        if not isinstance(ids, list) or not ids:
+            return Response(
+                {"detail": "ids wajib berupa daftar id pre-order."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if len(ids) > BULK_TRANSITION_LIMIT:
+            return Response(
+                {"detail": f"Maksimal {BULK_TRANSITION_LIMIT} pre-order per request."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        try:
+            updated_ids, skipped_ids = bulk_transition_status(pkl, ids, new_status)
+        except (TypeError, ValueError):
+            return Response(
+                {"detail": "ids harus berupa angka."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        updated = PreOrder.objects.filter(id__in=updated_ids).select_related('pkl', 'pembeli')
+        return Response(
+            {
+                'updated': PreOrderSerializer(updated, many=True).data,
+                'skipped': skipped_ids,
+            },
+            status=status.HTTP_200_OK,
+        )
+
+
 class SubmitDPProofView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
@@ -868,9 +1402,16 @@ class SubmitDPProofView(APIView):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        preorder.bukti_dp_url = bukti_url
-        preorder.dp_status = 'MENUNGGU_KONFIRMASI'
-        preorder.save(update_fields=['bukti_dp_url', 'dp_status', 'updated_at'])
+        try:
+            preorder = apply_transition(
+                preorder,
+                {'bukti_dp_url': bukti_url, 'dp_status': 'MENUNGGU_KONFIRMASI'},
+                request.data.get('version'),
+            )
+        except InvalidTransition as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        except TransitionConflict:
+            return _preorder_conflict_response(preorder.pk)
 
         return Response(PreOrderSerializer(preorder).data, status=status.HTTP_200_OK)
 
@@ -880,7 +1421,7 @@ class PKLDPVerificationView(APIView):
 
     def post(self, request, preorder_id):
         try:
-            pkl = PKL.objects.get(user=request.user)
+            pkl = get_request_pkl(request)
         except PKL.DoesNotExist:
             return Response(
                 {"detail": "Profil PKL belum dibuat."},
@@ -903,13 +1444,17 @@ class PKLDPVerificationView(APIView):
             )
 
         if action == 'TERIMA':
-            preorder.dp_status = 'TERKONFIRMASI'
-            preorder.status = 'DITERIMA'
+            changes = {'dp_status': 'TERKONFIRMASI', 'status': 'DITERIMA'}
         else:
-            preorder.dp_status = 'BELUM_BAYAR'
-            preorder.status = 'DITOLAK'
+            changes = {'dp_status': 'BELUM_BAYAR', 'status': 'DITOLAK'}
+
+        try:
+            preorder = apply_transition(preorder, changes, request.data.get('version'))
+        except InvalidTransition as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        except TransitionConflict:
+            return _preorder_conflict_response(preorder.pk)
 
-        preorder.save(update_fields=['dp_status', 'status', 'updated_at'])
         return Response(PreOrderSerializer(preorder).data, status=status.HTTP_200_OK)
 
 
@@ -925,9 +1470,13 @@ class DPProofUploadView(APIView):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        extension = file_obj.name.split('.')[-1]
-        filename = f"dp_proofs/{uuid.uuid4().hex}.{extension}"
-        saved_path = default_storage.save(filename, file_obj)
+        try:
+            saved_path = store_dp_proof(file_obj)
+        except UploadTooLarge:
+            return Response(
+                {"detail": "Ukuran file terlalu besar."},
+                status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            )
         file_url = request.build_absolute_uri(default_storage.url(saved_path))
 
         return Response({'url': file_url}, status=status.HTTP_201_CREATED)
@@ -939,7 +1488,8 @@ class NotificationListView(APIView):
     def get(self, request):
         unread_only = request.query_params.get('unread')
         limit_param = request.query_params.get('limit')
-        queryset = Notification.objects.filter(buyer=request.user)
+        # index (buyer, [is_read,] -created_at) INCLUDE expires_at; lihat Notification.Meta
+        queryset = Notification.objects.filter(buyer=request.user, expires_at__gt=timezone.now())
         if unread_only and unread_only.lower() in ('1', 'true', 'yes'):
             queryset = queryset.filter(is_read=False)
 
@@ -0,0 +1,223 @@
+"""Async (ASGI-native) versions of the location ping endpoints.
+
+``async/update-location/`` and ``async/buyer/location/`` behave like their
+DRF counterparts in :mod:`pkl.views` but await the database through Django's
+async ORM, so one ASGI worker keeps serving other pings while a query is in
+flight. DRF's ``APIView`` cannot run async handlers, hence the small
+:class:`AsyncLocationView` base doing authentication, role check and
+throttling itself, with the same classes and error payloads as DRF.
+
+Notification fan-out is not awaited: it runs as a background task on the
+event loop after the response is sent (see :func:`spawn_fanout`).
+Under WSGI these views still work (Django runs them in a per-request event
+loop) but gain nothing; deploy with an ASGI server to benefit. The WSGI
+per-request loop cancels the fan-out task when it closes; the executor thread
+still finishes the fan-out and logs its own errors.
+"""
+import asyncio
+import json
+import logging
+
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+from django.http import HttpResponse
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import exceptions, status
+from rest_framework.renderers import JSONRenderer
+
+from accounts.authentication import CachedJWTAuthentication
+
+from .cache import aget_request_pkl
+from .models import DEFAULT_RADIUS_METERS, BuyerLocation, LokasiPKL, PKL
+from .serializers import BuyerLocationSerializer, BuyerLocationUpdateSerializer, LokasiPKLSerializer
+from .services import notify_favorite_pkl_active, notify_nearby_pkls, update_current_position
+from .stats import increment_stat
+from .throttling import LocationPingThrottle, run_with_backend, should_coalesce
+
+logger = logging.getLogger(__name__)
+
+# referensi kuat ke task fan-out; tanpa ini task bisa di-GC sebelum selesai
+_background_tasks: set[asyncio.Task] = set()
+
+
+def _run_fanout(func, *args):
+    # Thread executor tidak melewati siklus request_started/finished Django,
+    # jadi koneksi DB dirawat sendiri seperti di akhir request.
+    close_old_connections()
+    try:
+        func(*args)
+    except Exception:
+        # dicatat di thread: di bawah WSGI task-nya sudah dibatalkan saat
+        # loop per-request ditutup, jadi done callback tidak melihat error
+        logger.exception('Fan-out notifikasi gagal')
+    finally:
+        close_old_connections()
+
+
+def spawn_fanout(func, *args) -> asyncio.Task:
+    """Run a sync notification fan-out in the background of the event loop.
+
+    The task outlives the request; errors are logged by :func:`_run_fanout`,
+    not raised. It runs on the loop's default executor rather than the
+    request's ORM thread, which is released once the response is sent.
+    """
+    task = asyncio.create_task(sync_to_async(_run_fanout, thread_sensitive=False)(func, *args))
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    return task
+
+
+def _json_response(data, status_code=status.HTTP_200_OK, headers=None) -> HttpResponse:
+    return HttpResponse(
+        JSONRenderer().render(data),
+        status=status_code,
+        content_type='application/json',
+        headers=headers,
+    )
+
+
+def _error_response(exc: exceptions.APIException, headers=None) -> HttpResponse:
+    return _json_response({'detail': exc.detail}, exc.status_code, headers)
+
+
+def _coalesced_response() -> HttpResponse:
+    return _json_response(
+        {"detail": "Lokasi diterima (digabung dengan ping sebelumnya).", "coalesced": True},
+        status.HTTP_202_ACCEPTED,
+    )
+
+
+class AsyncLocationView(View):
+    """Base for the async ping views: JWT auth, role check and ping throttle."""
+
+    required_role = None
+    throttle_scope = None
+    authenticator = CachedJWTAuthentication()
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        # seperti APIView: autentikasi lewat token, bukan sesi, jadi tanpa CSRF
+        return csrf_exempt(super().as_view(**initkwargs))
+
+    async def dispatch(self, request, *args, **kwargs):
+        try:
+            result = await self.authenticator.aauthenticate(request)
+        except exceptions.AuthenticationFailed as exc:
+            return self._unauthorized(exc)
+        if result is None:
+            return self._unauthorized(exceptions.NotAuthenticated())
+        # request.user dipakai middleware (pin replica) setelah view selesai
+        request.user, request.auth = result
+        if request.user.role != self.required_role:
+            return _error_response(exceptions.PermissionDenied())
+
+        throttle = LocationPingThrottle()
+        if not await run_with_backend(throttle.allow_request, request, self):
+            wait = throttle.wait()
+            return _error_response(exceptions.Throttled(wait), {'Retry-After': f'{wait:.0f}'})
+        return await super().dispatch(request, *args, **kwargs)
+
+    def _unauthorized(self, exc: exceptions.APIException) -> HttpResponse:
+        return _error_response(
+            exc,
+            {'WWW-Authenticate': self.authenticator.authenticate_header(None)},
+        )
+
+    def parse_body(self, request):
+        """JSON body (or form data) of ``request``; ``None`` when malformed."""
+        if request.content_type == 'application/json':
+            try:
+                return json.loads(request.body or b'{}')
+            except ValueError:
+                return None
+        return request.POST
+
+
+class PKLUpdateLocationAsyncView(AsyncLocationView):
+    """POST /api/pkl/async/update-location/ — async ``PKLUpdateLocationView``."""
+
+    required_role = 'PKL'
+    throttle_scope = 'pkl-location'
+
+    async def post(self, request):
+        try:
+            pkl = await aget_request_pkl(request)
+        except PKL.DoesNotExist:
+            return _json_response({"detail": "Profil PKL belum dibuat."}, status.HTTP_404_NOT_FOUND)
+
+        data = self.parse_body(request)
+        if data is None:
+            return _error_response(exceptions.ParseError())
+        serializer = LokasiPKLSerializer(data=data)
+        if not serializer.is_valid():
+            return _json_response(serializer.errors, status.HTTP_400_BAD_REQUEST)
+
+        if pkl.status_aktif and await run_with_backend(should_coalesce, self.throttle_scope, request.user.pk):
+            return _coalesced_response()
+        lokasi = await LokasiPKL.objects.acreate(pkl=pkl, status='AKTIF', **serializer.validated_data)
+        # update_current_position juga menyentuh cache bersama dan signal
+        activated = await sync_to_async(update_current_position)(
+            pkl, lokasi.latitude, lokasi.longitude, lokasi.timestamp,
+        )
+        if activated:
+            spawn_fanout(notify_favorite_pkl_active, pkl)
+        await sync_to_async(increment_stat)(pkl.id, 'auto_updates')
+        return _json_response(LokasiPKLSerializer(lokasi).data, status.HTTP_201_CREATED)
+
+
+class BuyerLocationAsyncView(AsyncLocationView):
+    """GET/POST /api/pkl/async/buyer/location/ — async ``BuyerLocationView``."""
+
+    required_role = 'USER'
+    throttle_scope = 'buyer-location'
+
+    async def get(self, request):
+        try:
+            location = await BuyerLocation.objects.aget(buyer=request.user)
+        except BuyerLocation.DoesNotExist:
+            return _json_response({"detail": "Lokasi belum tersimpan."}, status.HTTP_404_NOT_FOUND)
+        return _json_response(BuyerLocationSerializer(location).data)
+
+    async def post(self, request):
+        data = self.parse_body(request)
+        if data is None:
+            return _error_response(exceptions.ParseError())
+        serializer = BuyerLocationUpdateSerializer(data=data)
+        if not serializer.is_valid():
+            return _json_response(serializer.errors, status.HTTP_400_BAD_REQUEST)
+
+        latitude = serializer.validated_data['latitude']
+        longitude = serializer.validated_data['longitude']
+        radius_m = serializer.validated_data.get('radius_m')
+        digest_enabled = serializer.validated_data.get('digest_enabled')
+
+        digest_key = '-' if digest_enabled is None else int(digest_enabled)
+        coalesce_key = f'{request.user.pk}:{radius_m or "-"}:{digest_key}'
+        if await run_with_backend(should_coalesce, self.throttle_scope, coalesce_key):
+            return _coalesced_response()
+
+        if radius_m is None:
+            radius_m = await (
+                BuyerLocation.objects.filter(buyer=request.user)
+                .values_list('radius_m', flat=True)
+                .afirst()
+            ) or DEFAULT_RADIUS_METERS
+
+        defaults = {
+            'latitude': latitude,
+            'longitude': longitude,
+            'radius_m': radius_m,
+        }
+        if digest_enabled is not None:
+            defaults['digest_enabled'] = digest_enabled
+        location, created = await BuyerLocation.objects.aupdate_or_create(
+            buyer=request.user,
+            defaults=defaults,
+        )
+
+        spawn_fanout(notify_nearby_pkls, location)
+        return _json_response(
+            BuyerLocationSerializer(location).data,
+            status.HTTP_201_CREATED if created else status.HTTP_200_OK,
+        )